@@ -0,0 +1,61 @@
+"""
+Benchmark View._reducer_tiled with config values bound via configured_snapshot versus
+looking up every configured_value on each call
+
+Run from repo root: python dev/bench_config.py
+"""
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+import newm.view as view
+from newm.view import View, conf_corner_radius, conf_padding, conf_fullscreen_padding
+from newm.state import ViewState, WorkspaceState
+
+N = 100000
+
+ws = SimpleNamespace(pos_x=0, pos_y=0, width=1920, height=1080)
+ws_state = WorkspaceState(ws, i=0, j=0, size=2)
+self_state = ViewState(i=0, j=0, w=1, h=1)
+state = SimpleNamespace(final=True, background_opacity=1.)
+up_state = SimpleNamespace(size_constraints=[0, 0, 0, 0], size=(948, 528), offset=(0, 0))
+v = SimpleNamespace(parent=None, is_focused=lambda: False, _opacity=1.)
+
+def reducer() -> None:
+    View._reducer_tiled(v, up_state, state, self_state, ws, ws_state)  # type: ignore
+
+class LookupConfig:
+    """
+    Previous behaviour - every access is a configured_value call
+    """
+    corner_radius = property(lambda self: conf_corner_radius())
+    padding = property(lambda self: conf_padding())
+    fullscreen_padding = property(lambda self: conf_fullscreen_padding())
+
+def lookup_config() -> None:
+    conf_corner_radius()
+    conf_fullscreen_padding()
+    conf_padding()
+
+def bound_config() -> None:
+    view.conf_view()
+
+if __name__ == '__main__':
+    snapshot = view.conf_view
+
+    print("%-40s %8.3fus" % ("Config access (callables)", 1e6 * timeit.timeit(lookup_config, number=N) / N))
+    print("%-40s %8.3fus" % ("Config access (snapshot)", 1e6 * timeit.timeit(bound_config, number=N) / N))
+
+    lookup = LookupConfig()
+    view.conf_view = lambda: lookup
+    t_lookup = timeit.timeit(reducer, number=N) / N
+
+    view.conf_view = snapshot
+    t_bound = timeit.timeit(reducer, number=N) / N
+
+    print("%-40s %8.3fus" % ("_reducer_tiled (callables)", 1e6 * t_lookup))
+    print("%-40s %8.3fus" % ("_reducer_tiled (snapshot)", 1e6 * t_bound))
+    print("%-40s %7.1f%%" % ("Saved", 100. * (t_lookup - t_bound) / t_lookup))
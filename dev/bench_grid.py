@@ -0,0 +1,255 @@
+"""
+Check Grid against the previous implementation (random grids and gesture traces, outputs of at and final
+must match with grid.fling_deceleration = 0) and benchmark per-update evaluation of the four grids of a
+resize gesture as well as batch evaluation
+
+Compare landing points and settle times of noisy flings (step table vs fling prediction)
+
+Run from repo root: python dev/bench_grid.py
+"""
+import os
+import sys
+import math
+import random
+import time
+import timeit
+from collections import Counter
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from newm.grid import Grid, Grids, conf_griddebug, conf_min_dist, conf_throw_ps, conf_time_scale, conf_fling_deceleration
+
+N = 2000
+TRACES = 500
+
+
+class ReferenceGrid:
+    """
+    Previous implementation of Grid (without debug output), clock injected instead of time.time
+    """
+    def __init__(self, x0: int, x1: int, xi: float, d_ovr: float, m_snap: float, clock: Callable[[], float]) -> None:
+        self.x0 = int(x0)
+        self.x1 = int(x1)
+        self.xi = int(xi)
+        self.allow_out_of_bounds = True
+        self.d_ovr = d_ovr
+        self.m_snap = m_snap
+        self.clock = clock
+
+        self.last_t: Optional[float] = None
+        self.last_x: Optional[float] = None
+        self.last_p: Optional[float] = None
+        self.last_x_output: Optional[float] = None
+        self.last_p_output: Optional[float] = None
+
+    def _get_bounds(self, x: float) -> tuple[int, int]:
+        if self.x0 <= x <= self.x1:
+            self.allow_out_of_bounds = False
+
+        x0, x1 = self.x0, self.x1
+        if self.allow_out_of_bounds and x < x0:
+            x0 = math.floor(x)
+        if self.allow_out_of_bounds and x > x1:
+            x1 = math.ceil(x)
+
+        return x0, x1
+
+    def at(self, x: float, silent: bool=False) -> float:
+        x0, x1 = self._get_bounds(x)
+
+        t = self.clock()
+        if not silent:
+            if self.last_x is not None and self.last_t is not None:
+                dx = x - self.last_x
+                dt = t - self.last_t
+                self.last_p = dx / dt
+            self.last_x = x
+
+        xp = x
+        if x < x0:
+            if self.m_snap == 1:
+                if self.d_ovr > 0:
+                    y = x - x0
+                    y = self.d_ovr*(1 / (1 - y/self.d_ovr) - 1)
+                    xp = x0 + y
+                else:
+                    xp = x0
+            else:
+                y = max(0, x - x0 + 1)
+
+                if y == 0:
+                    xp = x0 - self.d_ovr
+                else:
+                    xp = x0 - self.d_ovr + self.d_ovr/(1. + ((1. - y)/y)**self.m_snap)
+
+        elif x < x1:
+            y = x - math.floor(x)
+
+            if y == 0:
+                xp = math.floor(x)
+            else:
+                xp = math.floor(x) + 1/(1. + ((1. - y)/y)**self.m_snap)
+
+        else:
+            if self.m_snap == 1:
+                if self.d_ovr > 0:
+                    y = x - x1
+                    y = self.d_ovr*(1 / (1 + y/self.d_ovr) - 1)
+                    xp = x1 - y
+                else:
+                    xp = x1
+            else:
+                y = min(1, max(0, x - x1))
+
+                if y == 0:
+                    xp = x1
+                else:
+                    xp = x1 + self.d_ovr/(1. + ((1. - y)/y)**self.m_snap)
+
+        if not silent:
+            if self.last_x_output is not None and self.last_t is not None:
+                dx = xp - self.last_x_output
+                dt = t - self.last_t
+                self.last_p_output = dx / dt
+            self.last_x_output = xp
+            self.last_t = t
+
+        conf_griddebug()
+        return xp
+
+    def final(self, throw_dist_max: Optional[float]=None) -> tuple[int, float]:
+        if throw_dist_max is None:
+            throw_dist_max = 1. - conf_min_dist()
+
+        if self.last_x_output is None:
+            return round(self.at(self.xi)), 0.
+
+        x0, x1 = self._get_bounds(self.last_x_output)
+
+        x_base = self.last_x_output
+        p = 0.
+        if self.last_p is not None:
+            p = self.last_p
+
+        x_finals = [round(x_base)]
+        if p > 0:
+            if x_finals[0] > x_base:
+                x_finals += [round(x_base)]
+
+            x = x_finals[0] + 1
+            while x < x_base + throw_dist_max:
+                x_finals += [x]
+                x += 1
+
+        elif p < 0:
+            if x_finals[0] < x_base:
+                x_finals += [round(x_base)]
+
+            x = x_finals[0] - 1
+            while x > x_base - throw_dist_max:
+                x_finals = x_finals + [x]
+                x -= 1
+
+        ifinal = 0
+        while ifinal < len(conf_throw_ps()):
+            if abs(p) < conf_throw_ps()[ifinal]:
+                break
+            ifinal += 1
+        xf = round(x_finals[min(ifinal, len(x_finals) - 1)])
+
+        xf = min(x1, max(x0, round(xf)))
+        dx = abs(self.last_x_output - xf)
+        dt = dx * conf_time_scale()
+
+        compare_t = abs(x_base - xf) / max(abs(p), 0.01)
+        if compare_t < dt:
+            dt = compare_t
+
+        return xf, dt
+
+
+def _close(a: float, b: float) -> bool:
+    return math.isclose(a, b, rel_tol=1e-12, abs_tol=1e-12)
+
+
+def check(seed: int) -> None:
+    """
+    Random grid and gesture trace (random walk sampled at ~60Hz with jitter)
+    """
+    rnd = random.Random(seed)
+    x0 = rnd.randint(-5, 5)
+    x1 = x0 + rnd.randint(0, 6)
+    xi = rnd.uniform(x0 - 2, x1 + 2)
+    d_ovr = rnd.choice([0., .1, .2])
+    m_snap = rnd.choice([1, 1, 2, 3])
+
+    ts = [0.]
+    ref = ReferenceGrid(x0, x1, xi, d_ovr, m_snap, lambda: ts[0])
+    grid = Grid("check", x0, x1, xi, d_ovr, m_snap)
+
+    x = xi
+    for _ in range(rnd.randint(0, 60)):
+        ts[0] += rnd.uniform(.01, .03)
+        x += rnd.gauss(0, .15)
+        a, b = ref.at(x), grid.at(x, ts=ts[0])
+        assert _close(a, b), (seed, x, a, b)
+
+    throw_dist_max = rnd.choice([None, 1.5, 3.])
+    (fa, ta), (fb, tb) = ref.final(throw_dist_max), grid.final(throw_dist_max)
+    assert fa == fb and _close(ta, tb), (seed, fa, ta, fb, tb)
+
+
+def fling(seed: int, v: float, predict: bool) -> tuple[int, float]:
+    """
+    Finger moving at v tiles per second, sampled at 60Hz with jitter (timing and position), released at
+    .3 past a tile - only the noise differs between seeds
+    """
+    rnd = random.Random(seed)
+    conf_fling_deceleration.update(None if predict else 0.)
+    grid = Grid("fling", -10, 10, 0, .2, 1)
+
+    ts = [0.]
+    for _ in range(11):
+        ts += [ts[-1] + rnd.uniform(.012, .022)]
+    for t in ts:
+        grid.at(.3 - v * (ts[-1] - t) + rnd.gauss(0, .01), ts=t)
+    return grid.final(throw_dist_max=3.)
+
+
+if __name__ == '__main__':
+    conf_fling_deceleration.update(0.)
+    for seed in range(TRACES):
+        check(seed)
+    print("%d random traces: at / final match the previous implementation" % TRACES)
+    conf_fling_deceleration.update(None)
+
+    for v in [.5, 2., 4., 8.]:
+        for predict in [False, True]:
+            res = [fling(seed, v, predict) for seed in range(200)]
+            landings = Counter(x for x, _ in res)
+            print("Fling %4.1f tiles/s, %-10s: landing tiles %-30s mean settle time %5.3fs" % (
+                v, "prediction" if predict else "step table", dict(sorted(landings.items())),
+                sum(t for _, t in res) / len(res)))
+
+    clock = [0.]
+    refs = [ReferenceGrid(-3, 3, .2, .1, 3, time.time) for _ in range(4)]
+    grids = Grids(*[Grid("bench", -3, 3, .2, .1, 3) for _ in range(4)])
+
+    def per_axis() -> None:
+        for r in refs:
+            r.at(.37)
+
+    def combined() -> None:
+        clock[0] += .016
+        grids.at(.37, .37, .37, .37, ts=clock[0])
+
+    t_ref = timeit.timeit(per_axis, number=N) / N
+    t_new = timeit.timeit(combined, number=N) / N
+    print("Resize update (4 axes): previous %7.2fus, Grids.at %7.2fus" % (1e6 * t_ref, 1e6 * t_new))
+
+    xs = [random.uniform(-4, 4) for _ in range(100000)]
+    grid = Grid("bench", -3, 3, .2, .1, 3)
+    t_loop = timeit.timeit(lambda: [refs[0].at(x, silent=True) for x in xs], number=3) / 3
+    t_batch = timeit.timeit(lambda: grid.snap_all(xs), number=3) / 3
+    print("%d inputs: previous at loop %7.2fms, snap_all %7.2fms" % (len(xs), 1e3 * t_loop, 1e3 * t_batch))
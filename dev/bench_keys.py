@@ -0,0 +1,48 @@
+"""
+Benchmark KeyProcessor per-keystroke cost for increasing numbers of bindings (should stay constant)
+
+Run from repo root: python dev/bench_keys.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from pywm import PyWMModifiers, PYWM_MOD_LOGO
+from newm.key_processor import KeyProcessor
+
+N = 20000
+
+def bindings(n: int) -> list[tuple[str, object]]:
+    """
+    Generated workspace / app style bindings plus some chords
+    """
+    mods = ["L-", "L-S-", "L-C-", "L-A-", "L-S-C-"]
+    keys = [chr(c) for c in range(ord('a'), ord('z') + 1)] + ["%d" % i for i in range(10)] + ["F%d" % i for i in range(1, 13)]
+    res: list[tuple[str, object]] = []
+    i = 0
+    while len(res) < n:
+        m = mods[i % len(mods)]
+        k = keys[(i // len(mods)) % len(keys)]
+        chord = i // (len(mods) * len(keys))
+        res += [("%s%s" % (m, k) if chord == 0 else "L-%s %s%s" % (keys[chord], m, k), lambda: None)]
+        i += 1
+    return res
+
+if __name__ == '__main__':
+    logo = PyWMModifiers(PYWM_MOD_LOGO)
+
+    for n in [10, 100, 500]:
+        kp = KeyProcessor()
+        kp.register_bindings(*bindings(n))
+
+        def keystroke() -> None:
+            # Press and release an unbound and a bound key
+            kp.on_key(True, "Return", logo, False)
+            kp.on_key(False, "Return", logo, False)
+            kp.on_key(True, "a", logo, False)
+            kp.on_key(False, "a", logo, False)
+
+        t = timeit.timeit(keystroke, number=N) / N / 4.
+        print("%4d bindings: %8.3fus per key event" % (n, 1e6 * t))
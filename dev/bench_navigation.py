@@ -0,0 +1,63 @@
+"""
+Benchmark directional focus (Layout.move) and focus successor (Layout.destroy_view) queries against a
+linear scan over all views, on a square canvas of 1x1 and 2x1 tiles
+
+Run from repo root: python dev/bench_navigation.py
+"""
+import os
+import sys
+import math
+import random
+import timeit
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from newm.spatial import ViewIndex, score_direction
+
+N = 2000
+
+Box = tuple[int, float, float, float, float]
+
+def canvas(n: int) -> list[Box]:
+    random.seed(n)
+    side = math.ceil(math.sqrt(n))
+    return [(k, k % side, k // side, random.choice([1, 1, 2]), 1) for k in range(n)]
+
+def scan_direction(boxes: list[Box], box: tuple[float, float, float, float], im: int, jm: int) -> Optional[int]:
+    best, best_score = None, 1000.
+    for h, i, j, w, hh in boxes:
+        sc = score_direction(*box, im, jm, i, j, w, hh)
+        if sc < best_score:
+            best, best_score = h, sc
+    return best
+
+def scan_nearest(boxes: list[Box], ci: float, cj: float, exclude: int) -> Optional[int]:
+    best, best_score = None, 1000.
+    for h, i, j, w, hh in boxes:
+        if h == exclude:
+            continue
+        sc = (i + w / 2. - ci) ** 2 + (j + hh / 2. - cj) ** 2
+        if sc < best_score:
+            best, best_score = h, sc
+    return best
+
+if __name__ == '__main__':
+    for n in [20, 200, 2000]:
+        boxes = canvas(n)
+        index = ViewIndex(boxes)
+        focused = boxes[n // 2]
+        box = focused[1:]
+        ci, cj = box[0] + box[2] / 2., box[1] + box[3] / 2.
+
+        for d in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            assert index.in_direction(box, *d) == scan_direction(boxes, box, *d)
+        assert index.nearest(ci, cj, focused[0], 1000.) == scan_nearest(boxes, ci, cj, focused[0])
+
+        t_scan = timeit.timeit(lambda: scan_direction(boxes, box, 1, 0), number=N) / N
+        t_index = timeit.timeit(lambda: index.in_direction(box, 1, 0), number=N) / N
+        t_scan_n = timeit.timeit(lambda: scan_nearest(boxes, ci, cj, focused[0]), number=N) / N
+        t_index_n = timeit.timeit(lambda: index.nearest(ci, cj, focused[0], 1000.), number=N) / N
+        t_build = timeit.timeit(lambda: ViewIndex(boxes), number=20) / 20
+        print("%4d views: move scan %8.2fus index %6.2fus, nearest scan %8.2fus index %6.2fus, build %8.2fus" % (
+            n, 1e6 * t_scan, 1e6 * t_index, 1e6 * t_scan_n, 1e6 * t_index_n, 1e6 * t_build))
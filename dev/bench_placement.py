@@ -0,0 +1,71 @@
+"""
+Benchmark initial tile placement (free w x h rectangle inside the viewport) against the per-tile scan
+over all view states, for increasing numbers of views
+
+Run from repo root: python dev/bench_placement.py
+"""
+import os
+import sys
+import math
+import random
+import timeit
+from itertools import product
+from typing import Any, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from newm.state import WorkspaceState
+
+N = 20
+
+class _View:
+    def __init__(self, handle: int) -> None:
+        self._handle = handle
+
+def scan(ws_state: WorkspaceState, w: int, h: int) -> Optional[tuple[int, int]]:
+    """
+    Previous implementation of Layout.place_initial
+    """
+    i, j = ws_state.i, ws_state.j
+    for j, i in product(
+        range(math.floor(j), math.ceil(j + ws_state.size)),
+        range(math.floor(i), math.ceil(i + ws_state.size)),
+    ):
+        for jp, ip in product(range(j, j + h), range(i, i + w)):
+            if not ws_state.is_tile_free(ip, jp):
+                break
+        else:
+            return i, j
+    return None
+
+def indexed(ws_state: WorkspaceState, w: int, h: int) -> Optional[tuple[int, int]]:
+    return ws_state.occupancy().find_free(
+        math.floor(ws_state.i), math.floor(ws_state.j),
+        math.ceil(ws_state.i + ws_state.size) - 1, math.ceil(ws_state.j + ws_state.size) - 1,
+        w, h)
+
+def workspace(n: int, size: int, packed: bool) -> WorkspaceState:
+    """
+    Random views on a square canvas, or views packed row by row (no free space in the viewport)
+    """
+    random.seed(n)
+    ws_state = WorkspaceState(Any, i=0, j=0, size=size)
+    side = math.ceil(math.sqrt(n * 1.1))
+    for k in range(n):
+        if packed:
+            ws_state.with_view_state(_View(k), i=k % side, j=k // side, w=1, h=1)
+        else:
+            ws_state.with_view_state(_View(k), i=random.randrange(side), j=random.randrange(side),
+                                     w=random.choice([1, 1, 2]), h=random.choice([1, 1, 2]))
+    return ws_state
+
+if __name__ == '__main__':
+    for n in [10, 100, 500]:
+        for size, packed in [(4, False), (16, False), (4, True), (16, True)]:
+            ws_state = workspace(n, size, packed)
+            assert scan(ws_state, 2, 2) == indexed(ws_state, 2, 2)
+
+            t_scan = timeit.timeit(lambda: scan(ws_state, 2, 2), number=N) / N
+            t_indexed = timeit.timeit(lambda: indexed(ws_state, 2, 2), number=N) / N
+            print("%4d views (%s), viewport %2dx%2d: scan %9.3fms, indexed %7.3fms" % (
+                n, "packed" if packed else "random", size, size, 1e3 * t_scan, 1e3 * t_indexed))
@@ -0,0 +1,58 @@
+"""
+Check that RuleTable (dict lookup for literal app_ids, one combined regular expression for the rest) finds the same
+entry as matching every entry on its own - including anchored patterns, lookarounds, backreferences and values
+containing newlines
+
+Run from repo root: python dev/check_rules.py
+"""
+import os
+import sys
+import itertools
+from typing import Any, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from newm.rules import RuleTable
+
+TABLE: list[dict[str, Any]] = [
+    {'app_id': '^firefox$', 'title': '.*Private.*', 'rule': 'anchored private'},
+    {'app_id': 'firefox', 'title': 'Picture-in-Picture', 'rule': 'literal pip'},
+    {'app_id': '^firefox$', 'rule': 'anchored'},
+    {'app_id': 'Alacritty', 'title': '.*vim$', 'rule': 'vim'},
+    {'app_id': 'org\\.gnome\\..*', 'title': '[^/]*', 'rule': 'gnome no slash'},
+    {'app_id': '(?=mpv).*', 'rule': 'lookahead'},
+    {'app_id': '(a)\\1.*', 'rule': 'backreference'},
+    {'app_id': '(?i)steam', 'rule': 'global flag'},
+    {'title': '\\Afoo.*', 'rule': 'title A'},
+    {'title': 'multi\nline', 'rule': 'newline title'},
+    {'role': 'dialog', 'rule': 'dialog'},
+    {'app_id': '.*', 'title': '.*', 'role': '.*', 'rule': 'catch-all'},
+]
+
+APP_IDS = ['firefox', 'Firefox', 'Alacritty', 'org.gnome.Nautilus', 'mpv', 'aa', 'aab', 'Steam', 'STEAM', 'x', '']
+TITLES = ['T', 'Private Browsing', 'Picture-in-Picture', 'nvim', 'vim', 'a/b', 'foo', 'xfoo', 'multi\nline',
+          'two\nlines', '']
+ROLES = ['toplevel', 'dialog', '']
+
+
+def expected(app_id: str, title: str, role: str) -> Optional[dict[str, Any]]:
+    for i in range(len(table)):
+        if table._matches(i, app_id, title, role):
+            return table._rules[i]
+    return None
+
+
+if __name__ == '__main__':
+    table = RuleTable(TABLE)
+    assert table._combined is not None
+    print("%d entries, %d in dict, %d combined, %d one by one" % (
+        len(table), sum(len(v) for v in table._by_app_id.values()), len(table._regex_idx) - len(table._single_idx),
+        len(table._single_idx)))
+
+    n = 0
+    for app_id, title, role in itertools.product(APP_IDS, TITLES, ROLES):
+        res = table.match(app_id, title, role)
+        exp = expected(app_id, title, role)
+        assert res == exp, (app_id, title, role, res, exp)
+        n += 1
+    print("Combined and per-entry matching agree on %d (app_id, title, role) combinations" % n)
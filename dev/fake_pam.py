@@ -0,0 +1,108 @@
+"""
+Fake PAM (fail delay like pam_faildelay) plugged into the PAM auth backend:
+
+- enter_cred returns immediately, also while a failed attempt is being delayed
+- a newer credential supersedes the one being checked
+- consecutive failures are delayed exponentially, success resets the backoff
+- superseded failures count as well, resubmitting while a check is running does not skip the backoff
+
+Run from repo root: python dev/fake_pam.py
+"""
+import os
+import sys
+import time
+from threading import Event
+from typing import Any, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from newm.auth_backend import _PAMBackend, conf_backoff, conf_backoff_max
+
+PASSWORD = "secret"
+FAIL_DELAY = .4
+
+
+class FakePAM:
+    def __init__(self) -> None:
+        self.calls: list[tuple[float, str]] = []
+
+    def authenticate(self, user: str, cred: str) -> bool:
+        self.calls += [(time.time(), cred)]
+        if cred == PASSWORD:
+            return True
+        time.sleep(FAIL_DELAY)
+        return False
+
+
+class FakeAuth:
+    def __init__(self) -> None:
+        self.results: list[tuple[float, bool]] = []
+        self.requests = 0
+        self.changed = Event()
+
+    def _request_cred(self, message: Optional[str]=None, for_user: Optional[str]=None) -> None:
+        self.requests += 1
+
+    def _auth_result(self, successful: bool) -> None:
+        self.results += [(time.time(), successful)]
+        self.changed.set()
+
+    def wait(self, n: int) -> None:
+        t = time.time()
+        while len(self.results) < n and time.time() - t < 10.:
+            self.changed.wait(.1)
+            self.changed.clear()
+        assert len(self.results) >= n, self.results
+
+
+if __name__ == '__main__':
+    conf_backoff.update(.2)
+    conf_backoff_max.update(.8)
+
+    pam = FakePAM()
+    auth = FakeAuth()
+    backend = _PAMBackend(auth, pam.authenticate)  # type: ignore
+    backend.init_auth("alice")
+
+    t = time.time()
+    backend.enter_cred("wrong")
+    print("enter_cred returned after %.2fms (fail delay %.1fs)" % (1e3 * (time.time() - t), FAIL_DELAY))
+
+    time.sleep(.1)
+    backend.enter_cred(PASSWORD)
+    auth.wait(1)
+    time.sleep(FAIL_DELAY)
+    assert [r for _, r in auth.results] == [True], auth.results
+    print("Superseded attempt dropped, results: %s" % [r for _, r in auth.results])
+
+    auth.results = []
+    t = time.time()
+    for i in range(5):
+        backend.enter_cred("wrong")
+        auth.wait(i + 1)
+    starts = [c for c, cred in pam.calls[-5:]]
+    gaps = [b - a - FAIL_DELAY for a, b in zip(starts, starts[1:])]
+    assert all(g2 >= g1 - .02 for g1, g2 in zip(gaps, gaps[1:])), gaps
+    print("Delay between consecutive failed attempts: %s" % ", ".join("%.2fs" % g for g in gaps))
+
+    backend.enter_cred(PASSWORD)
+    auth.wait(6)
+    backend.enter_cred("wrong")
+    auth.wait(7)
+    t = time.time()
+    backend.enter_cred(PASSWORD)
+    auth.wait(8)
+    print("After success, first failure delays the next attempt by %.2fs" % (time.time() - t))
+
+    backend.enter_cred(PASSWORD)
+    auth.wait(9)
+    backend.enter_cred("wrong")
+    time.sleep(.1)
+    backend.enter_cred("wrong again")
+    auth.wait(10)
+    (a, _), (b, _) = pam.calls[-2:]
+    assert b - a >= FAIL_DELAY + conf_backoff() - .02, b - a
+    print("Resubmitting during a failing check still waits %.2fs after it" % (b - a - FAIL_DELAY))
+
+    conf_backoff.update(None)
+    conf_backoff_max.update(None)
@@ -0,0 +1,179 @@
+"""
+Mock greetd (create_session / post_auth_message_response / start_session / cancel_session, optional delay per
+response) and checks of GreetdClient and the greetd auth backend against it:
+
+- framed reads: responses are written in single bytes
+- pipelining: cancel_session and create_session are sent without waiting
+- a slow greetd times out without blocking the caller, the next request reconnects
+- the greeter terminates only once start_session has succeeded, a failed start is shown with the next prompt
+
+Run from repo root: python dev/mock_greetd.py
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+from threading import Thread, Event
+from typing import Any, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from newm.greetd import GreetdClient, conf_timeout
+from newm.auth_backend import _GreetdBackend
+
+PASSWORD = "secret"
+
+
+class MockGreetd(Thread):
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.daemon = True
+        self.path = path
+        self.delay = 0.
+        self.start_error: Optional[str] = None
+        self.received: list[str] = []
+        self.connections = 0
+        self._loop = asyncio.new_event_loop()
+        self._ready = Event()
+
+    async def _respond(self, writer: asyncio.StreamWriter, msg: dict[str, Any]) -> None:
+        data = json.dumps(msg).encode('utf-8')
+        for b in len(data).to_bytes(4, sys.byteorder) + data:
+            writer.write(bytes([b]))
+            await writer.drain()
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        session: Optional[str] = None
+        try:
+            while True:
+                length = int.from_bytes(await reader.readexactly(4), sys.byteorder)
+                msg = json.loads(await reader.readexactly(length))
+                self.received += [msg["type"]]
+                if self.delay > 0:
+                    await asyncio.sleep(self.delay)
+
+                if msg["type"] == "create_session":
+                    session = msg["username"]
+                    res = {"type": "auth_message", "auth_message_type": "secret", "auth_message": "Password:"}
+                elif msg["type"] == "post_auth_message_response":
+                    if session is not None and msg["response"] == PASSWORD:
+                        res = {"type": "success"}
+                    else:
+                        session = None
+                        res = {"type": "error", "error_type": "auth_error", "description": "wrong password"}
+                elif msg["type"] == "cancel_session":
+                    session = None
+                    res = {"type": "success"}
+                elif msg["type"] == "start_session":
+                    if self.start_error is not None:
+                        session = None
+                        res = {"type": "error", "error_type": "error", "description": self.start_error}
+                    else:
+                        res = {"type": "success"}
+                else:
+                    res = {"type": "error", "error_type": "error", "description": "unknown request"}
+                await self._respond(writer, res)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(asyncio.start_unix_server(self._client, path=self.path))
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start_and_wait(self) -> None:
+        self.start()
+        self._ready.wait()
+
+
+class FakeAuth:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, Any]] = []
+        self.changed = Event()
+
+    def _request_cred(self, message: Optional[str]=None, for_user: Optional[str]=None) -> None:
+        self.events += [("cred", message)]
+        self.changed.set()
+
+    def _auth_result(self, successful: bool) -> None:
+        self.events += [("result", successful)]
+        self.changed.set()
+
+    def _session_started(self) -> None:
+        self.events += [("started", None)]
+        self.changed.set()
+
+    def wait(self, n: int) -> None:
+        t = time.time()
+        while len(self.events) < n and time.time() - t < 5.:
+            self.changed.wait(.1)
+            self.changed.clear()
+        assert len(self.events) >= n, self.events
+
+
+if __name__ == '__main__':
+    path = os.path.join(tempfile.mkdtemp(), "greetd.sock")
+    server = MockGreetd(path)
+    server.start_and_wait()
+
+    client = GreetdClient(path)
+    client.start()
+    t = time.time()
+    results = [client.request_sync({"type": "cancel_session"}) for _ in range(20)]
+    assert all(r["type"] == "success" for r in results), results
+    print("20 sequential round trips (byte-wise responses): %.1fms" % (1e3 * (time.time() - t)))
+
+    os.environ["GREETD_SOCK"] = path
+    auth = FakeAuth()
+    backend = _GreetdBackend(auth)  # type: ignore
+
+    t = time.time()
+    backend.init_auth("alice")
+    t_call = time.time() - t
+    auth.wait(1)
+    assert auth.events[0] == ("cred", "Password:"), auth.events
+    assert server.received[-2:] == ["cancel_session", "create_session"], server.received
+    print("init_auth: returned after %.2fms, pipelined %s" % (1e3 * t_call, server.received[-2:]))
+
+    backend.enter_cred("wrong")
+    auth.wait(3)
+    assert auth.events[1:3] == [("result", False), ("cred", "Password:")], auth.events
+    backend.enter_cred(PASSWORD)
+    auth.wait(4)
+    assert auth.events[3] == ("result", True), auth.events
+    print("Wrong password retried with a new session, correct password accepted")
+
+    conf_timeout.update(.3)
+    server.delay = 1.
+    connections = server.connections
+    t = time.time()
+    backend.enter_cred(PASSWORD)
+    t_call = time.time() - t
+    auth.wait(5)
+    t_result = time.time() - t
+    assert auth.events[4] == ("result", False), auth.events
+    server.delay = 0.
+    auth.wait(6)
+    assert auth.events[5] == ("cred", "Password:") and server.connections > connections, auth.events
+    print("Slow greetd: enter_cred returned after %.2fms, timeout reported after %.2fs, reconnected for retry" % (
+        1e3 * t_call, t_result))
+    conf_timeout.update(None)
+
+    server.start_error = "no such command"
+    backend.enter_cred(PASSWORD)
+    auth.wait(7)
+    assert auth.events[6] == ("result", True), auth.events
+    backend.start_session()
+    auth.wait(8)
+    assert auth.events[7] == ("cred", "Could not start session: no such command - Password:"), auth.events
+    server.start_error = None
+    backend.enter_cred(PASSWORD)
+    auth.wait(9)
+    backend.start_session()
+    auth.wait(10)
+    assert auth.events[8:10] == [("result", True), ("started", None)], auth.events
+    print("Failed start_session shown with the next prompt, greeter terminated only after start_session succeeded")
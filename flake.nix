@@ -69,7 +69,6 @@
             pywm
 
             pycairo
-            psutil
             python-pam
             pyfiglet
             dasbus
@@ -87,7 +86,6 @@
           pywm
 
           pycairo
-          psutil
           python-pam
           pyfiglet
           dasbus
@@ -1,5 +1,12 @@
 from __future__ import annotations
+from typing import Any
 
 from .run import run
 from .cmd import cmd
-from .dbus import connect_to_auth
+
+def __getattr__(name: str) -> Any:
+    # Only panels need connect_to_auth - avoid loading dasbus on startup of newm itself
+    if name == "connect_to_auth":
+        from .dbus import connect_to_auth
+        return connect_to_auth
+    raise AttributeError("module %s has no attribute %s" % (__name__, name))
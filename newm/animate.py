@@ -63,3 +63,66 @@ class Animate(Generic[StateT]):
     @abstractmethod
     def _anim_damage(self) -> None:
         pass
+
+class Tween:
+    """
+    Values moving towards a target, evaluated on the frame clock (see Overlay.on_frame) instead of a separate
+    thread. Retargeting while running starts from the current values, so there are no jumps
+
+    Linear, unless started with initial velocities (e.g. of a fling, see Grid.fling) - then a cubic Hermite
+    curve which starts at that velocity and comes to rest at the target
+    """
+    def __init__(self) -> None:
+        self._initial: tuple[float, ...] = ()
+        self._final: tuple[float, ...] = ()
+        self._velocity: Optional[tuple[float, ...]] = None
+        self._start = 0.
+        self._end = 0.
+        self._running = False
+
+    def running(self) -> bool:
+        return self._running
+
+    def target(self) -> Optional[tuple[float, ...]]:
+        return self._final if self._running else None
+
+    def start(self, initial: tuple[float, ...], final: tuple[float, ...], duration: float, now: Optional[float]=None,
+              velocity: Optional[tuple[float, ...]]=None) -> None:
+        now = time.time() if now is None else now
+        self._initial, self._final = initial, final
+        self._start, self._end = now, now + duration
+        self._running = True
+
+        self._velocity = None
+        if velocity is not None:
+            # Initial slope (per unit of progress) between zero and twice the distance - no overshoot
+            self._velocity = tuple([max(0., min(2., v * duration / (b - a))) * (b - a) if b != a else 0.
+                                    for a, b, v in zip(initial, final, velocity)])
+
+    def retarget(self, current: tuple[float, ...], final: tuple[float, ...], duration: float, now: Optional[float]=None) -> None:
+        """
+        current is only used if not running
+        """
+        now = time.time() if now is None else now
+        if self._running:
+            if final == self._final:
+                return
+            current, _ = self.get(now)
+        self.start(current, final, duration, now)
+
+    def stop(self) -> None:
+        self._running = False
+
+    def get(self, now: float) -> tuple[tuple[float, ...], bool]:
+        """
+        Values at now and whether the target has been reached (which stops the tween)
+        """
+        if now >= self._end:
+            self._running = False
+            return self._final, True
+        perc = max(0., (now - self._start) / (self._end - self._start))
+        if self._velocity is not None:
+            h01 = perc * perc * (3. - 2. * perc)
+            h10 = perc * (1. - perc) ** 2
+            return tuple(a + h01 * (b - a) + h10 * m for a, b, m in zip(self._initial, self._final, self._velocity)), False
+        return tuple(a + perc * (b - a) for a, b in zip(self._initial, self._final)), False
@@ -1,15 +1,12 @@
 from __future__ import annotations
-from typing import Optional, Any, TYPE_CHECKING
+from typing import Optional, Any, Callable, TYPE_CHECKING, cast
 
 import os
+import time
 import logging
-import pam # type: ignore
-import sys
-import socket
-import json
+from threading import Lock, Thread, Condition
 
 from .config import configured_value
-from .dbus import AuthRequest
 
 if TYPE_CHECKING:
     from .layout import Layout
@@ -17,6 +14,8 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 conf_greeter_user = configured_value('greeter_user', 'greeter')
+conf_backoff = configured_value('auth.backoff', .5)
+conf_backoff_max = configured_value('auth.backoff_max', 8.)
 
 class _Backend:
     def init_auth(self, user: str) -> None:
@@ -27,18 +26,98 @@ class _Backend:
         pass
 
 
+class _PAMWorker(Thread):
+    """
+    Runs authenticate (pam.authenticate - blocks, on failure usually for seconds because of pam_faildelay) off the
+    D-Bus thread
+
+    Only the newest credential is kept: one entered while another is pending replaces it, one entered while another
+    is being checked makes the result of that check irrelevant (authenticate itself can not be interrupted). After
+    consecutive failures, attempts are delayed exponentially (auth.backoff doubling up to auth.backoff_max)
+    """
+    def __init__(self, authenticate: Callable[[str, str], bool], on_result: Callable[[bool], None]) -> None:
+        super().__init__()
+        self.daemon = True
+        self._authenticate = authenticate
+        self._on_result = on_result
+
+        self._cond = Condition()
+        self._pending: Optional[tuple[str, str]] = None
+        self._generation = 0
+        self._failures = 0
+        self._next_attempt = 0.
+
+        self._running = True
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def submit(self, user: str, cred: str) -> None:
+        with self._cond:
+            self._pending = (user, cred)
+            self._generation += 1
+            self._cond.notify()
+
+    def _backoff(self) -> float:
+        if self._failures == 0:
+            return 0.
+        return min(conf_backoff() * 2**(self._failures - 1), conf_backoff_max())
+
+    def run(self) -> None:
+        while True:
+            with self._cond:
+                while self._running and (self._pending is None or time.time() < self._next_attempt):
+                    self._cond.wait(None if self._pending is None else self._next_attempt - time.time())
+                if not self._running:
+                    return
+                assert self._pending is not None
+                (user, cred), self._pending = self._pending, None
+                generation = self._generation
+
+            try:
+                res = self._authenticate(user, cred)
+            except Exception:
+                logger.exception("PAM")
+                res = False
+
+            with self._cond:
+                # Also for superseded attempts - otherwise resubmitting while checking would skip the backoff
+                self._failures = 0 if res else self._failures + 1
+                self._next_attempt = time.time() + self._backoff()
+                if generation != self._generation:
+                    logger.debug("PAM Backend: Dropping result of superseded attempt")
+                    continue
+
+            self._on_result(res)
+
+
 class _PAMBackend(_Backend):
-    def __init__(self, auth: AuthBackend) -> None:
+    def __init__(self, auth: AuthBackend, authenticate: Optional[Callable[[str, str], bool]]=None) -> None:
+        """
+        authenticate: (user, cred) -> success, defaults to python-pam - to be replaced for tests
+        """
+        if authenticate is None:
+            import pam # type: ignore
+            authenticate = pam.pam().authenticate
+
         self.auth = auth
-        self._pam = pam.pam()
         self._user: Optional[str] = None
+        self._worker = _PAMWorker(cast(Callable[[str, str], bool], authenticate), self._on_result)
+        self._worker.start()
 
     def init_auth(self, user: str) -> None:
         self._user = user
         self.auth._request_cred("Password?", user)
 
     def enter_cred(self, cred: str) -> None:
-        res = self._pam.authenticate(self._user, cred)
+        if self._user is None:
+            logger.warn("Credentials without user")
+            return
+        self._worker.submit(self._user, cred)
+
+    def _on_result(self, res: bool) -> None:
         logger.debug("PAM Backend: %ssuccessful" % ("" if res else "not "))
         self.auth._auth_result(res)
         if not res and self._user is not None:
@@ -49,71 +128,72 @@ class _PAMBackend(_Backend):
 
 
 class _GreetdBackend(_Backend):
+    """
+    Requests are answered on the GreetdClient thread - a slow greetd does not block the D-Bus thread
+    """
     def __init__(self, auth: AuthBackend) -> None:
+        from .greetd import GreetdClient
+
         self.auth = auth
         self._user: Optional[str] = None
-        self._socket: Optional[socket.socket] = None
+        self._client = GreetdClient()
+        self._client.start()
 
-    def _open_socket(self) -> None:
-        if "GREETD_SOCK" not in os.environ:
-            logger.error("Not in a greetd session")
-            return
-
-        greetd_sock = os.environ["GREETD_SOCK"]
-        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        self._socket.connect(greetd_sock)
+        # Shown along with the next prompt
+        self._error: Optional[str] = None
 
-        logger.debug("Connected to greetd")
-
-    def _send(self, msg: Any) -> dict[str, Any]:
-        if self._socket is None:
-            self._open_socket()
-        if self._socket is None:
-            return {}
+    def _on_result(self, result: dict[str, Any], retry: bool) -> None:
+        if result["type"] == "auth_message":
+            message = result["auth_message"]
+            if self._error is not None:
+                message, self._error = "%s - %s" % (self._error, message), None
+            self.auth._request_cred(message, self._user)
+            return
 
-        msg_str = json.dumps(msg).encode('utf-8')
-        msg_str = len(msg_str).to_bytes(4, sys.byteorder) + msg_str
-        self._socket.send(msg_str)
+        if result["type"] == "error":
+            logger.debug("greetd: %s" % result.get("description", None))
+        self.auth._auth_result(result["type"] == "success")
 
-        resp_len = int.from_bytes(self._socket.recv(4), sys.byteorder)
-        resp = self._socket.recv(resp_len).decode("utf-8")
-        return json.loads(resp)
+        # greetd requires a new session after a failed attempt
+        if result["type"] == "error" and retry and self._user is not None:
+            self.init_auth(self._user)
 
     def init_auth(self, user: str) -> None:
         self._user = user
 
-        result = self._send({"type":"cancel_session"})
-        result = self._send({"type":"create_session", "username": user})
-
-        if result["type"] == "auth_message":
-            self.auth._request_cred(result["auth_message"], self._user)
+        # Pipelined - the result of cancel_session is irrelevant
+        self._client.request({"type": "cancel_session"})
+        self._client.request({"type": "create_session", "username": user}, lambda r: self._on_result(r, False))
 
     def enter_cred(self, cred: str) -> None:
-        result = self._send({"type":"post_auth_message_response", "response": cred})
-        if result["type"] == "auth_message":
-            self.auth._request_cred(result["auth_message"], self._user)
-        else:
-            self.auth._auth_result(result["type"] == "success")
+        self._client.request({"type": "post_auth_message_response", "response": cred}, lambda r: self._on_result(r, True))
 
     def start_session(self) -> None:
-        self._send({"type": "start_session", "cmd": ["start-newm"]})
+        """
+        The greeter must stay connected until greetd has answered - otherwise the session is never started
+        """
+        def on_started(result: dict[str, Any]) -> None:
+            if result["type"] == "success":
+                self.auth._session_started()
+                return
+
+            self._error = "Could not start session: %s" % result.get("description", None)
+            logger.error("greetd: %s" % self._error)
+            if self._user is not None:
+                self.init_auth(self._user)
+        self._client.request({"type": "start_session", "cmd": ["start-newm"]}, on_started)
 
 
 class AuthBackend:
     def __init__(self, layout: Layout) -> None:
         self.layout = layout
-        self._users: list[tuple[str, int, str, bool]] = []
-        greeter_user = conf_greeter_user()
-        with open('/etc/passwd', 'r') as pwd:
-            for user in pwd:
-                u = user.split(":")
-                if "nologin" not in u[6] or u[0] == greeter_user:
-                    self._users += [(u[0], int(u[2]), u[6], u[0] == greeter_user)] # name, uid, login shell, is_greeter
-
-        if len([g for g in self._users if g[3]]) == 0:
-            logger.warn("Could not find greeter: %s", greeter_user)
-        if len([g for g in self._users if g[1] == os.getuid()]) == 0:
-            logger.error("Fatal! Could not find current user")
+
+        """
+        Users and backend are loaded on first use (or in the background after startup) - see init
+        """
+        self._init_lock = Lock()
+        self._users_: Optional[list[tuple[str, int, str, bool]]] = None
+        self._backend_: Optional[_Backend] = None
 
         """
         initial
@@ -123,7 +203,70 @@ class AuthBackend:
         self._state = "initial"
         self._waiting_cred: dict[str, Any] = {}
 
-        self._backend: _Backend = _GreetdBackend(self) if self.is_greeter() else _PAMBackend(self)
+        """
+        Latest request made before the D-Bus endpoint is up (e.g. lock from on_startup) - see publish_pending
+        """
+        self._publish_lock = Lock()
+        self._pending_request: Optional[tuple[dict[str, Any], Callable[[dict[str, Any]], None]]] = None
+
+    def init(self) -> None:
+        with self._init_lock:
+            if self._users_ is not None:
+                return
+
+            users: list[tuple[str, int, str, bool]] = []
+            greeter_user = conf_greeter_user()
+            with open('/etc/passwd', 'r') as pwd:
+                for user in pwd:
+                    u = user.split(":")
+                    if "nologin" not in u[6] or u[0] == greeter_user:
+                        users += [(u[0], int(u[2]), u[6], u[0] == greeter_user)] # name, uid, login shell, is_greeter
+
+            if len([g for g in users if g[3]]) == 0:
+                logger.warn("Could not find greeter: %s", greeter_user)
+            if len([g for g in users if g[1] == os.getuid()]) == 0:
+                logger.error("Fatal! Could not find current user")
+
+            self._users_ = users
+            self._backend_ = _GreetdBackend(self) if self.is_greeter() else _PAMBackend(self)
+
+    @property
+    def _users(self) -> list[tuple[str, int, str, bool]]:
+        if self._users_ is None:
+            self.init()
+        return cast(list[tuple[str, int, str, bool]], self._users_)
+
+    @property
+    def _backend(self) -> _Backend:
+        if self._backend_ is None:
+            self.init()
+        return cast(_Backend, self._backend_)
+
+    def _publish_auth_request(self, msg: dict[str, Any], callback: Callable[[dict[str, Any]], None]) -> None:
+        from .dbus import AuthRequest
+
+        with self._publish_lock:
+            if self.layout.dbus_endpoint is None:
+                logger.debug("Auth request before D-Bus endpoint is up - queueing")
+                self._pending_request = (msg, callback)
+                return
+
+            # Superseded
+            self._pending_request = None
+        self.layout.dbus_endpoint.publish_auth_request(AuthRequest(msg, callback))
+
+    def publish_pending(self) -> None:
+        """
+        To be called once the D-Bus endpoint is set up
+        """
+        from .dbus import AuthRequest
+
+        with self._publish_lock:
+            pending, self._pending_request = self._pending_request, None
+            if pending is None or self.layout.dbus_endpoint is None:
+                return
+            logger.debug("Publishing queued auth request")
+            self.layout.dbus_endpoint.publish_auth_request(AuthRequest(*pending))
 
     def is_greeter(self) -> bool:
         user = [u for u in self._users if u[1] == os.getuid()]
@@ -137,10 +280,10 @@ class AuthBackend:
 
         possible_users = [u for u in self._users if not u[3]]
         logger.debug("Requesting user")
-        self.layout.dbus_endpoint.publish_auth_request(AuthRequest({
+        self._publish_auth_request({
             'kind': 'auth_request_user',
             'users': [u[0] for u in possible_users]
-            }, self._on_user))
+            }, self._on_user)
 
     def lock(self) -> None:
         current_user = [u for u in self._users if u[1] == os.getuid()]
@@ -171,8 +314,7 @@ class AuthBackend:
             }
 
         logger.debug("Requesting credentials")
-        self.layout.dbus_endpoint.publish_auth_request(
-                AuthRequest(self._waiting_cred, self._on_cred))
+        self._publish_auth_request(self._waiting_cred, self._on_cred)
         self._state = "wait_cred"
 
     def _auth_result(self, successful: bool) -> None:
@@ -189,7 +331,10 @@ class AuthBackend:
         if self.is_greeter():
             logger.debug("starting session after successful verification")
             self._backend.start_session()
-            self.layout.terminate()
         else:
             logger.debug("unlocking after successful verification")
             self.layout._trusted_unlock()
+
+    def _session_started(self) -> None:
+        logger.debug("session started - terminating greeter")
+        self.layout.terminate()
@@ -1,23 +1,49 @@
 from __future__ import annotations
+from typing import Any, Optional
 
+import sys
 import time
 
-from .dbus import send_dbus_command
+
+def send_command(args: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """
+    Unix socket if available (no bus connection per call), D-Bus otherwise
+    """
+    from .ipc import send_ipc_command
+    result = send_ipc_command(args)
+    if result is not None:
+        return result
+
+    from .dbus import send_dbus_command
+    return send_dbus_command(args)
 
 
 def cmd(command: str, *args: str) -> None:
     if command == "inhibit-idle":
         try:
-            send_dbus_command({"cmd": "inhibit-idle"})
+            send_command({"cmd": "inhibit-idle"})
             while True:
                 time.sleep(10)
         except:
             pass
         finally:
-            send_dbus_command({"cmd": "finish-inhibit-idle"})
+            send_command({"cmd": "finish-inhibit-idle"})
+    elif command == "batch":
+        commands = []
+        for line in sys.stdin:
+            if len(line.strip()) == 0:
+                continue
+            c, *a = line.split(maxsplit=1)
+            commands += [{"cmd": c, "arg": a[0].strip() if len(a) > 0 else None}]
+        result = send_command({"cmd": "batch", "commands": commands})
+        if result is not None and "results" in result:
+            for r in result["results"]:
+                print(r.get("msg", r.get("exception", None)))
+        elif result is not None and "msg" in result:
+            print(result["msg"])
     elif command == "launcher":
-        send_dbus_command({"cmd": "launcher", "app": " ".join(args)})
+        send_command({"cmd": "launcher", "app": " ".join(args)})
     else:
-        result = send_dbus_command({"cmd": command, "arg": " ".join(args)})
+        result = send_command({"cmd": command, "arg": " ".join(args)})
         if result is not None and "msg" in result:
             print(result["msg"])
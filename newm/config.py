@@ -2,14 +2,30 @@ from __future__ import annotations
 from typing import TypeVar, Optional, Callable, Any, Generic, Union, cast
 
 import pathlib
-import importlib
+import importlib.util
 import logging
 import sys
 import os
+from types import FunctionType
 
 _provider = {}
 _consumer: dict[str, Any] = {}
 
+"""
+Path of the config file which is currently active
+"""
+_path: Optional[pathlib.Path] = None
+
+"""
+Helper modules imported by the active config - see _forget_modules
+"""
+_config_modules: set[str] = set()
+
+"""
+Incremented whenever a configured value changes - used to invalidate snapshots
+"""
+_version = 0
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,8 +38,10 @@ class _ConfiguredValue(Generic[T]):
 
         self.update(value)
 
-    def update(self, value: T) -> None:
+    def update(self, value: T) -> bool:
+        old = self._value
         self._value = value if value is not None else self._default
+        return not _equal(old, self._value)
 
     def __call__(self) -> Optional[T]:
         return self._value
@@ -31,16 +49,70 @@ class _ConfiguredValue(Generic[T]):
     def __str__(self) -> str:
         return "%-60s %-40s %s" % (self._name, self._value, ("(default: %s)" % self._default) if self._default != self._value else "")
 
-def _update_config(at_c: Union[_ConfiguredValue[T], dict[str, Any]], at_p: Union[Any, dict[str, Any]]) -> None:
+def _equal(a: Any, b: Any, depth: int=0) -> bool:
+    """
+    Reloading the config module creates new function objects - consider functions equal if code, defaults
+    and the globals they reference are equal. Anything not comparable is considered changed
+    """
+    if a is b:
+        return True
+    if type(a) != type(b) or depth > 4:
+        return False
+
+    if isinstance(a, FunctionType):
+        def names(code: Any) -> set[str]:
+            res = set(code.co_names)
+            for c in code.co_consts:
+                if hasattr(c, "co_names"):
+                    res |= names(c)
+            return res
+
+        if a.__code__ != b.__code__ or not _equal(a.__defaults__, b.__defaults__, depth + 1):
+            return False
+        if (a.__closure__ is None) != (b.__closure__ is None):
+            return False
+        if a.__closure__ is not None and not _equal([c.cell_contents for c in a.__closure__], [c.cell_contents for c in b.__closure__], depth + 1):
+            return False
+        for n in names(a.__code__):
+            if n in a.__globals__ or n in b.__globals__:
+                if not _equal(a.__globals__.get(n), b.__globals__.get(n), depth + 1):
+                    return False
+        return True
+
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(_equal(x, y, depth + 1) for x, y in zip(a, b))
+
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_equal(a[k], b[k], depth + 1) for k in a.keys())
+
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+def _update_config(at_c: Union[_ConfiguredValue[T], dict[str, Any]], at_p: Union[Any, dict[str, Any]], changed: set[str]) -> None:
     if isinstance(at_c, _ConfiguredValue):
-        at_c.update(cast(T, at_p))
+        if at_c.update(cast(T, at_p)):
+            changed.add(at_c._name)
     else:
         if isinstance(at_c, dict):
             for k in at_c.keys():
-                _update_config(at_c[k], at_p[k] if (at_p is not None and k in at_p) else None)
+                _update_config(at_c[k], at_p[k] if (at_p is not None and k in at_p) else None, changed)
         else:
             logger.warn("Config: Unexpected")
 
+def config_changed(changed: Optional[set[str]], *paths: str) -> bool:
+    """
+    Check result of load_config - None means everything has (possibly) changed
+    """
+    if changed is None:
+        return True
+    for c in changed:
+        for p in paths:
+            if c == p or c.startswith(p + "."):
+                return True
+    return False
+
 def print_config(at_c: Optional[dict[str, Any]]=None) -> str:
     if at_c is None:
         at_c = _consumer
@@ -54,12 +126,25 @@ def print_config(at_c: Optional[dict[str, Any]]=None) -> str:
             logger.warn("Config: Unexpected")
             return ""
 
-def load_config(fallback: bool=True, path_str: Optional[str]=None) -> None:
-    global _provider
+def _validate(at_c: Union[_ConfiguredValue[T], dict[str, Any]], at_p: Any, errors: list[str], prefix: str="") -> None:
+    if isinstance(at_c, _ConfiguredValue) or at_p is None:
+        return
+
+    if not isinstance(at_p, dict):
+        errors += ["%s must be a dict" % prefix[:-1]]
+        return
+
+    for k in at_c.keys():
+        if k in at_p:
+            _validate(at_c[k], at_p[k], errors, prefix + k + ".")
 
+def config_path(path_str: Optional[str]=None) -> pathlib.Path:
+    """
+    Path of the config file to use - path_str if set and it exists, falling back to ~/.config/newm/config.py,
+    /etc/newm/config.py and the default config
+    """
     home = os.environ['HOME'] if 'HOME' in os.environ else '/'
     path = pathlib.Path(home) / '.config' / 'newm' / 'config.py'
-    path_default = pathlib.Path(__file__).parent.absolute() / 'default_config.py'
 
     if path_str is not None:
         path = pathlib.Path(path_str)
@@ -68,36 +153,108 @@ def load_config(fallback: bool=True, path_str: Optional[str]=None) -> None:
         path = pathlib.Path('/etc') / 'newm' / 'config.py'
 
     if not path.is_file():
-        path = path_default
+        path = _path_default()
+
+    return path
+
+def active_config_path() -> Optional[pathlib.Path]:
+    return _path
+
+def _path_default() -> pathlib.Path:
+    return pathlib.Path(__file__).parent.absolute() / 'default_config.py'
+
+def _forget_modules() -> None:
+    """
+    Helper modules imported by the config would otherwise stay cached in sys.modules and not be picked up on
+    reload
+    """
+    global _config_modules
+    for name in _config_modules:
+        logger.debug("Config: Forgetting module %s", name)
+        sys.modules.pop(name, None)
+    _config_modules = set()
+
+def _remember_modules(before: set[str], directory: pathlib.Path) -> None:
+    """
+    Modules first imported while executing the config, which live next to it (the files ConfigWatcher watches) -
+    never newm itself or installed packages
+    """
+    directory = directory.resolve()
+    if directory == _path_default().parent.resolve():
+        return
+
+    for name in set(sys.modules.keys()) - before:
+        f = getattr(sys.modules[name], '__file__', None)
+        if f is None:
+            continue
+        p = pathlib.Path(f).resolve()
+        if p.parent != directory or len({'site-packages', 'dist-packages'} & set(p.parts)) > 0:
+            continue
+        _config_modules.add(name)
+
+def _load(path: pathlib.Path) -> dict[str, Any]:
+    """
+    Execute config module (in process, helper modules next to it are imported anew) - the config module
+    itself is only put into sys.modules once it has been loaded and validated successfully, so a broken config
+    does not replace a working one
+    """
+    module_name = path.stem
+
+    if str(path.parent) not in sys.path:
+        sys.path.insert(0, str(path.parent))
+    _forget_modules()
 
-    logger.info("Loading config at %s", path)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    if spec is None or spec.loader is None:
+        raise ImportError("Cannot load %s" % path)
 
-    def load(path: pathlib.Path) -> dict[str, Any]:
-        module = path.stem
+    module = importlib.util.module_from_spec(spec)
+    before = set(sys.modules.keys())
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        _remember_modules(before, path.parent)
 
-        try:
-            del sys.modules[module]
-        except KeyError:
-            pass
+    errors: list[str] = []
+    _validate(_consumer, module.__dict__, errors)
+    if len(errors) > 0:
+        raise ValueError("Invalid config: %s" % ", ".join(errors))
 
-        sys.path.insert(0, str(path.parent))
-        return importlib.import_module(module).__dict__
+    sys.modules[module_name] = module
+    return module.__dict__
+
+def load_config(fallback: bool=True, path_str: Optional[str]=None) -> set[str]:
+    """
+    Returns the set of configured values which have changed
+    """
+    global _provider, _version, _path
+
+    path = config_path(path_str)
+    logger.info("Loading config at %s", path)
 
     try:
-        _provider = load(path)
+        _provider = _load(path)
+        _path = path
     except:
         if fallback:
             logger.exception("Error loading config - falling back to default")
             try:
-                _provider = load(path_default)
+                _provider = _load(_path_default())
+                # Keep path to be able to pick up a fixed config
+                _path = path
             except:
                 logger.exception("Error loading default config")
                 _provider = {}
         else:
             logger.exception("Error loading config")
 
-    _update_config(_consumer, _provider)
+    changed: set[str] = set()
+    _update_config(_consumer, _provider, changed)
+    if len(changed) > 0:
+        _version += 1
+        logger.debug("Config: Changed %s", ", ".join(sorted(changed)))
 
+    return changed
 
 
 def configured_value(path: str, default: Optional[T]=None) -> Callable[[], T]:
@@ -130,6 +287,21 @@ def configured_value(path: str, default: Optional[T]=None) -> Callable[[], T]:
     return cast(Callable[[], T], res)
 
 
+def configured_snapshot(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Immutable snapshot of several configured values (e.g. a NamedTuple) for hot code paths - factory
+    is only evaluated again once the config has changed
+    """
+    cache: list[Any] = [-1, None]
+
+    def snapshot() -> T:
+        if cache[0] != _version:
+            cache[1] = factory()
+            cache[0] = _version
+        return cast(T, cache[1])
+
+    return snapshot
+
 
 if __name__ == '__main__':
     pywm = configured_value('pywm', cast(dict[str, Any], {}))
@@ -137,4 +309,4 @@ if __name__ == '__main__':
     while True:
         print("PyWM is %s" % pywm())
         input("Update? ")
-        load_config()
+        print("Changed: %s" % load_config())
@@ -0,0 +1,127 @@
+from __future__ import annotations
+from typing import Optional, Callable
+
+import os
+import time
+import struct
+import select
+import logging
+import pathlib
+import ctypes
+import ctypes.util
+from threading import Thread
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+
+_EVENT = struct.Struct("iIII")
+
+"""
+Used if inotify is not available
+"""
+POLL_INTERVAL = 1.0
+
+
+class _Inotify:
+    def __init__(self, directory: pathlib.Path) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+
+        # Watch the directory - editors usually save by writing a temp file and renaming it
+        wd = libc.inotify_add_watch(self.fd, str(directory).encode(), IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch")
+
+    def read(self, timeout: float) -> list[str]:
+        r, _, _ = select.select([self.fd], [], [], timeout)
+        if len(r) == 0:
+            return []
+
+        try:
+            buf = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return []
+
+        names: list[str] = []
+        i = 0
+        while i + _EVENT.size <= len(buf):
+            _, _, _, l = _EVENT.unpack_from(buf, i)
+            i += _EVENT.size
+            names += [buf[i:i + l].rstrip(b"\0").decode(errors="replace")]
+            i += l
+        return names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class ConfigWatcher(Thread):
+    """
+    Watch the directory containing the active config file and call on_change once edits to python
+    files in it have settled for debounce seconds
+    """
+    def __init__(self, path: pathlib.Path, debounce: float, on_change: Callable[[], None]) -> None:
+        super().__init__()
+        self.path = path
+        self.debounce = debounce
+        self.on_change = on_change
+        self._running = True
+
+    def stop(self) -> None:
+        self._running = False
+
+    def _mtimes(self) -> dict[str, float]:
+        res: dict[str, float] = {}
+        try:
+            for p in self.path.parent.glob("*.py"):
+                res[p.name] = p.stat().st_mtime
+        except OSError:
+            pass
+        return res
+
+    def run(self) -> None:
+        inotify: Optional[_Inotify] = None
+        try:
+            inotify = _Inotify(self.path.parent)
+            logger.debug("Watching %s (inotify)", self.path.parent)
+        except Exception:
+            logger.warn("Could not set up inotify - polling %s", self.path.parent)
+
+        mtimes = self._mtimes()
+        pending: Optional[float] = None
+
+        try:
+            while self._running:
+                if inotify is not None:
+                    names = inotify.read(0.2)
+                    changed = len([n for n in names if n.endswith(".py")]) > 0
+                else:
+                    time.sleep(POLL_INTERVAL)
+                    m = self._mtimes()
+                    changed = m != mtimes
+                    mtimes = m
+
+                if changed:
+                    pending = time.time()
+
+                if pending is not None and time.time() - pending > self.debounce:
+                    pending = None
+                    if not self._running:
+                        break
+                    logger.info("Config changed on disk - reloading")
+                    try:
+                        self.on_change()
+                    except Exception:
+                        logger.exception("Config reload")
+        finally:
+            if inotify is not None:
+                inotify.close()
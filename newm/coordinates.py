@@ -0,0 +1,50 @@
+from __future__ import annotations
+from typing import NamedTuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .layout import Workspace
+    from .state import WorkspaceState
+
+
+class TileTransform(NamedTuple):
+    """
+    Affine map between tile coordinates (i, j) of a workspace state and workspace-local pixels
+
+        x = (i - ws_state.i) * scale_x
+        y = (j - ws_state.j) * scale_y + offset_y
+
+    View boxes (tiled and floating) are this map plus offsets which do not depend on (i, j) (padding, stacking,
+    aspect ratio, CSD mask), so a single evaluation of a reducer at any (i, j) is enough to invert it
+    """
+    i: float
+    j: float
+    scale_x: float
+    scale_y: float
+    offset_y: float
+
+    @staticmethod
+    def tiled(ws: Workspace, ws_state: WorkspaceState) -> TileTransform:
+        """
+        Tiled views do not cover the space excluded by bars
+        """
+        return TileTransform(
+            ws_state.i, ws_state.j,
+            ws.width / ws_state.size,
+            (ws.height - ws_state.top_excluded - ws_state.bottom_excluded) / ws_state.size,
+            ws_state.top_excluded)
+
+    @staticmethod
+    def floating(ws: Workspace, ws_state: WorkspaceState) -> TileTransform:
+        return TileTransform(ws_state.i, ws_state.j, ws.width / ws_state.size, ws.height / ws_state.size, 0.)
+
+    def to_pixels(self, i: float, j: float) -> tuple[float, float]:
+        return (i - self.i) * self.scale_x, (j - self.j) * self.scale_y + self.offset_y
+
+    def to_tiles(self, x: float, y: float) -> tuple[float, float]:
+        return x / self.scale_x + self.i, (y - self.offset_y) / self.scale_y + self.j
+
+    def size_to_pixels(self, w: float, h: float) -> tuple[float, float]:
+        return w * self.scale_x, h * self.scale_y
+
+    def size_to_tiles(self, w: float, h: float) -> tuple[float, float]:
+        return w / self.scale_x, h / self.scale_y
@@ -4,6 +4,10 @@ from typing import Any, TYPE_CHECKING, Optional
 import json
 import logging
 from dasbus.connection import SessionMessageBus  # type: ignore
+from dasbus.server.template import InterfaceTemplate  # type: ignore
+from dasbus.server.publishable import Publishable  # type: ignore
+from dasbus.server.interface import dbus_signal  # type: ignore
+from dasbus.signal import Signal  # type: ignore
 
 
 if TYPE_CHECKING:
@@ -12,7 +16,7 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
-class Command:
+class CommandInterface(InterfaceTemplate):
     __dbus_xml__ = """
     <node>
         <interface name="org.newm.Command">
@@ -20,19 +24,55 @@ class Command:
                 <arg direction="in" name="args" type="s" />
                 <arg direction="out" name="return" type="s" />
             </method>
+            <property access="read" name="KeyMode" type="s"></property>
+            <signal name="KeyModeChanged">
+                <arg direction="out" name="mode" type="s" />
+            </signal>
         </interface>
     </node>
     """
 
+    def connect_signals(self) -> None:
+        self.implementation.key_mode_changed.connect(self.KeyModeChanged)
+
+    def Call(self, args: str) -> str:
+        return self.implementation.call(args)
+
+    @property
+    def KeyMode(self) -> str:
+        return self.implementation.key_mode
+
+    @dbus_signal
+    def KeyModeChanged(self, mode: str):  # type: ignore
+        pass
+
+
+class Command(Publishable):
     def __init__(self, layout: Layout):
         self.layout = layout
 
-    def Call(self, args: str) -> str:
+        """
+        Bars can subscribe to KeyModeChanged instead of polling KeyMode
+        """
+        self.key_mode = self.layout.key_processor.mode if self.layout is not None else "default"
+        self.key_mode_changed = Signal()
+
+    def set_key_mode(self, mode: str) -> None:
+        self.key_mode = mode
+        self.key_mode_changed.emit(mode)
+
+    def for_publication(self) -> CommandInterface:
+        return CommandInterface(self)
+
+    def call(self, args: str) -> str:
         args_dict = json.loads(args)
         try:
             if args_dict['cmd'] == 'launcher':
                 self.layout.launch_app(args_dict['app'])
                 res_dict = { 'msg': 'OK' }
+            elif args_dict['cmd'] == 'batch':
+                res_dict = { 'msg': "\n".join(str(r) for r in self.layout.command_batch(
+                    [(c['cmd'], c['arg'] if 'arg' in c else None) for c in args_dict['commands']])) }
             else:
                 res_dict = { 'msg': str(self.layout.command(args_dict['cmd'], args_dict['arg'] if 'arg' in args_dict else None)) }
             return json.dumps(res_dict)
@@ -12,12 +12,16 @@ try:
     from .command import Command
     from .gesture import DBusGestureProvider
     from .auth import AuthRequest, Auth
+    from .events import Events
 except: # for __main__
     from command import Command  # type: ignore
     from auth import AuthRequest, Auth  # type: ignore
+    from events import Events  # type: ignore
 
 if TYPE_CHECKING:
     from ..layout import Layout
+    from ..state import LayoutState
+    from ..view import View
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +36,8 @@ class DBusEndpoint(Thread):
         self.auth_container = DBusContainer(self.bus, ("org", "newm", "Auth", "Request"))
 
         self.auth = Auth()
+        self.command = Command(self.layout)
+        self.events = Events(self.layout)
 
         self.loop = EventLoop()
 
@@ -42,9 +48,11 @@ class DBusEndpoint(Thread):
         self.loop.quit()
 
     def run(self) -> None:
-        self.bus.publish_object("/org/newm/Command", Command(self.layout))
+        self.bus.publish_object("/org/newm/Command", self.command.for_publication())
         self.bus.register_service("org.newm.Command")
 
+        self.bus.publish_object("/org/newm/Events", self.events.for_publication())
+        self.bus.register_service("org.newm.Events")
 
         if self.gesture_provider is not None:
             self.bus.publish_object("/org/newm/Gestures", self.gesture_provider.for_publication())
@@ -67,6 +75,21 @@ class DBusEndpoint(Thread):
 
         self.loop.run()
 
+    def set_key_mode(self, mode: str) -> None:
+        self.command.set_key_mode(mode)
+
+    def publish_state(self, state: LayoutState) -> None:
+        self.events.on_state(state)
+
+    def publish_focus(self, view: Optional[View]) -> None:
+        self.events.on_focus(view)
+
+    def publish_mapped(self, view: View, mapped: bool) -> None:
+        if mapped:
+            self.events.on_mapped(view)
+        else:
+            self.events.on_unmapped(view)
+
     def publish_auth_request(self, req: AuthRequest) -> None:
         key = self.auth_container.to_object_path(req)
         self.auth.request(key)
@@ -0,0 +1,226 @@
+from __future__ import annotations
+from typing import Any, TYPE_CHECKING, Optional
+
+import json
+import logging
+from threading import Lock
+from gi.repository import GLib  # type: ignore
+from dasbus.server.template import InterfaceTemplate  # type: ignore
+from dasbus.server.publishable import Publishable  # type: ignore
+from dasbus.server.interface import dbus_signal  # type: ignore
+from dasbus.signal import Signal  # type: ignore
+
+try:
+    from ..config import configured_value
+except: # for __main__ of endpoint
+    from newm.config import configured_value  # type: ignore
+
+if TYPE_CHECKING:
+    from ..layout import Layout
+    from ..state import LayoutState
+    from ..view import View
+
+logger = logging.getLogger(__name__)
+
+conf_interval = configured_value('dbus.events_interval', .05)
+
+
+class EventsInterface(InterfaceTemplate):
+    __dbus_xml__ = """
+    <node>
+        <interface name="org.newm.Events">
+            <method name="Snapshot">
+                <arg direction="out" name="state" type="s" />
+            </method>
+            <signal name="FocusChanged">
+                <arg direction="out" name="handle" type="i" />
+                <arg direction="out" name="app_id" type="s" />
+                <arg direction="out" name="title" type="s" />
+            </signal>
+            <signal name="ViewMapped">
+                <arg direction="out" name="handle" type="i" />
+                <arg direction="out" name="app_id" type="s" />
+                <arg direction="out" name="title" type="s" />
+            </signal>
+            <signal name="ViewUnmapped">
+                <arg direction="out" name="handle" type="i" />
+            </signal>
+            <signal name="ViewportChanged">
+                <arg direction="out" name="workspace" type="i" />
+                <arg direction="out" name="i" type="d" />
+                <arg direction="out" name="j" type="d" />
+                <arg direction="out" name="size" type="d" />
+            </signal>
+            <signal name="OverviewChanged">
+                <arg direction="out" name="workspace" type="i" />
+                <arg direction="out" name="overview" type="b" />
+            </signal>
+            <signal name="LockChanged">
+                <arg direction="out" name="locked" type="b" />
+            </signal>
+        </interface>
+    </node>
+    """
+
+    def connect_signals(self) -> None:
+        self.implementation.focus_changed.connect(self.FocusChanged)
+        self.implementation.view_mapped.connect(self.ViewMapped)
+        self.implementation.view_unmapped.connect(self.ViewUnmapped)
+        self.implementation.viewport_changed.connect(self.ViewportChanged)
+        self.implementation.overview_changed.connect(self.OverviewChanged)
+        self.implementation.lock_changed.connect(self.LockChanged)
+
+    def Snapshot(self) -> str:
+        return self.implementation.snapshot()
+
+    @dbus_signal
+    def FocusChanged(self, handle: int, app_id: str, title: str):  # type: ignore
+        pass
+
+    @dbus_signal
+    def ViewMapped(self, handle: int, app_id: str, title: str):  # type: ignore
+        pass
+
+    @dbus_signal
+    def ViewUnmapped(self, handle: int):  # type: ignore
+        pass
+
+    @dbus_signal
+    def ViewportChanged(self, workspace: int, i: float, j: float, size: float):  # type: ignore
+        pass
+
+    @dbus_signal
+    def OverviewChanged(self, workspace: int, overview: bool):  # type: ignore
+        pass
+
+    @dbus_signal
+    def LockChanged(self, locked: bool):  # type: ignore
+        pass
+
+
+class Events(Publishable):
+    """
+    Push alternative to polling debug via org.newm.Command - bars subscribe to the signals they need and call
+    Snapshot once on startup
+
+    Signals are broadcast, so coalescing happens per event and key instead of per subscriber: within
+    dbus.events_interval only the latest payload of e.g. the viewport of one workspace is sent (gestures change it
+    every frame). Events are emitted from the endpoint's loop, never from the render thread
+    """
+    def __init__(self, layout: Layout):
+        self.layout = layout
+
+        self.focus_changed = Signal()
+        self.view_mapped = Signal()
+        self.view_unmapped = Signal()
+        self.viewport_changed = Signal()
+        self.overview_changed = Signal()
+        self.lock_changed = Signal()
+
+        """
+        (signal, key) -> latest args, in order of first occurrence
+        """
+        self._pending: dict[tuple[str, Any], tuple[Any, ...]] = {}
+        self._scheduled = False
+        self._lock = Lock()
+
+        """
+        Last published values, so unchanged states do not produce events
+        """
+        self._workspaces: dict[int, tuple[float, float, float, bool]] = {}
+        self._locked: Optional[bool] = None
+        self._state_lock = Lock()
+
+    def signals(self) -> dict[str, Signal]:
+        return {
+            'focus_changed': self.focus_changed,
+            'view_mapped': self.view_mapped,
+            'view_unmapped': self.view_unmapped,
+            'viewport_changed': self.viewport_changed,
+            'overview_changed': self.overview_changed,
+            'lock_changed': self.lock_changed,
+        }
+
+    def for_publication(self) -> EventsInterface:
+        return EventsInterface(self)
+
+    def _push(self, signal: str, key: Any, *args: Any) -> None:
+        with self._lock:
+            self._pending[(signal, key)] = args
+            if self._scheduled:
+                return
+            self._scheduled = True
+        GLib.timeout_add(max(1, int(1000 * conf_interval())), self._flush)
+
+    def _flush(self) -> bool:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scheduled = False
+
+        for (signal, _), args in pending.items():
+            try:
+                getattr(self, signal).emit(*args)
+            except Exception:
+                logger.exception("Emitting %s", signal)
+
+        # Single shot
+        return False
+
+    def on_focus(self, view: Optional[View]) -> None:
+        if view is None:
+            self._push("focus_changed", None, -1, "", "")
+        else:
+            self._push("focus_changed", None, view._handle, view.app_id or "", view.title or "")
+
+    def on_mapped(self, view: View) -> None:
+        self._push("view_mapped", view._handle, view._handle, view.app_id or "", view.title or "")
+
+    def on_unmapped(self, view: View) -> None:
+        with self._lock:
+            mapped = self._pending.pop(("view_mapped", view._handle), None)
+        if mapped is None:
+            self._push("view_unmapped", view._handle, view._handle)
+
+    def on_state(self, state: LayoutState) -> None:
+        """
+        Called whenever the layout state is replaced - compares against the last published values only
+        """
+        with self._state_lock:
+            for ws in self.layout.workspaces:
+                ws_state = state.get_workspace_state(ws)
+                current = (ws_state.i, ws_state.j, ws_state.size, ws_state.is_in_overview())
+                last = self._workspaces.get(ws._handle, None)
+                if current == last:
+                    continue
+                self._workspaces[ws._handle] = current
+
+                i, j, size, overview = current
+                if last is None or last[:3] != current[:3]:
+                    self._push("viewport_changed", ws._handle, ws._handle, float(i), float(j), float(size))
+                if last is None or last[3] != overview:
+                    self._push("overview_changed", ws._handle, ws._handle, overview)
+
+            locked = state.lock_perc > 0
+            if locked != self._locked:
+                self._locked = locked
+                self._push("lock_changed", None, locked)
+
+    def snapshot(self) -> str:
+        focused = self.layout.find_focused_view()
+        return json.dumps({
+            'focused': focused._handle if focused is not None else -1,
+            'locked': self.layout.state.lock_perc > 0,
+            'workspaces': [{
+                'handle': ws._handle,
+                'i': ws_state.i,
+                'j': ws_state.j,
+                'size': ws_state.size,
+                'overview': ws_state.is_in_overview(),
+            } for ws, ws_state in [(w, self.layout.state.get_workspace_state(w)) for w in self.layout.workspaces]],
+            'views': [{
+                'handle': v._handle,
+                'app_id': v.app_id,
+                'title': v.title,
+                'panel': v.panel,
+            } for v in self.layout._views.values() if v._mapped],
+        }, separators=(',', ':'))
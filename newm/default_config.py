@@ -54,6 +54,7 @@ def key_bindings(layout: Layout) -> list[tuple[str, Callable[[], Any]]]:
         ("L-C-j", lambda: layout.resize_focused_view(0, 1)),
         ("L-C-k", lambda: layout.resize_focused_view(0, -1)),
         ("L-C-l", lambda: layout.resize_focused_view(1, 0)),
+        ("L-r", lambda: layout.set_key_mode("resize")),
 
         ("L-Return", lambda: os.system("alacritty &")),
         ("L-q", lambda: layout.close_focused_view()),
@@ -75,6 +76,18 @@ def key_bindings(layout: Layout) -> list[tuple[str, Callable[[], Any]]]:
         ("XF86AudioMute", lambda: pactl.mute()),
     ]
 
+def key_modes(layout: Layout) -> dict[str, list[tuple[str, Callable[[], Any]]]]:
+    return {
+        "resize": [
+            ("h", lambda: layout.resize_focused_view(-1, 0)),
+            ("j", lambda: layout.resize_focused_view(0, 1)),
+            ("k", lambda: layout.resize_focused_view(0, -1)),
+            ("l", lambda: layout.resize_focused_view(1, 0)),
+            ("Escape", lambda: layout.set_key_mode()),
+            ("Return", lambda: layout.set_key_mode()),
+        ]
+    }
+
 panels = {
     'lock': {
         'cmd': 'alacritty -e newm-panel-basic lock',
@@ -44,5 +44,7 @@ class LowpassGesture(Thread, Gesture):
                     if k not in self._lp:
                         self._lp[k] = Lowpass(self._lp_inertia)
                     lp_values[k] = self._lp[k].next(self._values[k])
+                # Sample time of the filtered values (see Grid.at)
+                lp_values['ts'] = time.time()
                 self._update(lp_values)
             time.sleep(1./self._lp_freq)
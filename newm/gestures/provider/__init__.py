@@ -1,3 +1,15 @@
+from __future__ import annotations
+from typing import Any, TYPE_CHECKING
+
 from .provider import GestureProvider
 from .c_gestures import CGestureProvider
-from .pyevdev_provider import PyEvdevGestureProvider
+
+if TYPE_CHECKING:
+    from .pyevdev_provider import PyEvdevGestureProvider
+
+def __getattr__(name: str) -> Any:
+    # evdev is only needed if pyevdev gestures are enabled
+    if name == "PyEvdevGestureProvider":
+        from .pyevdev_provider import PyEvdevGestureProvider
+        return PyEvdevGestureProvider
+    raise AttributeError("module %s has no attribute %s" % (__name__, name))
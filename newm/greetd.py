@@ -0,0 +1,154 @@
+from __future__ import annotations
+from typing import Any, Callable, Optional
+
+import os
+import sys
+import json
+import asyncio
+import logging
+from collections import deque
+from threading import Thread, Event
+
+from .config import configured_value
+
+logger = logging.getLogger(__name__)
+
+conf_timeout = configured_value('greetd.timeout', 5.)
+
+Callback = Callable[[dict[str, Any]], None]
+
+
+def _error(description: str) -> dict[str, Any]:
+    """
+    Same shape as greetd's own errors, so callers handle both alike
+    """
+    return {"type": "error", "error_type": "error", "description": description}
+
+
+class GreetdClient(Thread):
+    """
+    greetd IPC (native-endian 32 bit length, then JSON) on its own asyncio loop - request returns immediately, the
+    callback is invoked on this thread once the response has arrived
+
+    greetd answers requests on a connection in order, so requests are written right away (pipelined) and responses
+    are matched to callbacks first in, first out. If a response does not arrive within greetd.timeout, the
+    connection is dropped (later responses could not be matched anymore), all waiting callbacks receive an error
+    and the next request reconnects
+    """
+    def __init__(self, path: Optional[str] = None) -> None:
+        super().__init__()
+        self.daemon = True
+        self.path = path if path is not None else os.environ.get("GREETD_SOCK", None)
+
+        self._loop = asyncio.new_event_loop()
+        self._write_lock = asyncio.Lock()
+
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._waiting: deque[asyncio.Future[dict[str, Any]]] = deque()
+        self._read_task: Optional[asyncio.Task[None]] = None
+
+    def run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def request(self, msg: dict[str, Any], callback: Optional[Callback] = None) -> None:
+        """
+        Thread-safe - requests made before start are sent once the loop runs
+        """
+        self._loop.call_soon_threadsafe(lambda: self._loop.create_task(self._request(msg, callback)))
+
+    def request_sync(self, msg: dict[str, Any]) -> dict[str, Any]:
+        """
+        Blocking variant - never to be called on the D-Bus thread
+        """
+        result: list[dict[str, Any]] = []
+        done = Event()
+
+        def callback(res: dict[str, Any]) -> None:
+            result.append(res)
+            done.set()
+
+        self.request(msg, callback)
+        if not done.wait(conf_timeout() + 1.):
+            return _error("timeout")
+        return result[0]
+
+    """
+    Loop
+    """
+
+    async def _connect(self) -> bool:
+        if self._writer is not None and not self._writer.is_closing():
+            return True
+
+        if self.path is None:
+            logger.error("Not in a greetd session")
+            return False
+
+        try:
+            reader, self._writer = await asyncio.wait_for(asyncio.open_unix_connection(self.path), conf_timeout())
+        except (OSError, asyncio.TimeoutError):
+            logger.exception("Could not connect to greetd")
+            return False
+
+        self._read_task = self._loop.create_task(self._read(reader))
+        logger.debug("Connected to greetd")
+        return True
+
+    def _reset(self, description: str) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._read_task is not None and self._read_task is not asyncio.current_task():
+            self._read_task.cancel()
+        self._writer, self._read_task = None, None
+
+        waiting, self._waiting = self._waiting, deque()
+        for future in waiting:
+            if not future.done():
+                future.set_result(_error(description))
+
+    async def _request(self, msg: dict[str, Any], callback: Optional[Callback]) -> None:
+        future: asyncio.Future[dict[str, Any]] = self._loop.create_future()
+
+        # Keep the order of requests while (re-)connecting
+        async with self._write_lock:
+            if not await self._connect():
+                future.set_result(_error("not connected"))
+            else:
+                assert self._writer is not None
+                data = json.dumps(msg).encode('utf-8')
+                self._waiting.append(future)
+                self._writer.write(len(data).to_bytes(4, sys.byteorder) + data)
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), conf_timeout())
+        except asyncio.TimeoutError:
+            logger.warn("greetd did not answer %s in time", msg.get("type", None))
+            self._reset("timeout")
+            result = future.result()
+
+        if callback is not None:
+            try:
+                callback(result)
+            except Exception:
+                logger.exception("greetd callback")
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                length = int.from_bytes(await reader.readexactly(4), sys.byteorder)
+                result = json.loads((await reader.readexactly(length)).decode('utf-8'))
+                if len(self._waiting) == 0:
+                    logger.warn("Unexpected message from greetd: %s", result)
+                    continue
+                future = self._waiting.popleft()
+                if not future.done():
+                    future.set_result(result)
+        except asyncio.CancelledError:
+            pass
+        except (asyncio.IncompleteReadError, OSError, ValueError):
+            logger.warn("Lost connection to greetd")
+            self._reset("connection lost")
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-from typing import Optional
+from typing import Iterable, Optional
 
 import math
 import time
+from collections import deque
 
 import logging
 
@@ -14,12 +15,57 @@ try:
     conf_throw_ps = configured_value('grid.throw_ps', [1, 5, 15])
     conf_min_dist = configured_value('grid.min_dist', .05)
 
+    conf_fling_deceleration = configured_value('grid.fling_deceleration', 8.)
+    conf_fling_window = configured_value('grid.fling_window', .1)
+
     conf_griddebug = configured_value('grid.debug', False)
 except:
     pass
 
 logger = logging.getLogger(__name__)
 
+"""
+Gesture updates kept per grid to fit the release velocity
+"""
+FLING_SAMPLES = 12
+
+def snap(x: float, x0: int, x1: int, d_ovr: float, m_snap: float) -> float:
+    """
+    Output of a grid with bounds [x0, x1] for input x - snaps towards integers (the larger m_snap, the
+    stronger) and allows overshooting the bounds by at most d_ovr
+    """
+    if x < x0:
+        if m_snap == 1:
+            if d_ovr > 0:
+                y = x - x0
+                return x0 + d_ovr*(1 / (1 - y/d_ovr) - 1)
+            return x0
+
+        y = x - x0 + 1
+        if y <= 0:
+            return x0 - d_ovr
+        return x0 - d_ovr + d_ovr/(1. + ((1. - y)/y)**m_snap)
+
+    elif x < x1:
+        xf = math.floor(x)
+        y = x - xf
+        if y == 0:
+            return xf
+        return xf + 1/(1. + ((1. - y)/y)**m_snap)
+
+    else:
+        if m_snap == 1:
+            if d_ovr > 0:
+                y = x - x1
+                return x1 - d_ovr*(1 / (1 + y/d_ovr) - 1)
+            return x1
+
+        y = min(1, x - x1)
+        if y == 0:
+            return x1
+        return x1 + d_ovr/(1. + ((1. - y)/y)**m_snap)
+
+
 class Grid:
     def __init__(self, name: str, x0: int, x1: int, xi: float, d_ovr: float=0, m_snap: float=1) -> None:
         self.name = "%s-%d" % (name, time.time() % 1000)
@@ -41,100 +87,87 @@ class Grid:
         self.last_x_output: Optional[float] = None
         self.last_p_output: Optional[float] = None
 
-    def _get_bounds(self, x: float) -> tuple[int, int]:
-        if self.x0 <= x <= self.x1:
-            self.allow_out_of_bounds = False
+        # (t, x, x output)
+        self._samples: deque[tuple[float, float, float]] = deque(maxlen=FLING_SAMPLES)
+
+        self._debug: bool = conf_griddebug()
 
+    def _bounds(self, x: float) -> tuple[int, int]:
         x0, x1 = self.x0, self.x1
         if self.allow_out_of_bounds and x < x0:
             x0 = math.floor(x)
         if self.allow_out_of_bounds and x > x1:
             x1 = math.ceil(x)
-
         return x0, x1
 
-    def at(self, x: float, silent: bool=False) -> float:
-        x0, x1 = self._get_bounds(x)
-
-        t = time.time()
-        if not silent:
-            if self.last_x is not None and self.last_t is not None:
-                dx = x - self.last_x
-                dt = t - self.last_t
-                self.last_p = dx / dt
-            self.last_x = x
-
-        xp = x
-        if x < x0:
-            if self.m_snap == 1:
-                if self.d_ovr > 0:
-                    y = x - x0
-                    y = self.d_ovr*(1 / (1 - y/self.d_ovr) - 1)
-                    xp = x0 + y
-                else:
-                    xp = x0
-            else:
-                y = max(0, x - x0 + 1)
-
-                if y == 0:
-                    xp = x0 - self.d_ovr
-                else:
-                    xp = x0 - self.d_ovr + self.d_ovr/(1. + ((1. - y)/y)**self.m_snap)
-
-        elif x < x1:
-            y = x - math.floor(x)
-
-            if y == 0:
-                xp = math.floor(x)
-            else:
-                xp = math.floor(x) + 1/(1. + ((1. - y)/y)**self.m_snap)
+    def _get_bounds(self, x: float) -> tuple[int, int]:
+        if self.x0 <= x <= self.x1:
+            self.allow_out_of_bounds = False
+        return self._bounds(x)
 
-        else:
-            if self.m_snap == 1:
-                if self.d_ovr > 0:
-                    y = x - x1
-                    y = self.d_ovr*(1 / (1 + y/self.d_ovr) - 1)
-                    xp = x1 - y
-                else:
-                    xp = x1
+    def at(self, x: float, silent: bool=False, ts: Optional[float]=None) -> float:
+        """
+        ts: Timestamp of the gesture update x belongs to (velocities are derived from it), defaults to now
+        """
+        x0, x1 = self.x0, self.x1
+        if self.allow_out_of_bounds:
+            if x0 <= x <= x1:
+                self.allow_out_of_bounds = False
+            elif x < x0:
+                x0 = math.floor(x)
             else:
-                y = min(1, max(0, x - x1))
-
-                if y == 0:
-                    xp = x1
-                else:
-                    xp = x1 + self.d_ovr/(1. + ((1. - y)/y)**self.m_snap)
+                x1 = math.ceil(x)
+        xp = snap(x, x0, x1, self.d_ovr, self.m_snap)
 
         if not silent:
-            if self.last_x_output is not None and self.last_t is not None:
-                dx = xp - self.last_x_output
+            t = time.time() if ts is None else ts
+            if self.last_t is not None and t > self.last_t:
                 dt = t - self.last_t
-                self.last_p_output = dx / dt
+                if self.last_x is not None:
+                    self.last_p = (x - self.last_x) / dt
+                if self.last_x_output is not None:
+                    self.last_p_output = (xp - self.last_x_output) / dt
+            self.last_x = x
             self.last_x_output = xp
             self.last_t = t
+            self._samples.append((t, x, xp))
 
-        if not silent and conf_griddebug():
-            logger.debug("GRID[%s]: %f, %f, %f, %f, %f",
-                         self.name, time.time(), x, xp,
-                         self.last_p if self.last_p is not None else 0,
-                         self.last_p_output if self.last_p_output is not None else 0)
+            if self._debug:
+                logger.debug("GRID[%s]: %f, %f, %f, %f, %f",
+                             self.name, t, x, xp,
+                             self.last_p if self.last_p is not None else 0,
+                             self.last_p_output if self.last_p_output is not None else 0)
         return xp
 
-    def final(self, throw_dist_max: Optional[float]=None) -> tuple[int, float]:
-        if throw_dist_max is None:
-            throw_dist_max = 1. - conf_min_dist()
-
-        if self.last_x_output is None:
-            return round(self.at(self.xi)), 0.
-
-        x0, x1 = self._get_bounds(self.last_x_output)
-
-        # Find final x
-        x_base = self.last_x_output
-        p = 0.
-        if self.last_p is not None:
-            p = self.last_p
-
+    def snap_all(self, xs: Iterable[float]) -> list[float]:
+        """
+        Silent evaluation of many inputs at once (tuning, benchmarks) - does not change the grid
+        """
+        d_ovr, m_snap = self.d_ovr, self.m_snap
+        return [snap(x, *self._bounds(x), d_ovr, m_snap) for x in xs]
+
+    def _velocity(self, k: int) -> float:
+        """
+        Least-squares slope of input (k=1) or output (k=2) over the updates of the last grid.fling_window
+        seconds - two consecutive samples alone are too noisy
+        """
+        if len(self._samples) < 2:
+            return 0.
+        t_end = self._samples[-1][0]
+        window = [s for s in self._samples if s[0] >= t_end - conf_fling_window()]
+        if len(window) < 2:
+            window = list(self._samples)[-2:]
+
+        n = len(window)
+        mt = sum(s[0] for s in window) / n
+        mx = sum(s[k] for s in window) / n
+        stt = sum((s[0] - mt)**2 for s in window)
+        if stt == 0:
+            return 0.
+        return sum((s[0] - mt) * (s[k] - mx) for s in window) / stt
+
+    @staticmethod
+    def _throw_table(x_base: float, p: float, throw_dist_max: float) -> int:
         x_finals = [round(x_base)]
         if p > 0:
             if x_finals[0] > x_base:
@@ -159,18 +192,53 @@ class Grid:
             if abs(p) < conf_throw_ps()[ifinal]:
                 break
             ifinal += 1
-        xf = round(x_finals[min(ifinal, len(x_finals) - 1)])
+        return round(x_finals[min(ifinal, len(x_finals) - 1)])
+
+    def fling(self, throw_dist_max: Optional[float]=None) -> tuple[int, float, float]:
+        """
+        Final x, time to animate there and the velocity (output per second) to start that animation with
+
+        With grid.fling_deceleration > 0, the release velocity (fitted over grid.fling_window) is decelerated
+        at that constant rate to find the landing point and the animation starts at the velocity the output
+        had on release (zero if that points away from the final x). Otherwise grid.throw_ps is used as a step
+        table on the last instantaneous velocity
+        """
+        if throw_dist_max is None:
+            throw_dist_max = 1. - conf_min_dist()
 
-        xf = min(x1, max(x0, round(xf)))
-        dx = abs(self.last_x_output - xf)
+        if self.last_x_output is None:
+            return round(self.at(self.xi)), 0., 0.
+
+        x0, x1 = self._get_bounds(self.last_x_output)
+
+        # Find final x
+        x_base = self.last_x_output
+        deceleration = conf_fling_deceleration()
+        if deceleration > 0:
+            p = self._velocity(1)
+            xf = round(x_base + p * abs(p) / (2. * deceleration))
+            while abs(xf - x_base) >= throw_dist_max and xf != round(x_base):
+                xf += 1 if xf < x_base else -1
+        else:
+            p = self.last_p if self.last_p is not None else 0.
+            xf = self._throw_table(x_base, p, throw_dist_max)
+
+        xf = min(x1, max(x0, xf))
+        dx = abs(x_base - xf)
         dt = dx * conf_time_scale()
 
         # Speed up animation if a high momentum is involved
-        compare_t = abs(x_base - xf) / max(abs(p), 0.01)
+        compare_t = dx / max(abs(p), 0.01)
         if compare_t < dt:
             dt = compare_t
 
-        if conf_griddebug():
+        v = 0.
+        if deceleration > 0:
+            v = self._velocity(2)
+            if v * (xf - x_base) <= 0:
+                v = 0.
+
+        if self._debug:
             xb = self.at(self.last_x_output, silent=True)
             t0 = time.time()
             for i in range(2):
@@ -182,9 +250,40 @@ class Grid:
                             0,
                             0 if dt == 0. else dx/dt if xf>xb else -dx/dt)
 
+        return xf, dt, v
+
+    def final(self, throw_dist_max: Optional[float]=None) -> tuple[int, float]:
+        xf, dt, _ = self.fling(throw_dist_max)
         return xf, dt
 
 
+class Grids:
+    """
+    Grids of all axes an overlay snaps (e.g. i, j, w, h) - evaluated in one call with the timestamp of the
+    gesture update
+    """
+    def __init__(self, *grids: Grid) -> None:
+        self.grids = grids
+
+    def at(self, *xs: float, ts: Optional[float]=None) -> tuple[float, ...]:
+        t = time.time() if ts is None else ts
+        return tuple([g.at(x, False, t) for g, x in zip(self.grids, xs)])
+
+    def final(self, throw_dist_max: Optional[float]=None) -> tuple[tuple[int, ...], float]:
+        """
+        Final values of all axes and the time to animate there (the longest of all axes)
+        """
+        finals, t, _ = self.fling(throw_dist_max)
+        return finals, t
+
+    def fling(self, throw_dist_max: Optional[float]=None) -> tuple[tuple[int, ...], float, tuple[float, ...]]:
+        """
+        As final, plus the release velocities (see Grid.fling)
+        """
+        flings = [g.fling(throw_dist_max) for g in self.grids]
+        return tuple([x for x, _, _ in flings]), max([t for _, t, _ in flings], default=0.), tuple([v for _, _, v in flings])
+
+
 if __name__ == '__main__':
     import sys
     import matplotlib.pyplot as plt # type: ignore
@@ -58,14 +58,8 @@ class ViewDownstreamInterpolation(Interpolation[PyWMViewDownstreamState]):
         self.fixed_output = (state0.fixed_output, state1.fixed_output)
 
         self.anim = True
-        if self.workspace is not None:
-            for ws in layout.workspaces:
-                if not ws.prevent_anim:
-                    continue
-                if ws.pos_x <= self.workspace[0] <= self.workspace[0] + self.workspace[2] <= ws.pos_x + ws.width and \
-                   ws.pos_y <= self.workspace[1] <= self.workspace[1] + self.workspace[3] <= ws.pos_y + ws.height:
-                    self.anim = False
-                    break
+        if self.workspace is not None and layout.workspace_registry.prevents_anim(*self.workspace):
+            self.anim = False
 
         # If the initial window is not visible - trigger (computationally intensive) size change immediately
         # If the final window is not visible - trigger (computationally intensive) size change only afterwards
@@ -131,13 +125,9 @@ class WidgetDownstreamInterpolation(Interpolation[PyWMWidgetDownstreamState]):
 
 
         self.anim = True
-        if widget.output is not None:
-            for ws in layout.workspaces:
-                if ws.pos_x <= widget.output.pos[0] <= widget.output.pos[0] + widget.output.width <= ws.pos_x + ws.width and \
-                    ws.pos_y <= widget.output.pos[1] <= widget.output.pos[1] + widget.output.height <= ws.pos_y + ws.height:
-                    if ws.prevent_anim:
-                        self.anim = False
-                        break
+        if widget.output is not None and layout.workspace_registry.prevents_anim(
+                widget.output.pos[0], widget.output.pos[1], widget.output.width, widget.output.height):
+            self.anim = False
 
     def get(self, at: float) -> PyWMWidgetDownstreamState:
         if not self.anim:
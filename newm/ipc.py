@@ -0,0 +1,371 @@
+from __future__ import annotations
+from typing import Any, TYPE_CHECKING, Iterator, Optional, cast
+
+import os
+import sys
+import stat
+import json
+import socket
+import asyncio
+import logging
+from threading import Thread
+
+from .config import configured_value
+
+if TYPE_CHECKING:
+    from .layout import Layout
+
+logger = logging.getLogger(__name__)
+
+conf_path = configured_value('ipc.socket', cast(Optional[str], None))
+
+"""
+Frames larger than this are considered garbage and close the connection
+"""
+MAX_FRAME = 1 << 24
+
+"""
+Field names of the org.newm.Events signals, forwarded to subscribers as dicts
+"""
+EVENTS: dict[str, tuple[str, ...]] = {
+    'focus_changed': ('handle', 'app_id', 'title'),
+    'view_mapped': ('handle', 'app_id', 'title'),
+    'view_unmapped': ('handle',),
+    'viewport_changed': ('workspace', 'i', 'j', 'size'),
+    'overview_changed': ('workspace', 'overview'),
+    'lock_changed': ('locked',),
+}
+
+
+def socket_path() -> str:
+    """
+    NEWM_SOCK is exported by the compositor, so clients started from within the session find it
+    """
+    if (path := conf_path()) is not None:
+        return str(path)
+    if "NEWM_SOCK" in os.environ:
+        return os.environ["NEWM_SOCK"]
+    runtime_dir = os.environ['XDG_RUNTIME_DIR'] if 'XDG_RUNTIME_DIR' in os.environ else '/tmp'
+    return os.path.join(runtime_dir, "newm-%d.sock" % os.getuid())
+
+
+def _pack(msg: Any) -> bytes:
+    """
+    Same framing as greetd: native-endian 32 bit length, then UTF-8 JSON
+    """
+    data = json.dumps(msg, separators=(',', ':')).encode('utf-8')
+    return len(data).to_bytes(4, sys.byteorder) + data
+
+
+def query(layout: Layout, what: str) -> Any:
+    if what == "workspaces":
+        result = []
+        for ws in layout.workspaces:
+            ws_state = layout.state.get_workspace_state(ws)
+            result += [{
+                'handle': ws._handle,
+                'outputs': [o.name for o in ws.outputs],
+                'pos': [ws.pos_x, ws.pos_y],
+                'size': [ws.width, ws.height],
+                'i': ws_state.i,
+                'j': ws_state.j,
+                'scale': ws_state.size,
+                'overview': ws_state.is_in_overview(),
+            }]
+        return result
+
+    elif what == "views":
+        result = []
+        for v in list(layout._views.values()):
+            if not v._mapped:
+                continue
+            entry: dict[str, Any] = {
+                'handle': v._handle,
+                'app_id': v.app_id,
+                'title': v.title,
+                'pid': v.pid,
+                'panel': v.panel,
+                'focused': v.is_focused(),
+            }
+            try:
+                s, _, ws_handle = layout.state.find_view(v)
+                entry.update({
+                    'workspace': ws_handle,
+                    'tiled': s.is_tiled,
+                    'geometry': [s.i, s.j, s.w, s.h] if s.is_tiled else [*s.float_pos, *s.float_size],
+                })
+            except Exception:
+                pass
+            result += [entry]
+        return result
+
+    elif what == "focused":
+        view = layout.find_focused_view()
+        return view._handle if view is not None else None
+
+    elif what == "key-mode":
+        return layout.key_processor.mode
+
+    raise ValueError("Unknown query: %s" % what)
+
+
+class _Connection:
+    def __init__(self, server: IPCServer, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.subscriptions: set[str] = set()
+
+    def send(self, msg: Any) -> None:
+        if self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > MAX_FRAME:
+            logger.warn("IPC: Dropping subscriber which does not read")
+            self.writer.close()
+            return
+        self.writer.write(_pack(msg))
+
+    def _command(self, msg: dict[str, Any]) -> dict[str, Any]:
+        try:
+            if msg['cmd'] == 'launcher':
+                self.server.layout.launch_app(msg['app'])
+                return {'msg': 'OK'}
+            elif msg['cmd'] == 'batch':
+                return self._batch(msg['commands'])
+            return {'msg': self.server.layout.command(msg['cmd'], msg.get('arg', None))}
+        except Exception as e:
+            return {'exception': str(e)}
+
+    def _batch(self, commands: list[dict[str, Any]]) -> dict[str, Any]:
+        """
+        Single animation for all commands (see Layout.batch)
+        """
+        with self.server.layout.batch():
+            return {'results': [self._command(m) for m in commands]}
+
+    def handle(self, msg: dict[str, Any]) -> dict[str, Any]:
+        kind = msg.get('type', None)
+        if kind == 'command':
+            return self._command(msg)
+
+        elif kind == 'batch':
+            return self._batch(msg['commands'])
+
+        elif kind == 'query':
+            try:
+                return {'result': query(self.server.layout, msg['what'])}
+            except Exception as e:
+                return {'exception': str(e)}
+
+        elif kind == 'subscribe':
+            events = msg.get('events', list(EVENTS.keys()))
+            unknown = [e for e in events if e not in EVENTS]
+            if len(unknown) > 0:
+                return {'exception': "Unknown events: %s" % ", ".join(unknown)}
+            self.subscriptions |= set(events)
+            return {'msg': 'OK'}
+
+        return {'exception': "Unknown request: %s" % kind}
+
+    async def run(self) -> None:
+        try:
+            while True:
+                length = int.from_bytes(await self.reader.readexactly(4), sys.byteorder)
+                if length > MAX_FRAME:
+                    logger.warn("IPC: Dropping client sending %d bytes", length)
+                    break
+                try:
+                    msg = json.loads((await self.reader.readexactly(length)).decode('utf-8'))
+                    self.send(self.handle(msg))
+                except (ValueError, KeyError, TypeError) as e:
+                    self.send({'exception': "Malformed request: %s" % e})
+                await self.writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        except Exception:
+            logger.exception("IPC connection")
+        finally:
+            self.server.forget(self)
+            self.writer.close()
+
+
+class IPCServer(Thread):
+    """
+    Unix socket alternative to org.newm.Command - one connection handles any number of requests (commands,
+    batches of commands, typed queries) and can subscribe to the events of org.newm.Events
+
+    Requests and responses are length-prefixed JSON (as in the greetd protocol), handled by an asyncio loop on this
+    thread. Commands are executed here, just as D-Bus calls are executed on the DBusEndpoint thread
+    """
+    def __init__(self, layout: Layout) -> None:
+        super().__init__()
+        self.layout = layout
+        self.path = socket_path()
+        self._loop = asyncio.new_event_loop()
+        self._connections: list[_Connection] = []
+
+        # Before any panel or app is spawned
+        os.environ["NEWM_SOCK"] = self.path
+
+    def forget(self, connection: _Connection) -> None:
+        if connection in self._connections:
+            self._connections.remove(connection)
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = _Connection(self, reader, writer)
+        self._connections += [connection]
+        await connection.run()
+
+    def publish(self, event: str, *args: Any) -> None:
+        """
+        Thread-safe
+        """
+        msg = {'event': event, **dict(zip(EVENTS[event], args))}
+        try:
+            self._loop.call_soon_threadsafe(self._dispatch, event, msg)
+        except RuntimeError:
+            # Loop closed
+            pass
+
+    def _dispatch(self, event: str, msg: dict[str, Any]) -> None:
+        for c in self._connections:
+            if event in c.subscriptions:
+                c.send(msg)
+
+    def connect_events(self, signals: dict[str, Any]) -> None:
+        """
+        signals: event name -> dasbus Signal (see dbus.Events)
+        """
+        for event, signal in signals.items():
+            def forward(*args: Any, event: str=event) -> None:
+                self.publish(event, *args)
+            signal.connect(forward)
+
+    def _remove_stale(self) -> bool:
+        """
+        False if another instance is listening on path (or path is not a socket)
+        """
+        if not os.path.exists(self.path):
+            return True
+        if not stat.S_ISSOCK(os.stat(self.path).st_mode):
+            return False
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.connect(self.path)
+            return False
+        except OSError:
+            os.unlink(self.path)
+            return True
+
+    def run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            if not self._remove_stale():
+                logger.error("IPC socket %s is in use (another instance?) - not listening", self.path)
+                return
+
+            # Restrictive from the start - there is no window in which others could connect
+            umask = os.umask(0o077)
+            try:
+                server = self._loop.run_until_complete(asyncio.start_unix_server(self._accept, path=self.path))
+            finally:
+                os.umask(umask)
+        except Exception:
+            logger.exception("Could not open IPC socket %s", self.path)
+            return
+
+        logger.info("IPC listening on %s", self.path)
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            for c in self._connections:
+                c.writer.close()
+            tasks = asyncio.all_tasks(self._loop)
+            for t in tasks:
+                t.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class IPCClient:
+    """
+    Blocking client, keeps the connection open between requests, e.g.
+
+        with IPCClient() as c:
+            c.batch([{'cmd': 'lock'}])
+            for view in c.query('views'):
+                ...
+    """
+    def __init__(self, path: Optional[str] = None) -> None:
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(path if path is not None else socket_path())
+
+    def __enter__(self) -> IPCClient:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._socket.close()
+
+    def _recv_exactly(self, n: int) -> bytes:
+        data = b''
+        while len(data) < n:
+            chunk = self._socket.recv(n - len(data))
+            if len(chunk) == 0:
+                raise ConnectionError("IPC socket closed")
+            data += chunk
+        return data
+
+    def _recv(self) -> Any:
+        length = int.from_bytes(self._recv_exactly(4), sys.byteorder)
+        return json.loads(self._recv_exactly(length).decode('utf-8'))
+
+    def request(self, msg: dict[str, Any]) -> Any:
+        self._socket.sendall(_pack(msg))
+        return self._recv()
+
+    def command(self, cmd: str, arg: Optional[str] = None) -> dict[str, Any]:
+        return self.request({'type': 'command', 'cmd': cmd, 'arg': arg})
+
+    def batch(self, commands: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return self.request({'type': 'batch', 'commands': commands})['results']
+
+    def query(self, what: str) -> Any:
+        res = self.request({'type': 'query', 'what': what})
+        if 'exception' in res:
+            raise ValueError(res['exception'])
+        return res['result']
+
+    def subscribe(self, events: Optional[list[str]] = None) -> Iterator[dict[str, Any]]:
+        """
+        Turns the connection into an event stream - yields events until the connection is closed
+        """
+        res = self.request({'type': 'subscribe', 'events': events if events is not None else list(EVENTS.keys())})
+        if 'exception' in res:
+            raise ValueError(res['exception'])
+        while True:
+            try:
+                yield self._recv()
+            except ConnectionError:
+                return
+
+
+def send_ipc_command(args: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """
+    Drop-in for send_dbus_command, None if there is no IPC socket
+    """
+    try:
+        with IPCClient() as c:
+            return c.request({'type': 'command', **args})
+    except OSError:
+        return None
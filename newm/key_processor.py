@@ -1,11 +1,32 @@
 from __future__ import annotations
-from typing import Callable, Any
+from typing import Callable, Any, Optional
+import time
 import logging
+from threading import Lock, Timer
 
 from pywm import PyWMModifiers
 
+from .config import configured_value
+
 logger = logging.getLogger(__name__)
 
+"""
+Time to wait for the next key of a chord - if the chord so far is bound itself ("L-x" and "L-x L-y"),
+its action fires after this timeout
+"""
+conf_chord_timeout = configured_value('keys.chord_timeout', 1.)
+
+DEFAULT_MODE = "default"
+
+_MOD_ATTRS = ["shift", "logo", "ctrl", "alt", "mod1", "mod2", "mod3"]
+
+def _mod_bits(mod: PyWMModifiers) -> int:
+    res = 0
+    for i, a in enumerate(_MOD_ATTRS):
+        if getattr(mod, a, False):
+            res |= 1 << i
+    return res
+
 class KeyEvent:
     def __init__(self) -> None:
         self.is_mod = False
@@ -59,105 +80,240 @@ class KeyPress:
 
         self.lock_safe = self.keysym.startswith("XF86")
 
-        self._ready_to_fire = False
-
-    def process(self, event: KeyEvent, locked: bool) -> int:
-        if locked and not self.lock_safe:
-            return -1
-
-        if self.keysym == '':
-            if event.is_mod:
-                p = event.modifiers.pressed(event.last_modifiers)
-                if p == self.mod:
-                    self._ready_to_fire = True
-                    return 0
-
-                p = event.last_modifiers.pressed(event.modifiers)
-                if self._ready_to_fire and \
-                        p == self.mod:
-                    self._ready_to_fire = False
-                    return 1
-            else:
-                self._ready_to_fire = False
-
-        else:
-            if event.is_mod:
-                return 0
-            else:
-                if event.pressed and event.keysyms == self.keysym and \
-                        event.modifiers == self.mod:
-                    self._ready_to_fire = True
-                    return 0
-
-                if not event.pressed and event.keysyms == self.keysym and \
-                        self._ready_to_fire:
-                    self._ready_to_fire = False
-                    return 1
-
-        return -1
-
-    def clear(self) -> None:
-        self._ready_to_fire = False
+    """
+    Modifier-only presses ("L-") have an empty keysym
+    """
+    def key(self) -> tuple[int, str]:
+        return _mod_bits(self.mod), self.keysym
 
 class KeyBinding:
     def __init__(self, keys: str, action: Callable[[], Any]) -> None:
         _keys = keys.strip().split(" ")
         _keys = [k for k in _keys if k != ""]
+        self.keys = keys
         self._presses = [KeyPress(k) for k in _keys]
-        self._at = 0
-
         self._action = action
 
-    def process(self, event: KeyEvent, locked: bool) -> int:
-        result = self._presses[self._at].process(event, locked)
 
-        if result == 1:
-            if self._at == len(self._presses) - 1:
-                self._action()
-                self._at = 0
-                return 1
-            else:
-                self._at += 1
-                return 0
-        elif result == 0:
-            return 0
-        elif result == -1:
-            self._at = 0
+class _Node:
+    def __init__(self) -> None:
+        self.children: dict[tuple[int, str], _Node] = {}
+        self.lock_safe = False
+        self.binding: Optional[KeyBinding] = None
 
-        return -1
 
-    def clear(self) -> None:
-        self._at = 0
-        for p in self._presses:
-            p.clear()
+class KeyProcessor:
+    """
+    Bindings are compiled into a trie keyed on (modifiers, keysym) - every event is a constant number of
+    dict lookups, independent of the number of bindings
 
+    A press is armed on key down (exact modifiers) and fires on release of the same keysym, modifier-only
+    presses are armed on modifier down and fire on its release. Firing a press either advances the current
+    chord or runs the binding
 
-class KeyProcessor:
+    Every mode has its own trie, only the one of the active mode is consulted
+    """
     def __init__(self) -> None:
         self.bindings: list[KeyBinding] = []
+        self._roots: dict[str, _Node] = {DEFAULT_MODE: _Node()}
+        self.mode = DEFAULT_MODE
+        self._root = self._roots[self.mode]
+        self.on_mode_change: Optional[Callable[[str], None]] = None
+
+        """
+        Called from the timer thread once a bound chord prefix has timed out - its action is run by the next
+        on_frame (or key event) on the thread handling key events, so this should request a frame
+        """
+        self.on_chord_timeout: Optional[Callable[[], None]] = None
+
+        self._lock = Lock()
+        self._at = self._root
+        self._at_deadline: Optional[float] = None
+        self._expired = False
+        self._armed: Optional[tuple[str, _Node]] = None
+        self._armed_mod: Optional[tuple[int, _Node]] = None
+        self._timer: Optional[Timer] = None
 
     def clear(self) -> None:
-        self.bindings = []
-
-    def register_bindings(self, *bindings: tuple[str, Callable[[], Any]]) -> None:
-        for keys, action in bindings:
-            self.bindings += [KeyBinding(keys, action)]
+        with self._lock:
+            self.bindings = []
+            self._roots = {DEFAULT_MODE: _Node()}
+            self._root = self._roots[DEFAULT_MODE]
+            self._reset()
+
+            mode_changed = self.mode != DEFAULT_MODE
+            self.mode = DEFAULT_MODE
+
+        if mode_changed and self.on_mode_change is not None:
+            self.on_mode_change(self.mode)
+
+    def modes(self) -> list[str]:
+        return list(self._roots.keys())
+
+    def set_mode(self, mode: str) -> None:
+        with self._lock:
+            if mode not in self._roots:
+                logger.warn("Unknown key mode %s", mode)
+                return
+            if mode == self.mode:
+                return
+            self.mode = mode
+            self._root = self._roots[mode]
+            self._reset()
+
+        logger.debug("Key mode: %s", mode)
+        if self.on_mode_change is not None:
+            self.on_mode_change(mode)
+
+    def register_bindings(self, *bindings: tuple[str, Callable[[], Any]], mode: str=DEFAULT_MODE) -> None:
+        with self._lock:
+            if mode not in self._roots:
+                self._roots[mode] = _Node()
+
+            for keys, action in bindings:
+                binding = KeyBinding(keys, action)
+                if len(binding._presses) == 0:
+                    continue
+                self.bindings += [binding]
+
+                node = self._roots[mode]
+                for p in binding._presses:
+                    key = p.key()
+                    if key not in node.children:
+                        node.children[key] = _Node()
+                    node = node.children[key]
+                    node.lock_safe = p.lock_safe
+
+                if node.binding is not None:
+                    logger.warn("Duplicate key binding %s (mode %s) - ignoring", keys, mode)
+                else:
+                    node.binding = binding
+
+            self._reset()
+
+    def _reset(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._at = self._root
+        self._at_deadline = None
+        self._expired = False
+        self._armed = None
+        self._armed_mod = None
+
+    def _on_chord_timeout(self, node: _Node) -> None:
+        with self._lock:
+            if self._at is not node:
+                return
+            # time.time might not quite have reached the deadline
+            self._expired = True
+
+        if self.on_chord_timeout is not None:
+            self.on_chord_timeout()
+
+    def _timed_out(self) -> list[KeyBinding]:
+        if self._expired or (self._at_deadline is not None and time.time() > self._at_deadline):
+            if (b := self._leave_chord()) is not None:
+                return [b]
+        return []
+
+    def _fire(self, node: _Node) -> Optional[KeyBinding]:
+        """
+        Returns binding to execute (outside of the lock)
+        """
+        self._armed = None
+        self._armed_mod = None
+
+        if len(node.children) == 0:
+            self._reset()
+            return node.binding
+
+        # Chord continues
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        self._at = node
+        self._at_deadline = time.time() + conf_chord_timeout()
+        self._expired = False
+        if node.binding is not None:
+            self._timer = Timer(conf_chord_timeout(), self._on_chord_timeout, (node,))
+            self._timer.daemon = True
+            self._timer.start()
+        return None
+
+    def _leave_chord(self) -> Optional[KeyBinding]:
+        """
+        Chord has been broken - run the action of the chord so far, if it is bound itself
+        """
+        node = self._at
+        self._reset()
+        return node.binding
+
+    def _child(self, key: tuple[int, str], locked: bool) -> Optional[_Node]:
+        node = self._at.children.get(key, None)
+        if node is not None and locked and not node.lock_safe:
+            return None
+        return node
+
+    def _on_key(self, event: KeyEvent, locked: bool) -> tuple[bool, list[KeyBinding]]:
+        execute: list[KeyBinding] = []
+        self._armed_mod = None
+
+        if event.pressed:
+            key = _mod_bits(event.modifiers), event.keysyms
+            node = self._child(key, locked)
+
+            if node is None and self._at is not self._root:
+                if (b := self._leave_chord()) is not None:
+                    execute += [b]
+                node = self._child(key, locked)
+
+            if node is None:
+                self._armed = None
+                return False, execute
+
+            self._armed = event.keysyms, node
+            return True, execute
+
+        if self._armed is not None and self._armed[0] == event.keysyms:
+            if (b := self._fire(self._armed[1])) is not None:
+                execute += [b]
+            return True, execute
+
+        return False, execute
+
+    def _on_mod(self, event: KeyEvent, locked: bool) -> tuple[bool, list[KeyBinding]]:
+        execute: list[KeyBinding] = []
+
+        pressed = _mod_bits(event.modifiers.pressed(event.last_modifiers))
+        if pressed != 0:
+            node = self._child((pressed, ""), locked)
+            if node is not None:
+                self._armed_mod = pressed, node
+
+        released = _mod_bits(event.last_modifiers.pressed(event.modifiers))
+        if released != 0 and self._armed_mod is not None and self._armed_mod[0] == released:
+            if (b := self._fire(self._armed_mod[1])) is not None:
+                execute += [b]
+
+        return self._armed is not None or self._armed_mod is not None or self._at is not self._root, execute
 
     def on_event(self, event: KeyEvent, locked: bool) -> bool:
-        return_True = False
-        triggered = False
-        for b in self.bindings:
-            if triggered:
-                b.clear()
+        with self._lock:
+            # Chord timed out before a frame got to it
+            timed_out = self._timed_out()
+
+            if event.is_mod:
+                result, execute = self._on_mod(event, locked)
             else:
-                result = b.process(event, locked)
-                if result == 1:
-                    triggered = True
-                    return_True = True
-                if result == 0:
-                    return_True = True
+                result, execute = self._on_key(event, locked)
+            execute = timed_out + execute
+
+        for b in execute:
+            b._action()
 
-        return return_True
+        return result
 
     def on_key(self, pressed: bool, keysyms: str, modifiers: PyWMModifiers, locked: bool) -> bool:
         return self.on_event(KeyEvent().set_from_key(pressed, keysyms, modifiers), locked)
@@ -165,7 +321,18 @@ class KeyProcessor:
     def on_modifiers(self, modifiers: PyWMModifiers, last_modifiers: PyWMModifiers, locked: bool) -> bool:
         return self.on_event(KeyEvent().set_from_mod(modifiers, last_modifiers), locked)
 
-    def on_other_action(self) -> None:
-        for b in self.bindings:
-            b.clear()
+    def on_frame(self) -> None:
+        """
+        Runs the action of a timed out chord prefix - on the same thread as key events
+        """
+        if self._at_deadline is None:
+            return
+        with self._lock:
+            execute = self._timed_out()
+
+        for b in execute:
+            b._action()
 
+    def on_other_action(self) -> None:
+        with self._lock:
+            self._reset()
@@ -1,12 +1,13 @@
 from __future__ import annotations
-from typing import Optional, Callable, TYPE_CHECKING, TypeVar, Union, Any, cast
+from typing import Optional, Callable, TYPE_CHECKING, TypeVar, Union, Any, Iterator, cast
 
 import time
 import math
 import logging
 import os
-from itertools import product
-from threading import Thread
+from threading import Thread, Event, Lock, local
+from collections import deque
+from contextlib import contextmanager
 
 from pywm import (
     PyWM,
@@ -17,21 +18,27 @@ from pywm import (
     PYWM_PRESSED,
 )
 from .gestures import Gesture
-from .gestures.provider import GestureProvider, CGestureProvider, PyEvdevGestureProvider
+from .gestures.provider import GestureProvider, CGestureProvider
 
-from .workspace import Workspace
+from .workspace import Workspace, WorkspaceRegistry
 from .state import LayoutState, WorkspaceState
 from .interpolation import LayoutDownstreamInterpolation
 from .animate import Animate, Animatable
 from .view import View
-from .config import configured_value, load_config, print_config
+from .config import configured_value, load_config, print_config, config_changed, active_config_path
+from .config_watcher import ConfigWatcher
+from .util import startup_tracer
 
-from .key_processor import KeyProcessor
-from .dbus import DBusEndpoint, DBusGestureProvider
+from .key_processor import KeyProcessor, DEFAULT_MODE
 from .panel_launcher import PanelsLauncher
+from .process_tree import ProcessTree
 from .auth_backend import AuthBackend
 
-from .widget import TopBar, BottomBar, Background, Corner, FocusBorders
+from .widget import Background, Corner, FocusBorders
+from .widget.pool import WidgetPool
+from .resize_scheduler import ResizeScheduler
+from .overview import OverviewThumbnails
+from .session import SessionStore
 from .overlay import (
     Overlay,
     MoveResizeOverlay,
@@ -41,8 +48,19 @@ from .overlay import (
     LauncherOverlay,
 )
 
+if TYPE_CHECKING:
+    from .dbus import DBusEndpoint
+    from .ipc import IPCServer
+    from .widget import TopBar, BottomBar
+
 logger = logging.getLogger(__name__)
 
+"""
+Subsystems not needed to display the first frame (D-Bus, panels, auth, pyevdev, native bars) are
+started after it has been rendered, at the latest after this timeout
+"""
+DEFERRED_INIT_TIMEOUT = 2.0
+
 conf_pywm = configured_value("pywm", cast(dict[str, Any], {}))
 
 conf_outputs = configured_value("outputs", cast(list[dict[str, Any]], []))
@@ -51,11 +69,18 @@ conf_send_fullscreen_to_views = configured_value("view.send_fullscreen", True)
 
 if TYPE_CHECKING:
     TKeyBindings = Callable[[Layout], list[tuple[str, Callable[[], None]]]]
+    TKeyModes = Callable[["Layout"], dict[str, list[tuple[str, Callable[[], None]]]]]
 else:
     TKeyBindings = TypeVar("TKeyBindings")
+    TKeyModes = TypeVar("TKeyModes")
 
 conf_key_bindings = configured_value("key_bindings", cast(TKeyBindings, lambda layout: []))
 
+"""
+Additional key binding modes (entered via layout.set_key_mode) - only bindings of the active mode are processed
+"""
+conf_key_modes = configured_value("key_modes", cast(TKeyModes, lambda layout: {}))
+
 conf_anim_t = configured_value("anim_time", .3)
 conf_blend_t = configured_value("blend_time", 1.0)
 
@@ -86,75 +111,19 @@ conf_synchronous_update = configured_value("synchronous_update", lambda: None)
 conf_enable_pyevdev_gestures = configured_value("gestures.pyevdev.enabled", False)
 conf_enable_c_gestures = configured_value("gestures.c.enabled", True)
 conf_enable_dbus_gestures = configured_value("gestures.dbus.enabled", True)
+conf_enable_ipc = configured_value("ipc.enabled", True)
 
 conf_enable_unlock_command = configured_value("enable_unlock_command", True)
 
+conf_config_watch_enabled = configured_value("config_watch.enabled", True)
+conf_config_watch_debounce = configured_value("config_watch.debounce", .3)
+
 conf_gesture_binding_swipe_to_zoom = configured_value("gesture_bindings.swipe_to_zoom", (None, "swipe-4"))
 conf_gesture_binding_swipe = configured_value("gesture_bindings.swipe", (None, "swipe-3"))
 conf_gesture_binding_move_resize = configured_value("gesture_bindings.move_resize", ("L", "move-1", "swipe-2"))
 conf_gesture_binding_launcher = configured_value("gesture_bindings.launcher", (None, "swipe-5"))
 
 
-def _score(
-    i1: float,
-    j1: float,
-    w1: float,
-    h1: float,
-    im: int,
-    jm: int,
-    i2: float,
-    j2: float,
-    w2: float,
-    h2: float,
-) -> float:
-
-    if (i1, j1, w1, h1) == (i2, j2, w2, h2):
-        return 1000
-
-    if im < 0:
-        im *= -1
-        i1 *= -1
-        i2 *= -1
-        i1 -= w1
-        i2 -= w2
-    if jm < 0:
-        jm *= -1
-        j1 *= -1
-        j2 *= -1
-        j1 -= h1
-        j2 -= h2
-
-    if jm == 1 and im == 0:
-        im, jm = jm, im
-        i1, j1, w1, h1 = j1, i1, h1, w1
-        i2, j2, w2, h2 = j2, i2, h2, w2
-
-    """
-    At this point: Either im == 1, jm == 0 or im == jm == 1
-    """
-    d_i = i2 - (i1 + w1)
-    if d_i < 0:
-        return 1000
-
-    if jm == 1:
-        d_j = j2 - (j1 + h1)
-        if d_j < 0:
-            return 1000
-
-        return d_i + d_j
-
-    else:
-        d_j = 0.0
-        if j2 >= j1 + h1:
-            d_j = j2 - (j1 + h1)
-        elif j1 >= j2 + h2:
-            d_j = j1 - (j2 + h2)
-        else:
-            d_j = -1
-
-        return d_i + d_j
-
-
 class Animation:
     def __init__(
         self,
@@ -207,6 +176,7 @@ class Animation:
         return False
 
     def start(self) -> None:
+        self.layout.flush_mutations()
         try:
             self._initial_state, self._final_state = self.reducer(self.layout.state)
         except:
@@ -239,6 +209,91 @@ class Animation:
         )
 
 
+class _Batch:
+    """
+    Reducers collected by Layout.batch - combined into a single Animation
+    """
+    def __init__(self, layout: Layout) -> None:
+        self.layout = layout
+        self.reducers: list[Callable[[LayoutState], tuple[Optional[LayoutState], Optional[LayoutState]]]] = []
+        self.thens: list[Callable[..., None]] = []
+        self.duration = 0.
+        self.overlay_safe = True
+
+    def add(
+        self,
+        reducer: Callable[
+            [LayoutState], tuple[Optional[LayoutState], Optional[LayoutState]]
+        ],
+        duration: float,
+        then: Optional[Callable[..., None]],
+        overlay_safe: bool,
+    ) -> None:
+        self.reducers += [reducer]
+        if then is not None:
+            self.thens += [then]
+        self.duration = max(self.duration, duration)
+        self.overlay_safe &= overlay_safe
+
+    @staticmethod
+    def _view_handles(state: LayoutState) -> set[int]:
+        return {h for ws_state in state._workspace_states.values() for h in ws_state._view_states.keys()}
+
+    @staticmethod
+    def _with_new_views(base: LayoutState, initial: LayoutState, handles: set[int]) -> LayoutState:
+        """
+        base plus the views of initial which are not in handles
+        """
+        res = base.copy()
+        for ws_handle, ws_state in initial._workspace_states.items():
+            if ws_handle not in res._workspace_states:
+                continue
+            target = res._workspace_states[ws_handle]
+            for h, s in ws_state._view_states.items():
+                if h not in handles:
+                    target._view_states[h] = s.copy()
+                    target._view_index = None
+        return res
+
+    def reducer(self, state: LayoutState) -> tuple[Optional[LayoutState], Optional[LayoutState]]:
+        """
+        Every reducer is applied to the result of the previous one. An initial state is used as a whole if it is
+        returned before anything else has changed - from later initial states only the views they introduce are
+        taken over (e.g. View.show of several views, so each of them gets its show animation)
+        """
+        initial: Optional[LayoutState] = None
+        current = state
+        for r in self.reducers:
+            handles = self._view_handles(current)
+            try:
+                i, f = r(current)
+            except:
+                logger.exception("During batched reducer")
+                continue
+
+            if i is not None:
+                if current is state:
+                    initial = i
+                else:
+                    initial = self._with_new_views(initial if initial is not None else state, i, handles)
+                current = i
+            if f is not None:
+                f.constrain_and_validate()
+                current = f
+
+        return initial, current
+
+    def then(self) -> None:
+        for t in self.thens:
+            try:
+                t()
+            except:
+                logger.exception("During batched then")
+
+    def animation(self) -> Animation:
+        return Animation(self.layout, self.reducer, self.duration, self.then, self.overlay_safe)
+
+
 class LayoutThread(Thread):
     def __init__(self, layout: Layout) -> None:
         super().__init__()
@@ -315,31 +370,59 @@ class LayoutThread(Thread):
 class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
     def __init__(self, debug: bool = False, config_file: Optional[str] = None) -> None:
         self._config_file = config_file
-        load_config(path_str=self._config_file)
+        with startup_tracer.span("load_config"):
+            load_config(path_str=self._config_file)
 
         self._debug = debug
-        PyWM.__init__(self, View, **conf_pywm(), outputs=conf_outputs(), debug=debug)
+        with startup_tracer.span("PyWM()"):
+            PyWM.__init__(self, View, **conf_pywm(), outputs=conf_outputs(), debug=debug)
         Animate.__init__(self)
 
         self.key_processor = KeyProcessor()
+        self.key_processor.on_mode_change = self._on_key_mode_change
+        self.key_processor.on_chord_timeout = self.damage
         self.auth_backend = AuthBackend(self)
         self.panel_launcher = PanelsLauncher()
-        self.dbus_endpoint = DBusEndpoint(self)
+        self.process_tree = ProcessTree()
+        self.dbus_endpoint: Optional[DBusEndpoint] = None
+        self.ipc_server: Optional[IPCServer] = None
+        self.config_watcher: Optional[ConfigWatcher] = None
+
+        self._first_frame = Event()
+        self._deferred_ready = False
 
         self.gesture_providers: list[GestureProvider] = []
 
         self.workspaces: list[Workspace] = [
             Workspace(PyWMOutput("dummy", -1, 1.0, 1280, 720, (0, 0)), 0, 0, 1280, 720)
         ]
+        self.workspace_registry = WorkspaceRegistry(self.workspaces)
 
         self.state = LayoutState(self)
 
+        """
+        Single writer: in-place changes (overlays, gestures) are queued and applied to a copy of the state
+        which then replaces it - self.state is never changed while it is being read
+        """
+        self._mutations: deque[Callable[[LayoutState], None]] = deque()
+        self._state_lock = Lock()
+
+        """
+        Open batch (see batch) per thread
+        """
+        self._batches = local()
+
         self.overlay: Optional[Overlay] = None
 
         self.backgrounds: list[Background] = []
         self.top_bars: list[TopBar] = []
         self.bottom_bars: list[BottomBar] = []
         self.corners: list[list[Corner]] = []
+        self.widget_pool = WidgetPool(self)
+        self.resize_scheduler = ResizeScheduler()
+        self.overview_thumbnails = OverviewThumbnails(self)
+        self.session = SessionStore(self)
+        self.session.load()
         self.focus_borders: FocusBorders = FocusBorders(self)
 
         self.thread = LayoutThread(self)
@@ -399,12 +482,15 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
                     break
                 h += 1
             w._handle = h
+        self.workspace_registry = WorkspaceRegistry(self.workspaces)
 
         logger.debug("Setup of newm workspaces")
         for w in self.workspaces:
             logger.debug("  %s" % str(w))
 
-        self.state = self.state.with_workspaces(self)
+        with self._state_lock:
+            self.state = self.state.with_workspaces(self)
+        self._publish_state()
         self._update_active_workspace()
 
     def _update_active_workspace(self) -> None:
@@ -419,14 +505,7 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
         self._active_workspace = ws_check1, ws_check2
 
         # Find ws cursor is on
-        ws: Optional[Workspace] = None
-        for w in self.workspaces:
-            if (
-                w.pos_x <= self.cursor_pos[0] < w.pos_x + w.width
-                and w.pos_y <= self.cursor_pos[1] < w.pos_y + w.height
-            ):
-                ws = w
-                break
+        ws = self.workspace_registry.at(self.cursor_pos[0], self.cursor_pos[1])
 
         # Possibly update ws after cursor move
         if ws is None:
@@ -436,17 +515,50 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
             if ws_old != ws:
                 self._active_workspace = ws, None
 
-    def _setup_widgets(self) -> None:
+    def _setup_widgets(self, changed: Optional[set[str]] = None) -> None:
+        """
+        changed: Config keys which have changed - only rebuild affected widgets (None: rebuild all)
+        """
         def get_workspace_for_output(output: PyWMOutput) -> Workspace:
-            for w in self.workspaces:
-                if (
-                    w.pos_x <= output.pos[0] < w.pos_x + w.width
-                    and w.pos_y <= output.pos[1] < w.pos_y + w.height
-                ):
-                    return w
+            if (w := self.workspace_registry.at(output.pos[0], output.pos[1])) is not None:
+                return w
             logger.warn("Workspaces do not cover whole area")
             return self.workspaces[0]
 
+        if config_changed(changed, "panels.top_bar.native", "panels.bottom_bar.native"):
+            self._setup_bars()
+
+        if config_changed(changed, "background", "outputs"):
+            for bg in self.backgrounds:
+                bg.destroy()
+
+            self.backgrounds = [
+                self.create_widget(Background, o, get_workspace_for_output(o))
+                for o in self.layout
+            ]
+
+        if config_changed(changed, "corner_radius"):
+            for c in self.corners:
+                for c2 in c:
+                    c2.destroy()
+            self.corners = []
+
+            for o in self.layout:
+                self.corners += [
+                    [
+                        self.create_widget(Corner, o, True, True),
+                        self.create_widget(Corner, o, True, False),
+                        self.create_widget(Corner, o, False, True),
+                        self.create_widget(Corner, o, False, False),
+                    ]
+                ]
+
+        if config_changed(changed, "focus", "view.corner_radius"):
+            self.focus_borders.update()
+
+        self.damage()
+
+    def _setup_bars(self) -> None:
         for b in self.bottom_bars:
             b.stop()
             b.destroy()
@@ -457,93 +569,89 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
             t.destroy()
         self.top_bars = []
 
-        for bg in self.backgrounds:
-            bg.destroy()
-        self.backgrounds = []
+        # Native bars (cairo) are set up after the first frame
+        if not self._deferred_ready:
+            return
 
-        for c in self.corners:
-            for c2 in c:
-                c2.destroy()
-        self.corners = []
+        from .widget import TopBar, BottomBar
 
         if conf_native_bottom_bar_enabled():
             self.bottom_bars = [self.create_widget(BottomBar, o) for o in self.layout]
-        else:
-            self.bottom_bars = []
 
         if conf_native_top_bar_enabled():
             self.top_bars = [self.create_widget(TopBar, o) for o in self.layout]
-        else:
-            self.top_bars = []
-
-        self.backgrounds = [
-            self.create_widget(Background, o, get_workspace_for_output(o))
-            for o in self.layout
-        ]
-
-        for o in self.layout:
-            self.corners += [
-                [
-                    self.create_widget(Corner, o, True, True),
-                    self.create_widget(Corner, o, True, False),
-                    self.create_widget(Corner, o, False, True),
-                    self.create_widget(Corner, o, False, False),
-                ]
-            ]
-
-        self.focus_borders.update()
-
-        self.damage()
-
-    def _setup(self, reconfigure: bool = True) -> None:
-        self._setup_widgets()
-
-        self.key_processor.clear()
-        if (kb := conf_key_bindings()) is not None:
-            self.key_processor.register_bindings(*kb(self))
 
+    def _setup_gesture_providers(self) -> None:
         # Stop and re-setup Gestures
         for g in self.gesture_providers:
             g.stop()
         self.gesture_providers = []
 
-        dbus_gesture_provider: Optional[DBusGestureProvider] = None
-        if conf_enable_dbus_gestures():
-            dbus_gesture_provider = DBusGestureProvider(
-                self.dbus_endpoint, self._gesture_provider_callback
-            )
-            self.dbus_endpoint.set_gesture_provider(dbus_gesture_provider)
-
-        self.gesture_providers = (
-            cast(
-                list[GestureProvider],
-                [PyEvdevGestureProvider(self._gesture_provider_callback)]
-                if conf_enable_pyevdev_gestures()
-                else [],
-            )
-            + cast(
-                list[GestureProvider],
-                [CGestureProvider(self._gesture_provider_callback)]
-                if conf_enable_c_gestures()
-                else [],
-            )
-            + cast(
-                list[GestureProvider],
-                [dbus_gesture_provider] if dbus_gesture_provider is not None else [],
-            )
-        )
+        gesture_providers: list[GestureProvider] = []
+        if conf_enable_c_gestures():
+            gesture_providers += [CGestureProvider(self._gesture_provider_callback)]
+
+        # pyevdev and D-Bus gestures are set up after the first frame
+        if self._deferred_ready:
+            if conf_enable_pyevdev_gestures():
+                from .gestures.provider import PyEvdevGestureProvider
+                gesture_providers += [PyEvdevGestureProvider(self._gesture_provider_callback)]
+
+            if conf_enable_dbus_gestures() and self.dbus_endpoint is not None:
+                from .dbus import DBusGestureProvider
+                dbus_gesture_provider = DBusGestureProvider(
+                    self.dbus_endpoint, self._gesture_provider_callback
+                )
+                self.dbus_endpoint.set_gesture_provider(dbus_gesture_provider)
+                gesture_providers += [dbus_gesture_provider]
+
+        self.gesture_providers = gesture_providers
 
         # Start gesture providers
         for p in self.gesture_providers:
             p.start()
 
+    def _setup_config_watcher(self) -> None:
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+            self.config_watcher = None
+
+        path = active_config_path()
+        if not conf_config_watch_enabled() or path is None or path.name == "default_config.py":
+            return
+
+        self.config_watcher = ConfigWatcher(path, conf_config_watch_debounce(), self.update_config)
+        self.config_watcher.start()
+
+    def _setup(self, reconfigure: bool = True, changed: Optional[set[str]] = None) -> None:
+        """
+        changed: Config keys which have changed - only set up affected subsystems (None: set up everything)
+        """
+        self._setup_widgets(changed)
+
+        if config_changed(changed, "key_bindings", "key_modes"):
+            self.key_processor.clear()
+            if (kb := conf_key_bindings()) is not None:
+                self.key_processor.register_bindings(*kb(self))
+            if (km := conf_key_modes()) is not None:
+                for mode, bindings in km(self).items():
+                    self.key_processor.register_bindings(*bindings, mode=mode)
+
+        if config_changed(changed, "gestures"):
+            self._setup_gesture_providers()
+
+        if self._deferred_ready and config_changed(changed, "config_watch"):
+            self._setup_config_watcher()
+
         if reconfigure:
-            self.reconfigure(
-                dict(**conf_pywm(), outputs=conf_outputs(), debug=self._debug)
-            )
+            if config_changed(changed, "pywm", "outputs"):
+                self.reconfigure(
+                    dict(**conf_pywm(), outputs=conf_outputs(), debug=self._debug)
+                )
 
-            for v in self._views.values():
-                v.update()
+            if config_changed(changed, "view", "panels", "pywm", "outputs"):
+                for v in self._views.values():
+                    v.update()
 
     def reducer(self, state: LayoutState) -> PyWMDownstreamState:
         return PyWMDownstreamState(state.lock_perc)
@@ -557,16 +665,79 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
         self._animate(LayoutDownstreamInterpolation(self, cur, nxt), dt)
 
     def process(self) -> PyWMDownstreamState:
+        if not self._first_frame.is_set():
+            startup_tracer.mark("First frame")
+            self._first_frame.set()
+        self.key_processor.on_frame()
+        if (ovr := self.overlay) is not None:
+            ovr.on_frame(time.time())
+        self.flush_mutations()
         return self._process(self.reducer(self.state))
 
+    def _deferred_init(self) -> None:
+        self._first_frame.wait(timeout=DEFERRED_INIT_TIMEOUT)
+
+        with startup_tracer.span("Deferred init"):
+            if conf_enable_ipc():
+                with startup_tracer.span("IPCServer()"):
+                    from .ipc import IPCServer
+                    self.ipc_server = IPCServer(self)
+
+            with startup_tracer.span("SessionStore.start"):
+                self.session.restore_workspaces()
+                self.session.start()
+
+            with startup_tracer.span("PanelsLauncher.start"):
+                self.panel_launcher.start()
+
+            with startup_tracer.span("DBusEndpoint()"):
+                from .dbus import DBusEndpoint
+                self.dbus_endpoint = DBusEndpoint(self)
+
+            with startup_tracer.span("AuthBackend.init"):
+                self.auth_backend.init()
+                self.auth_backend.publish_pending()
+
+            with startup_tracer.span("ProcessTree.start"):
+                self.process_tree.start()
+
+            self._deferred_ready = True
+
+            with startup_tracer.span("Gesture providers"):
+                self._setup_gesture_providers()
+
+            with startup_tracer.span("Native bars"):
+                self._setup_bars()
+                self.damage()
+
+            self._setup_config_watcher()
+
+            # Start after gesture provider has been set
+            with startup_tracer.span("DBusEndpoint.start"):
+                self.dbus_endpoint.start()
+
+            if self.ipc_server is not None:
+                with startup_tracer.span("IPCServer.start"):
+                    self.ipc_server.connect_events(self.dbus_endpoint.events.signals())
+                    self.ipc_server.start()
+
+        startup_tracer.finish()
+
+        # Greeter
+        if self.auth_backend.is_greeter():
+            while len([p for p in self.panels() if p.panel == "lock"]) < 1:
+                time.sleep(0.5)
+            self.ensure_locked()
+            self.auth_backend.init_session()
+
     def main(self) -> None:
         logger.debug("Layout main...")
 
-        self._setup(reconfigure=False)
+        with startup_tracer.span("Layout._setup"):
+            self._setup(reconfigure=False)
 
         self.thread.start()
-        self.panel_launcher.start()
-        self.dbus_endpoint.start()
+        Thread(target=self._deferred_init).start()
 
         # Initially display cursor
         self.update_cursor()
@@ -590,21 +761,17 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
 
         Thread(target=fade_in).start()
 
-        # Greeter
-        if self.auth_backend.is_greeter():
-
-            def greet() -> None:
-                while len([p for p in self.panels() if p.panel == "lock"]) < 1:
-                    time.sleep(0.5)
-                self.ensure_locked()
-                self.auth_backend.init_session()
-
-            Thread(target=greet).start()
-
     def _terminate(self) -> None:
         super().terminate()
-        self.dbus_endpoint.stop()
+        if self.dbus_endpoint is not None:
+            self.dbus_endpoint.stop()
+        if self.ipc_server is not None:
+            self.ipc_server.stop()
+        self.session.stop()
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
         self.panel_launcher.stop()
+        self.process_tree.stop()
         for p in self.gesture_providers:
             p.stop()
 
@@ -624,12 +791,74 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
         then: Optional[Callable[..., None]] = None,
         overlay_safe: bool = False,
     ) -> None:
+        batch: Optional[_Batch] = getattr(self._batches, "current", None)
+        if batch is not None:
+            batch.add(reducer, duration, then, overlay_safe)
+            return
         self.thread.push(Animation(self, reducer, duration, then, overlay_safe))
 
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        All animations requested within (on this thread) become one: their reducers are applied in sequence and
+        the combined result is animated to once, e.g.
+
+            with layout.batch():
+                layout.move_focused_view(1, 0)
+                layout.basic_scale(1)
+
+        Anything evaluated outside of reducers (e.g. the focused view) still sees the state before the batch.
+        Nested batches join the outermost one
+        """
+        if getattr(self._batches, "current", None) is not None:
+            yield
+            return
+
+        batch = _Batch(self)
+        self._batches.current = batch
+        try:
+            yield
+        finally:
+            self._batches.current = None
+            if len(batch.reducers) > 0:
+                self.thread.push(batch.animation())
+
+    def command_batch(self, commands: list[tuple[str, Optional[str]]]) -> list[Optional[str]]:
+        with self.batch():
+            return [self.command(cmd, arg) for cmd, arg in commands]
+
     def update(self, new_state: LayoutState) -> None:
-        self.state = new_state
+        with self._state_lock:
+            self.state = new_state
+        self._publish_state()
+        self.damage()
+
+    def mutate(self, mutation: Callable[[LayoutState], None]) -> None:
+        """
+        Change the state in place - applied on the next frame (or before the next animation starts)
+        """
+        self._mutations.append(mutation)
         self.damage()
 
+    def flush_mutations(self) -> None:
+        if len(self._mutations) == 0:
+            return
+
+        with self._state_lock:
+            state = self.state.copy()
+            while len(self._mutations) > 0:
+                mutation = self._mutations.popleft()
+                try:
+                    mutation(state)
+                except Exception:
+                    logger.exception("During state mutation")
+            self.state = state
+        self._publish_state()
+
+    def _publish_state(self) -> None:
+        if self.dbus_endpoint is not None:
+            self.dbus_endpoint.publish_state(self.state)
+
     def _all_animates(self) -> list[Animatable]:
         return [
             self,
@@ -688,7 +917,7 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
             if view is not None:
                 view_state, ws_state, ws_handle = self.state.find_view(view)
 
-            ws = [w for w in self.workspaces if w._handle == ws_handle][0]
+            ws = self.workspace_registry.get(ws_handle)
             return ws, view_state.i, view_state.j, view_state.w, view_state.h
         except Exception:
             return self.workspaces[0], 0, 0, 1, 1
@@ -731,30 +960,26 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
         elif (view_max_j - view_min_j) > (max_j - min_j):
             place_i, place_j = max(min_i, view_min_i), max_j + 1
         else:
-            i, j = ws_state.i, ws_state.j
-            for j, i in product(
-                range(math.floor(j), math.ceil(j + ws_state.size)),
-                range(math.floor(i), math.ceil(i + ws_state.size)),
-            ):
-                for jp, ip in product(range(j, j + h), range(i, i + w)):
-                    if not ws_state.is_tile_free(ip, jp):
-                        break
-                else:
-                    place_i, place_j = i, j
-                    break
+            occupancy = ws_state.occupancy()
+            place = occupancy.find_free(
+                math.floor(ws_state.i), math.floor(ws_state.j),
+                math.ceil(ws_state.i + ws_state.size) - 1, math.ceil(ws_state.j + ws_state.size) - 1,
+                w, h)
+            if place is not None:
+                place_i, place_j = place
             else:
                 ws_, i_, j_, w_, h_ = self.find_focused_box()
                 if ws_._handle != workspace._handle:
                     i_, j_, w_, h_ = 0, 0, 1, 1
 
                 place_i, place_j = round(i_ + w_), round(j_)
-                while not ws_state.is_tile_free(place_i, place_j):
-                    place_i += 1
+                place_i = occupancy.next_free(place_i, place_j)
 
         logger.debug("Found initial placement at %d, %d", place_i, place_j)
         return place_i, place_j
 
     def on_layout_change(self) -> None:
+        self.widget_pool.clear()
         self._setup_workspaces()
         self._setup_widgets()
 
@@ -813,6 +1038,8 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
         if self.is_locked():
             return False
 
+        self.overview_thumbnails.on_cursor(self.cursor_pos[0], self.cursor_pos[1])
+
         for g in self.gesture_providers:
             res = g.on_pywm_motion(time_msec, delta_x, delta_y)
             if res == 2:
@@ -1034,32 +1261,18 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
                     best_view = p._handle
 
             if best_view is None:
-                best_view_score = 1000.0
-                for k, s in ws_state._view_states.items():
-                    if not s.is_tiled:
-                        continue
-
-                    if k == view._handle:
-                        continue
-
-                    i, j, w, h = state.i, state.j, state.w, state.h
-                    if state.is_layer:
-                        i, j = (
-                            ws_state.i + 0.5 * ws_state.size,
-                            ws_state.j + 0.5 * ws_state.size,
-                        )
-                        w, h = 0, 0
-                    elif not state.is_tiled:
-                        i, j = state.float_pos
-                        w, h = 0, 0
-
-                    sc = (s.i - i + s.w / 2.0 - w / 2.0) ** 2 + (
-                        s.j - j + s.h / 2.0 - h / 2.0
-                    ) ** 2
-                    logger.debug("View (%d) has score %f", k, sc)
-                    if sc < best_view_score:
-                        best_view_score = sc
-                        best_view = k
+                i, j, w, h = state.i, state.j, state.w, state.h
+                if state.is_layer:
+                    i, j = (
+                        ws_state.i + 0.5 * ws_state.size,
+                        ws_state.j + 0.5 * ws_state.size,
+                    )
+                    w, h = 0, 0
+                elif not state.is_tiled:
+                    i, j = state.float_pos
+                    w, h = 0, 0
+
+                best_view = ws_state.view_index().nearest(i + w / 2.0, j + h / 2.0, exclude=view._handle, max_sq=1000.0)
 
         if best_view is not None and best_view in self._views:
             logger.debug("Found view to focus: %s" % self._views[best_view])
@@ -1108,7 +1321,7 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
     def focus_hint(self, view: View) -> None:
         try:
             _, __, ws_handle = self.state.find_view(view)
-            ws = [w for w in self.workspaces if w._handle == ws_handle][0]
+            ws = self.workspace_registry.get(ws_handle)
             ws.focus_view_hint = view._handle
 
             ws_a, ws_a_old = self._active_workspace
@@ -1152,6 +1365,9 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
             if arg is not None
             else None,
             "clean": clean,
+            "key-mode": lambda: self.set_key_mode(arg)
+            if arg is not None
+            else self.key_processor.mode,
             "unlock": self._trusted_unlock
             if conf_enable_unlock_command()
             else lambda: "Disabled",
@@ -1225,12 +1441,19 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
     """
 
     def update_config(self) -> None:
-        load_config(fallback=False, path_str=self._config_file)
-        self._setup()
+        changed = load_config(fallback=False, path_str=self._config_file)
+        self._setup(changed=changed)
         self.damage()
 
         conf_on_reconfigure()()
 
+    def set_key_mode(self, mode: str = DEFAULT_MODE) -> None:
+        self.key_processor.set_mode(mode)
+
+    def _on_key_mode_change(self, mode: str) -> None:
+        if self.dbus_endpoint is not None:
+            self.dbus_endpoint.set_key_mode(mode)
+
     def ensure_locked(self, anim: bool = True, dim: bool = False) -> None:
         def focus_lock() -> None:
             lock_screen = [v for v in self.panels() if v.panel == "lock"]
@@ -1241,6 +1464,9 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
 
         self.auth_backend.lock()
 
+        # Only bindings of the default mode are lock safe
+        self.set_key_mode(DEFAULT_MODE)
+
         def reducer(state: LayoutState) -> tuple[Optional[LayoutState], LayoutState]:
             return None if anim else state.copy(
                 lock_perc=1.0, background_opacity=0.5
@@ -1288,6 +1514,7 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
                 focused,
             )
 
+        self.overview_thumbnails.reset()
         self.animate_to(reducer, conf_anim_t())
 
     def toggle_fullscreen(self, defined_state: Optional[bool] = None) -> None:
@@ -1314,7 +1541,7 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
             ws_state: Optional[WorkspaceState] = None
             if view is not None:
                 view_state, ws_state, ws_handle = state.find_view(view)
-                ws = [w for w in self.workspaces if w._handle == ws_handle][0]
+                ws = self.workspace_registry.get(ws_handle)
             else:
                 ws = active_ws
                 ws_state = state.get_workspace_state(active_ws)
@@ -1408,18 +1635,7 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
                 self.focus_view(vf)
                 return
 
-        best_view = None
-        best_view_score = 1000.0
-
-        for k, s in ws_state._view_states.items():
-            if not s.is_tiled:
-                continue
-
-            sc = _score(i, j, w, h, delta_i, delta_j, s.i, s.j, s.w, s.h)
-            if sc < best_view_score:
-                best_view_score = sc
-                best_view = k
-
+        best_view = ws_state.view_index().in_direction((i, j, w, h), delta_i, delta_j)
         if best_view is not None:
             self.focus_view(self._views[best_view])
 
@@ -1472,7 +1688,7 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
             if view is not None:
                 try:
                     s, ws_state, ws_handle = state.find_view(view)
-                    ws = [w for w in self.workspaces if w._handle == ws_handle][0]
+                    ws = self.workspace_registry.get(ws_handle)
                     s1, s2 = view.toggle_floating(s, ws, ws_state)
 
                     ws_state1 = ws_state.with_view_state(view, **s1.__dict__)
@@ -1532,7 +1748,7 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
             if view is not None:
                 try:
                     s, ws_state, ws_handle = state.find_view(view)
-                    ws = [w for w in self.workspaces if w._handle == ws_handle][0]
+                    ws = self.workspace_registry.get(ws_handle)
                     ws_state = ws_state.replacing_view_state(
                         view, i=s.i + di, j=s.j + dj
                     ).focusing_view(view)
@@ -1564,7 +1780,7 @@ class Layout(PyWM[View], Animate[PyWMDownstreamState], Animatable):
                         j -= 1
 
                     s, ws_state, ws_handle = state.find_view(view)
-                    ws = [w for w in self.workspaces if w._handle == ws_handle][0]
+                    ws = self.workspace_registry.get(ws_handle)
                     ws_state = ws_state.replacing_view_state(
                         view, i=i, j=j, w=w, h=h
                     ).focusing_view(view)
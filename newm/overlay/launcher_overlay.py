@@ -63,7 +63,7 @@ class LauncherOverlay(Overlay):
     def _on_update(self, values: Optional[dict[str, float]]) -> None:
         if self._is_opened == False:
             perc = values['delta2_s'] * conf_gesture_factor() if values is not None else 1
-            self.layout.state.launcher_perc = max(min(perc, 1.0), 0.0)
+            self._set_perc(perc)
 
             if values is None:
                 self._is_opened = True
@@ -72,12 +72,14 @@ class LauncherOverlay(Overlay):
                         v.focus()
         else:
             perc = 1. - (values['delta2_s'] * conf_gesture_factor() if values is not None else 1)
-            self.layout.state.launcher_perc = max(min(perc, 1.0), 0.0)
+            self._set_perc(perc)
 
             if values is None:
                 self.layout.exit_overlay()
 
-        self.layout.damage()
+    def _set_perc(self, perc: float) -> None:
+        perc = max(min(perc, 1.0), 0.0)
+        self.mutate(lambda state: state.update(launcher_perc=perc))
 
 
     def on_key(self, time_msec: int, keycode: int, state: int, keysyms: str) -> bool:
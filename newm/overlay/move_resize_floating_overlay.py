@@ -11,7 +11,7 @@ from ..config import configured_value
 from ..gestures import Gesture, GestureListener, LowpassGesture
 
 if TYPE_CHECKING:
-    from ..layout import Layout
+    from ..layout import Layout, Workspace
     from ..view import View
     from ..state import LayoutState
 
@@ -40,16 +40,12 @@ class MoveResizeFloatingOverlay(Overlay):
 
         try:
             state, self.ws_state, ws_handle = self.layout.state.find_view(self.view)
-            self.workspace = [w for w in self.layout.workspaces if w._handle == ws_handle][0]
+            self.workspace = self.layout.workspace_registry.get(ws_handle)
             self.i, self.j = state.float_pos
             self.w, self.h = state.float_size
 
-            self.layout.update(
-                self.layout.state.setting_workspace_state(
-                    self.workspace, self.ws_state.replacing_view_state(
-                        self.view,
-                        scale_origin=(self.w, self.h)
-                    )))
+            scale_origin = self.w, self.h
+            self.mutate(lambda state: state.update_view_state(self.view, scale_origin=scale_origin))
         except Exception:
             logger.warn("Unexpected: Could not access view %s state", self.view)
 
@@ -66,18 +62,12 @@ class MoveResizeFloatingOverlay(Overlay):
 
         workspace, i, j, w, h = self.view.transform_to_closest_ws(self.workspace, self.i, self.j, self.w, self.h)
 
-        if workspace != self.workspace:
-            logger.debug("Move floating - switching workspace %d -> %d" % (self.workspace._handle, workspace._handle))
-            self.layout.state.move_view_state(self.view, self.workspace, workspace)
-            self.workspace = workspace
-
         self.i = i
         self.j = j
         self.w = round(w) # pixels
         self.h = round(h) # pixels
 
-        self.layout.state.update_view_state(self.view, float_pos=(self.i, self.j), float_size=(self.w, self.h))
-        self.layout.damage()
+        self._set_state(workspace)
 
     def resize(self, dx: float, dy: float) -> None:
         self.w += round(dx * self.workspace.width)
@@ -85,18 +75,26 @@ class MoveResizeFloatingOverlay(Overlay):
 
         workspace, i, j, w, h = self.view.transform_to_closest_ws(self.workspace, self.i, self.j, self.w, self.h)
 
-        if workspace != self.workspace:
-            logger.debug("Move floating - switching workspace %d -> %d" % (self.workspace._handle, workspace._handle))
-            self.layout.state.move_view_state(self.view, self.workspace, workspace)
-            self.workspace = workspace
-
         self.i = i
         self.j = j
         self.w = round(w) # pixels
         self.h = round(h) # pixels
 
-        self.layout.state.update_view_state(self.view, float_pos=(self.i, self.j), float_size=(self.w, self.h))
-        self.layout.damage()
+        self._set_state(workspace)
+
+    def _set_state(self, workspace: Workspace) -> None:
+        from_ws = self.workspace
+        float_pos, float_size = (self.i, self.j), (self.w, self.h)
+
+        def mutation(state: LayoutState) -> None:
+            if workspace != from_ws:
+                state.move_view_state(self.view, from_ws, workspace)
+            state.update_view_state(self.view, float_pos=float_pos, float_size=float_size)
+
+        if workspace != self.workspace:
+            logger.debug("Move floating - switching workspace %d -> %d" % (self.workspace._handle, workspace._handle))
+            self.workspace = workspace
+        self.mutate(mutation)
 
     def gesture_move(self, values: dict[str, float]) -> None:
         if self._gesture_mode:
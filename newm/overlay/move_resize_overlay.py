@@ -1,14 +1,13 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
-from threading import Thread
-import time
 import logging
 
 from pywm import PYWM_PRESSED, PyWMModifiers
 
 from .overlay import Overlay
-from ..grid import Grid
+from ..animate import Tween
+from ..grid import Grid, Grids
 from ..hysteresis import Hysteresis
 from ..config import configured_value
 from ..gestures import GestureListener, LowpassGesture, Gesture
@@ -17,7 +16,7 @@ from ..gestures import GestureListener, LowpassGesture, Gesture
 if TYPE_CHECKING:
     from ..layout import Layout, Workspace
     from ..view import View
-    from ..state import LayoutState
+    from ..state import LayoutState, WorkspaceState
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +34,12 @@ conf_lp_inertia = configured_value('gestures.lp_inertia', .8)
 conf_gesture_binding_move_resize = configured_value("gesture_bindings.move_resize", ("L", "move-1", "swipe-2"))
 
 class _Overlay:
+    # Release velocity (i, j, w, h) of the last gesture, set by close
+    _velocity: tuple[float, ...] = (0., 0., 0., 0.)
+
+    def velocity(self) -> tuple[float, ...]:
+        return self._velocity
+
     def reset_gesture(self) -> None:
         pass
 
@@ -63,27 +68,27 @@ class MoveOverlay(_Overlay):
 
         try:
             view_state, self.ws_state, ws_handle = self.layout.state.find_view(self.view)
-            self.workspace = [w for w in self.layout.workspaces if w._handle == ws_handle][0]
+            self.workspace = self.layout.workspace_registry.get(ws_handle)
             self.i = view_state.i
             self.j = view_state.j
             self.w = view_state.w
             self.h = view_state.h
 
-            self.layout.update(
-                self.layout.state.setting_workspace_state(
-                    self.workspace, self.ws_state.replacing_view_state(
-                        self.view,
-                        move_origin=(self.i, self.j, self.workspace)
-                    )))
+            move_origin = self.i, self.j, self.workspace
+            self.layout.mutate(lambda state: state.update_view_state(self.view, move_origin=move_origin))
         except Exception:
             logger.warn("Unexpected: Could not access view %s state", self.view)
 
         self.i_grid = Grid("i", round(self.i - 3), round(self.i + 3), self.i, conf_move_grid_ovr(), conf_move_grid_m())
         self.j_grid = Grid("j", round(self.j - 3), round(self.j + 3), self.j, conf_move_grid_ovr(), conf_move_grid_m())
+        self.grids = Grids(self.i_grid, self.j_grid)
 
         self.last_dx = 0.
         self.last_dy = 0.
 
+        # Last (i, j, w, h) handed to the state
+        self._current = self.i, self.j, self.w, self.h
+
         self._closed = False
 
     def reset_gesture(self) -> None:
@@ -99,8 +104,7 @@ class MoveOverlay(_Overlay):
         self.i += factor*(values['delta_x'] - self.last_dx)
         self.j += factor*(values['delta_y'] - self.last_dy)
 
-        i0 = self.i_grid.at(self.i)
-        j0 = self.j_grid.at(self.j)
+        i0, j0 = self.grids.at(self.i, self.j, ts=values.get('ts'))
 
         self.last_dx = values['delta_x']
         self.last_dy = values['delta_y']
@@ -109,30 +113,30 @@ class MoveOverlay(_Overlay):
         j0 += self.dj
 
         workspace, i, j, self.w, self.h = self.view.transform_to_closest_ws(self.workspace, i0, j0, self.w, self.h)
+        from_ws, w, h = self.workspace, self.w, self.h
+
+        def mutation(state: LayoutState) -> None:
+            if workspace != from_ws:
+                state.move_view_state(self.view, from_ws, workspace)
+            state.update_view_state(self.view, i=i, j=j, w=w, h=h)
 
         if workspace != self.workspace:
             logger.debug("Move - switching workspace %d (%f %f)-> %d (%f %f)" % (self.workspace._handle, i0, j0, workspace._handle, i, j))
             self.di += (i - i0)
             self.dj += (j - j0)
-
-            self.layout.state.move_view_state(self.view, self.workspace, workspace)
             self.workspace = workspace
 
-        self.layout.state.update_view_state(
-            self.view, i=i, j=j, w=self.w, h=self.h)
-        self.layout.damage()
+        self._current = i, j, w, h
+        self.layout.mutate(mutation)
 
     def close(self) -> tuple[Workspace, float, float, float, float, float, float, float, float, float]:
         self._closed = True
 
         try:
-            state, self.ws_state, ws_handle = self.layout.state.find_view(self.view)
-            self.workspace = [w for w in self.layout.workspaces if w._handle == ws_handle][0]
-
             fi: float = 0.
             fj: float = 0.
-            fi, ti = self.i_grid.final()
-            fj, tj = self.j_grid.final()
+            (fi, fj), t, (vi, vj) = self.grids.fling()
+            self._velocity = vi, vj, 0., 0.
 
             fi += self.di
             fj += self.dj
@@ -147,12 +151,14 @@ class MoveOverlay(_Overlay):
 
             if workspace != self.workspace:
                 logger.debug("Move - switching workspace %d -> %d" % (self.workspace._handle, workspace._handle))
-                self.layout.state.move_view_state(self.view, self.workspace, workspace)
+                from_ws = self.workspace
+                self.layout.mutate(lambda state: state.move_view_state(self.view, from_ws, workspace))
                 self.workspace = workspace
 
-            logger.debug("Move - Grid finals: %f %f (%f %f)", fi, fj, ti, tj)
+            logger.debug("Move - Grid finals: %f %f (%f)", fi, fj, t)
 
-            return self.workspace, state.i, state.j, state.w, state.h, fi, fj, round(self.w), round(self.h), max(ti, tj)
+            i, j, w, h = self._current
+            return self.workspace, i, j, w, h, fi, fj, round(self.w), round(self.h), t
         except Exception:
             logger.warn("Unexpected: Could not access view %s state... returning default placement", self.view)
             return self.workspace, self.i, self.j, 1, 1, round(self.i), round(self.j), 1, 1, 1
@@ -175,7 +181,7 @@ class ResizeOverlay(_Overlay):
 
         try:
             view_state, self.ws_state, ws_handle = self.layout.state.find_view(self.view)
-            self.workspace = [w for w in self.layout.workspaces if w._handle == ws_handle][0]
+            self.workspace = self.layout.workspace_registry.get(ws_handle)
             self.i = view_state.i
             self.j = view_state.j
             self.w = view_state.w
@@ -184,13 +190,10 @@ class ResizeOverlay(_Overlay):
             self.hyst_w = Hysteresis(conf_hyst(), self.w)
             self.hyst_h = Hysteresis(conf_hyst(), self.h)
 
-            self.layout.update(
-                self.layout.state.setting_workspace_state(
-                    self.workspace, self.ws_state.replacing_view_state(
-                        self.view,
-                        move_origin=(self.i, self.j, self.workspace),
-                        scale_origin=(self.w, self.h)
-                    )))
+            move_origin = self.i, self.j, self.workspace
+            scale_origin = self.w, self.h
+            self.layout.mutate(lambda state: state.update_view_state(
+                self.view, move_origin=move_origin, scale_origin=scale_origin))
 
         except Exception:
             logger.warn("Unexpected: Could not access view %s state", self.view)
@@ -200,6 +203,10 @@ class ResizeOverlay(_Overlay):
         self.j_grid = Grid("j", round(self.j - 3), round(self.j + 3), self.j, conf_move_grid_ovr(), conf_move_grid_m())
         self.w_grid = Grid("w", 1, round(self.w + 3), self.w, conf_resize_grid_ovr(), conf_resize_grid_m())
         self.h_grid = Grid("h", 1, round(self.h + 3), self.h, conf_resize_grid_ovr(), conf_resize_grid_m())
+        self.grids = Grids(self.i_grid, self.j_grid, self.w_grid, self.h_grid)
+
+        # Last (i, j, w, h) handed to the state
+        self._current = self.i, self.j, self.w, self.h
 
         self._closed = False
 
@@ -229,40 +236,29 @@ class ResizeOverlay(_Overlay):
             j = self.j
             h = self.h + dh
 
-        w_ = self.w_grid.at(w)
-        h_ = self.h_grid.at(h)
-        self.layout.state.update_view_state(
-            self.view, i=self.i_grid.at(i), j=self.j_grid.at(j),
-            w=w_, h=h_,
-            scale_origin=(self.hyst_w(w_),self.hyst_h(h_))
-        )
+        i_, j_, w_, h_ = self.grids.at(i, j, w, h, ts=values.get('ts'))
+        scale_origin = self.hyst_w(w_), self.hyst_h(h_)
 
-        self.layout.damage()
+        self._current = i_, j_, w_, h_
+        self.layout.mutate(lambda state: state.update_view_state(
+            self.view, i=i_, j=j_, w=w_, h=h_, scale_origin=scale_origin))
 
 
     def close(self) -> tuple[Workspace, float, float, float, float, float, float, float, float, float]:
         self._closed = True
 
-        try:
-            state = self.layout.state.get_view_state(self.view)
-            fi, ti = self.i_grid.final()
-            fj, tj = self.j_grid.final()
-            fw, tw = self.w_grid.final()
-            fh, th = self.h_grid.final()
+        (fi, fj, fw, fh), t, self._velocity = self.grids.fling()
 
-            logger.debug("Resize - Grid finals: %f %f %f %f (%f %f %f %f)", fi, fj, fw, fh, ti, tj, tw, th)
+        logger.debug("Resize - Grid finals: %f %f %f %f (%f)", fi, fj, fw, fh, t)
 
-            return self.workspace, state.i, state.j, state.w, state.h, fi, fj, fw, fh, max(ti, tj, tw, th)
-        except Exception:
-            logger.warn("Unexpected: Could not access view %s state... returning default placement", self.view)
-            return self.workspace, self.i, self.j, self.w, self.h, self.i, self.j, self.w, self.h, 1
+        i, j, w, h = self._current
+        return self.workspace, i, j, w, h, fi, fj, fw, fh, t
 
 
 
-class MoveResizeOverlay(Overlay, Thread):
+class MoveResizeOverlay(Overlay):
     def __init__(self, layout: Layout, view: View):
         Overlay.__init__(self, layout)
-        Thread.__init__(self)
 
         self.layout.update_cursor(False)
 
@@ -272,113 +268,90 @@ class MoveResizeOverlay(Overlay, Thread):
 
         try:
             view_state, self.ws_state, ws_handle = self.layout.state.find_view(self.view)
-            self.workspace = [w for w in self.layout.workspaces if w._handle == ws_handle][0]
+            self.workspace = self.layout.workspace_registry.get(ws_handle)
         except:
             logger.warn("Unexpected: Could not access view %s state", self.view)
 
         self.overlay: Optional[_Overlay] = None
 
         """
-        If move has been finished and we are animating towards final position
-            (view initial i, view initial j, view final i, view final j, initial time, finished time)
+        Driven by on_frame, so view and viewport move on the same clock
+            - view (i, j) after move has been finished
+            - view (w, h) after resize has been finished
+            - viewport (i, j) following the view (after gesture finished or during)
         """
-        self._target_view_pos: Optional[tuple[float, float, float, float, float, float]] = None
+        self._view_pos = Tween()
+        self._view_size = Tween()
+        self._layout_pos = Tween()
 
-        """
-        If resize has been finished and we are animating towards final size
-            (view initial w, view initial h, view final w, view final h, initial time, finished time)
-        """
-        self._target_view_size: Optional[tuple[float, float, float, float, float, float]] = None
-
-        """
-        If we are adjusting viewpoint (after gesture finished or during)
-            (layout initial i, layout initial j, layout final i, layout final j, initial time, finished time)
-        """
-        self._target_layout_pos: Optional[tuple[float, float, float, float, float, float]] = None
-        
         self._running = True
         self._wants_close = False
 
-    def post_init(self) -> None:
-        logger.debug("MoveResizeOverlay: Starting thread...")
-        self.start()
-
-    def run(self) -> None:
-        while self._running:
-            t = time.time()
-
-            in_prog = False
-            if self._target_view_pos is not None:
-                in_prog = True
-                ii, ij, fi, fj, it, ft = self._target_view_pos
-                if t > ft:
-                    self.layout.state.update_view_state(self.view, i=fi, j=fj)
-                    self._target_view_pos = None
-                else:
-                    perc = (t-it)/(ft-it)
-                    self.layout.state.update_view_state(self.view, i=ii + perc*(fi-ii), j=ij + perc*(fj-ij))
-                self.layout.damage()
-
-
-            if self._target_view_size is not None:
-                in_prog = True
-                iw, ih, fw, fh, it, ft = self._target_view_size
-                if t > ft:
-                    self.layout.state.update_view_state(self.view, w=fw, h=fh, scale_origin=None)
-                    self._target_view_size = None
-                else:
-                    perc = (t-it)/(ft-it)
-                    self.layout.state.update_view_state(self.view, w=iw + perc*(fw-iw), h=ih + perc*(fh-ih))
-                self.layout.damage()
-
-            if self._target_layout_pos is not None:
-                in_prog = True
-                ii, ij, fi, fj, it, ft = self._target_layout_pos
-                if t > ft:
-                    self.ws_state.i = fi
-                    self.ws_state.j = fj
-                    self._target_layout_pos = None
-                else:
-                    perc = (t-it)/(ft-it)
-                    self.ws_state.i=ii + perc*(fi-ii)
-                    self.ws_state.j=ij + perc*(fj-ij)
-                self.layout.damage()
-
-            elif self.overlay is not None:
-                try:
-                    view_state = self.layout.state.get_view_state(self.view)
-                    i, j, w, h = view_state.i, view_state.j, view_state.w, view_state.h
-                    i, j, w, h = round(i), round(j), round(w), round(h)
-
-                    fi, fj = self.ws_state.i, self.ws_state.j
-
-                    if i + w > fi + self.ws_state.size:
-                        fi = i + w - self.ws_state.size
-
-                    if j + h > fj + self.ws_state.size:
-                        fj = j + h - self.ws_state.size
-
-                    if i < fi:
-                        fi = i
-
-                    if j < fj:
-                        fj = j
-
-                    if fi != self.ws_state.i or fj != self.ws_state.j:
-                        logger.debug("MoveResizeOverlay: Adjusting viewpoint (%f %f) -> (%f %f)",
-                                     self.ws_state.i, self.ws_state.j, fi, fj)
-                        self._target_layout_pos = (self.ws_state.i, self.ws_state.j, fi, fj, t, t + conf_anim_t())
-
-                except Exception:
-                    logger.warn("Unexpected: Could not access view %s state", self.view)
-
-            if not in_prog and self._wants_close:
-                self._running = False
-
-            time.sleep(1. / 120.)
-
-        logger.debug("MoveResizeOverlay: Thread finished")
-        self.layout.exit_overlay()
+    def on_frame(self, t: float) -> None:
+        if not self._running:
+            return
+
+        if self._wants_close and not (self._view_pos.running() or self._view_size.running() or self._layout_pos.running()):
+            self._running = False
+            self.layout.exit_overlay()
+            return
+
+        view_kwargs: dict[str, Any] = {}
+        if self._view_pos.running():
+            (view_kwargs['i'], view_kwargs['j']), _ = self._view_pos.get(t)
+
+        if self._view_size.running():
+            (view_kwargs['w'], view_kwargs['h']), finished = self._view_size.get(t)
+            if finished:
+                view_kwargs['scale_origin'] = None
+
+        ws_state = self.layout.state.get_workspace_state(self.workspace)
+        if self.overlay is not None:
+            self._follow_view(ws_state, t)
+
+        layout_pos: Optional[tuple[float, ...]] = None
+        if self._layout_pos.running():
+            layout_pos, _ = self._layout_pos.get(t)
+
+        if len(view_kwargs) > 0 or layout_pos is not None:
+            workspace = self.workspace
+
+            def mutation(state: LayoutState) -> None:
+                if len(view_kwargs) > 0:
+                    state.update_view_state(self.view, **view_kwargs)
+                if layout_pos is not None:
+                    state.get_workspace_state(workspace).update(i=layout_pos[0], j=layout_pos[1])
+            self.mutate(mutation)
+
+    def _follow_view(self, ws_state: WorkspaceState, t: float) -> None:
+        try:
+            view_state = self.layout.state.get_view_state(self.view)
+            i, j, w, h = view_state.i, view_state.j, view_state.w, view_state.h
+            i, j, w, h = round(i), round(j), round(w), round(h)
+
+            target = self._layout_pos.target()
+            fi, fj = target if target is not None else (ws_state.i, ws_state.j)
+
+            if i + w > fi + ws_state.size:
+                fi = i + w - ws_state.size
+
+            if j + h > fj + ws_state.size:
+                fj = j + h - ws_state.size
+
+            if i < fi:
+                fi = i
+
+            if j < fj:
+                fj = j
+
+            if fi != ws_state.i or fj != ws_state.j:
+                if target != (fi, fj):
+                    logger.debug("MoveResizeOverlay: Adjusting viewpoint (%f %f) -> (%f %f)",
+                                 ws_state.i, ws_state.j, fi, fj)
+                self._layout_pos.retarget((ws_state.i, ws_state.j), (fi, fj), conf_anim_t(), t)
+
+        except Exception:
+            logger.warn("Unexpected: Could not access view %s state", self.view)
 
     def on_gesture(self, gesture: Gesture) -> bool:
         if not self._running or self._wants_close:
@@ -387,8 +360,8 @@ class MoveResizeOverlay(Overlay, Thread):
 
         if gesture.kind == conf_gesture_binding_move_resize()[2]:
             logger.debug("MoveResizeOverlay: New TwoFingerSwipePinch")
-            self._target_view_pos = None
-            self._target_view_size = None
+            self._view_pos.stop()
+            self._view_size.stop()
 
             self.overlay = ResizeOverlay(self.layout, self.view)
             LowpassGesture(gesture, conf_lp_inertia(), conf_lp_freq()).listener(GestureListener(
@@ -399,7 +372,7 @@ class MoveResizeOverlay(Overlay, Thread):
 
         if gesture.kind == conf_gesture_binding_move_resize()[1]:
             logger.debug("MoveResizeOverlay: New SingleFingerMove")
-            self._target_view_pos = None
+            self._view_pos.stop()
 
             self.overlay = MoveOverlay(self.layout, self.view)
             LowpassGesture(gesture, conf_lp_inertia(), conf_lp_freq()).listener(GestureListener(
@@ -415,13 +388,15 @@ class MoveResizeOverlay(Overlay, Thread):
         logger.debug("MoveResizeOverlay: Finishing gesture")
         if self.overlay is not None:
             ws, ii, ij, iw, ih, fi, fj, fw, fh, t = self.overlay.close()
+            vi, vj, vw, vh = self.overlay.velocity()
             self.overlay = None
 
+            # Snap back starting at the release velocity
             self.workspace = ws
             if ii != fi or ij != fj:
-                self._target_view_pos = (ii, ij, fi, fj, time.time(), time.time() + t)
+                self._view_pos.start((ii, ij), (fi, fj), t, velocity=(vi, vj))
             if iw != fw or ih != fh:
-                self._target_view_size = (iw, ih, fw, fh, time.time(), time.time() + t)
+                self._view_size.start((iw, ih), (fw, fh), t, velocity=(vw, vh))
 
 
         if not self.layout.modifiers.has(conf_gesture_binding_move_resize()[0]):
@@ -447,6 +422,9 @@ class MoveResizeOverlay(Overlay, Thread):
             self.overlay.close()
         self._wants_close = True
 
+        # on_frame exits - make sure there is a frame even if nothing is animating
+        self.layout.damage()
+
     def pre_destroy(self) -> None:
         self._running = False
 
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional, TYPE_CHECKING
+from typing import Callable, Optional, TYPE_CHECKING
 
 from pywm import PyWMModifiers
 
@@ -17,6 +17,7 @@ class Overlay:
     def __init__(self, layout: Layout) -> None:
         self.layout = layout
         self._ready = False
+        self._destroyed = False
 
     def ready(self) -> bool:
         return self._ready
@@ -35,7 +36,19 @@ class Overlay:
         logger.debug("Overlay: Enter animation completed")
         self._ready = True
 
+    def mutate(self, mutation: Callable[[LayoutState], None]) -> None:
+        """
+        Change the layout state in place (see Layout.mutate) - dropped once the overlay is being destroyed
+        """
+        def guarded(state: LayoutState) -> None:
+            if not self._destroyed:
+                mutation(state)
+        self.layout.mutate(guarded)
+
     def destroy(self) -> None:
+        # Exit transition starts from all changes made by the overlay
+        self.layout.flush_mutations()
+        self._destroyed = True
         self.pre_destroy()
 
         self._ready = False
@@ -67,6 +80,13 @@ class Overlay:
     def _exit_transition(self) -> tuple[Optional[LayoutState], Optional[float]]:
         return None, 0
 
+    def on_frame(self, t: float) -> None:
+        """
+        Called from Layout.process on every frame while the overlay is active - animations of the overlay
+        belong here
+        """
+        pass
+
     def on_key(self, time_msec: int, keycode: int, state: int, keysyms: str) -> bool:
         return True
 
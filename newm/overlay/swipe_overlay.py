@@ -3,7 +3,8 @@ from typing import Optional, TYPE_CHECKING
 
 from ..gestures import Gesture, GestureListener, LowpassGesture
 from .overlay import Overlay
-from ..grid import Grid
+from ..animate import Tween
+from ..grid import Grid, Grids
 from ..config import configured_value
 
 if TYPE_CHECKING:
@@ -63,37 +64,82 @@ class SwipeOverlay(Overlay):
 
         self.i_grid = Grid("i", min_i, max_i, self.i, conf_grid_ovr(), conf_grid_m())
         self.j_grid = Grid("j", min_j, max_j, self.j, conf_grid_ovr(), conf_grid_m())
+        self.grids = Grids(self.i_grid, self.j_grid)
 
         self._has_gesture = False
 
+        # Fling after the gesture has been released
+        self._current = self.i, self.j
+        self._settle = Tween()
+        self._final: Optional[tuple[float, float]] = None
+
         self._set_state()
 
     def _exit_finished(self) -> None:
         self.layout.update_cursor()
         super()._exit_finished()
 
-    def _exit_transition(self) -> tuple[Optional[LayoutState], Optional[float]]:
-        i, ti = self.i_grid.final(throw_dist_max=self.size - conf_grid_min_dist())
-        j, tj = self.j_grid.final(throw_dist_max=self.size - conf_grid_min_dist())
+    def _fling(self) -> tuple[float, float, Optional[float], float, float]:
+        i, ti, vi = self.i_grid.fling(throw_dist_max=self.size - conf_grid_min_dist())
+        j, tj, vj = self.j_grid.fling(throw_dist_max=self.size - conf_grid_min_dist())
         t = None
 
         if self.locked_x is not None:
             if self.locked_x:
                 j = round(self.initial_y)
                 t = ti
+                vj = 0.
             else:
                 i = round(self.initial_x)
                 t = tj
+                vi = 0.
 
-        return self.layout.state.replacing_workspace_state(self.workspace, i=i, j=j), t
+        return i, j, t, vi, vj
+
+    def _release(self) -> None:
+        i, j, t, vi, vj = self._fling()
+        if t is None or t <= 0.:
+            self.layout.exit_overlay()
+            return
+
+        self._final = i, j
+        self._settle.start(self._current, (i, j), t, velocity=(vi, vj))
 
-    def _set_state(self) -> None:
-        if not self._invalid[0]:
-            self.ws_state.i = self.i_grid.at(self.i)
-        if not self._invalid[1]:
-            self.ws_state.j = self.j_grid.at(self.j)
+        # The frame of the last gesture update has usually passed - on_frame needs another one
         self.layout.damage()
 
+    def on_frame(self, t: float) -> None:
+        if self._settle.running():
+            (i, j), finished = self._settle.get(t)
+            self._apply(i, j)
+            if finished:
+                self.layout.exit_overlay()
+
+    def _exit_transition(self) -> tuple[Optional[LayoutState], Optional[float]]:
+        if self._final is not None:
+            # Released and flung there (or interrupted while doing so)
+            i, j = self._final
+            return self.layout.state.replacing_workspace_state(self.workspace, i=i, j=j), 0.
+
+        i, j, t, _, __ = self._fling()
+        return self.layout.state.replacing_workspace_state(self.workspace, i=i, j=j), t
+
+    def _set_state(self, ts: Optional[float]=None) -> None:
+        i, j = self.grids.at(self.i, self.j, ts=ts)
+        self._current = i, j
+        self._apply(i, j)
+
+    def _apply(self, i: float, j: float) -> None:
+        invalid_i, invalid_j = self._invalid
+
+        def mutation(state: LayoutState) -> None:
+            ws_state = state.get_workspace_state(self.workspace)
+            if not invalid_i:
+                ws_state.i = i
+            if not invalid_j:
+                ws_state.j = j
+        self.mutate(mutation)
+
 
     def on_gesture(self, gesture: Gesture) -> bool:
         if gesture.kind != conf_gesture_binding_swipe()[1]:
@@ -103,7 +149,7 @@ class SwipeOverlay(Overlay):
         if not self._has_gesture:
             LowpassGesture(gesture, conf_lp_inertia(), conf_lp_freq()).listener(GestureListener(
                 self._on_update,
-                lambda: self.layout.exit_overlay()
+                self._release
             ))
             self._has_gesture = True
         return True
@@ -128,7 +174,7 @@ class SwipeOverlay(Overlay):
         self.last_delta_x = values['delta_x']
         self.last_delta_y = values['delta_y']
 
-        self._set_state()
+        self._set_state(values.get('ts'))
 
     def on_motion(self, time_msec: int, delta_x: float, delta_y: float) -> bool:
         return False
@@ -95,19 +95,22 @@ class SwipeToZoomOverlay(Overlay):
 
         return state, t
 
-    def _set_state(self) -> None:
-        self.ws_state.size_origin = float(self.hyst(self.ws_state.size))
-        self.ws_state.size = self.grid.at(self.size)
-
-        # Enforce constraints real-time
-        if self._focused_br is not None:
-            # Move bottom right corner into view
-            i, j = self._focused_br
-            self.ws_state.i = max(self.i, i - self.ws_state.size)
-            self.ws_state.j = max(self.j, j - self.ws_state.size)
-        self.layout.state.constrain()
-
-        self.layout.damage()
+    def _set_state(self, ts: Optional[float]=None) -> None:
+        size = self.grid.at(self.size, ts=ts)
+
+        def mutation(state: LayoutState) -> None:
+            ws_state = state.get_workspace_state(self.workspace)
+            ws_state.size_origin = float(self.hyst(ws_state.size))
+            ws_state.size = size
+
+            # Enforce constraints real-time
+            if self._focused_br is not None:
+                # Move bottom right corner into view
+                i, j = self._focused_br
+                ws_state.i = max(self.i, i - size)
+                ws_state.j = max(self.j, j - size)
+            state.constrain()
+        self.mutate(mutation)
 
     def on_gesture(self, gesture: Gesture) -> bool:
         if gesture.kind != conf_gesture_binding_swipe_to_zoom()[1]:
@@ -129,7 +132,7 @@ class SwipeToZoomOverlay(Overlay):
         self.momentum_y = values['delta_y'] - self.last_delta_y
         self.last_delta_y = values['delta_y']
 
-        self._set_state()
+        self._set_state(values.get('ts'))
 
     def on_motion(self, time_msec: int, delta_x: float, delta_y: float) -> bool:
         return False
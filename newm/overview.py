@@ -0,0 +1,82 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional
+
+import logging
+
+from .config import configured_value
+from .coordinates import TileTransform
+
+if TYPE_CHECKING:
+    from .layout import Layout
+    from .view import View
+    from .state import WorkspaceState
+
+logger = logging.getLogger(__name__)
+
+conf_enabled = configured_value('overview.thumbnails', True)
+conf_size = configured_value('overview.thumbnail_size', 480)
+
+
+class OverviewThumbnails:
+    """
+    In overview every view is shown scaled down - only the focused view, the view under the cursor and views
+    which still appear large are kept live. All others are thumbnails:
+
+    - their client size is frozen (no configures, see ResizeScheduler)
+    - per-view effects (background blur) are not rendered
+
+    The hovered view is tracked from cursor motion, the lookup only runs once the cursor leaves its box
+    """
+    def __init__(self, wm: Layout) -> None:
+        self.wm = wm
+        self._hovered: Optional[View] = None
+        self._hovered_box: Optional[tuple[float, float, float, float]] = None
+
+    def is_thumbnail(self, view: View, ws_state: WorkspaceState, box: tuple[float, float, float, float]) -> bool:
+        if not conf_enabled() or not ws_state.is_in_overview():
+            return False
+        if view is self._hovered or view.is_focused():
+            return False
+        _, _, w, h = box
+        return max(w, h) < conf_size()
+
+    def _lookup(self, x: float, y: float) -> Optional[View]:
+        ws = self.wm.workspace_registry.at(x, y)
+        if ws is None:
+            return None
+        ws_state = self.wm.state.get_workspace_state(ws)
+        if not ws_state.is_in_overview():
+            return None
+
+        i, j = TileTransform.tiled(ws, ws_state).to_tiles(x - ws.pos_x, y - ws.pos_y)
+        handle = ws_state.view_index().at(i, j)
+        if handle is None:
+            return None
+        return self.wm._views.get(handle, None)
+
+    def on_cursor(self, x: float, y: float) -> None:
+        if not conf_enabled():
+            return
+
+        if self._hovered is not None and self._hovered._handle not in self.wm._views:
+            self.reset()
+
+        if self._hovered_box is not None:
+            bx, by, bw, bh = self._hovered_box
+            if bx <= x < bx + bw and by <= y < by + bh:
+                return
+
+        view = self._lookup(x, y)
+        self._hovered_box = None
+        if view is not None and view.up_state is not None:
+            self._hovered_box = view.reducer(view.up_state, self.wm.state).logical_box
+
+        if view is not self._hovered:
+            old, self._hovered = self._hovered, view
+            for v in [old, view]:
+                if v is not None:
+                    v.damage_with_background()
+
+    def reset(self) -> None:
+        self._hovered = None
+        self._hovered_box = None
@@ -3,7 +3,6 @@ from typing import Optional, cast
 
 from threading import Thread
 import subprocess
-import psutil # type: ignore
 import time
 import logging
 
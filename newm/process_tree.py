@@ -0,0 +1,201 @@
+from __future__ import annotations
+from typing import Optional
+
+import os
+import socket
+import struct
+import logging
+from threading import Thread, Lock
+
+logger = logging.getLogger(__name__)
+
+"""
+Netlink process connector (linux/cn_proc.h) - requires CAP_NET_ADMIN, so usually not available
+"""
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_EVENT_FORK = 0x00000001
+PROC_EVENT_EXIT = 0x80000000
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_CN_MSG = struct.Struct("=IIIIHH")
+_PROC_EVENT = struct.Struct("=IIQ")
+_FORK = struct.Struct("=IIII")
+_EXIT = struct.Struct("=II")
+
+
+def _read_stat(pid: int) -> Optional[tuple[int, int]]:
+    """
+    ppid and start time (clock ticks after boot) of pid
+    """
+    try:
+        with open("/proc/%d/stat" % pid, "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+
+    # comm may contain spaces and parentheses
+    fields = stat[stat.rindex(b")") + 2:].split()
+    return int(fields[1]), int(fields[19])
+
+
+class ProcessTree:
+    """
+    In-memory cache of ppid / start time per pid, so ancestry queries (used by View.find_swallower) do not
+    read /proc for every step
+
+    Entries are read lazily. A reused pid is detected by its start time: a parent can not have been started
+    after its child, in that case the stale entries are read again. Views refresh their pid on map and
+    forget it on destroy; if the netlink process connector is available, forks and exits keep the cache
+    up to date as well
+    """
+    def __init__(self) -> None:
+        self._entries: dict[int, tuple[int, int]] = {}
+        self._lock = Lock()
+        self._listener: Optional[_ProcConnectorListener] = None
+
+    def start(self) -> None:
+        try:
+            self._listener = _ProcConnectorListener(self)
+            self._listener.start()
+        except OSError as e:
+            logger.debug("Process connector not available (%s) - relying on start times", e)
+            self._listener = None
+
+    def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def refresh(self, pid: int) -> None:
+        entry = _read_stat(pid)
+        with self._lock:
+            if entry is None:
+                self._entries.pop(pid, None)
+            else:
+                self._entries[pid] = entry
+
+    def forget(self, pid: int) -> None:
+        with self._lock:
+            self._entries.pop(pid, None)
+
+    def _entry(self, pid: int) -> Optional[tuple[int, int]]:
+        with self._lock:
+            entry = self._entries.get(pid, None)
+        if entry is None:
+            entry = _read_stat(pid)
+            if entry is not None:
+                with self._lock:
+                    self._entries[pid] = entry
+        return entry
+
+    def _parent(self, pid: int, entry: tuple[int, int]) -> Optional[tuple[int, tuple[int, int]]]:
+        ppid, start = entry
+        if ppid <= 1:
+            return None
+
+        parent = self._entry(ppid)
+        if parent is not None and parent[1] <= start:
+            return ppid, parent
+
+        # ppid has been reused (or the parent exited and pid has been reparented) - read both again
+        self.refresh(ppid)
+        self.refresh(pid)
+        fresh = self._entry(pid)
+        if fresh is None or fresh[0] <= 1:
+            return None
+        parent = self._entry(fresh[0])
+        if parent is None or parent[1] > fresh[1]:
+            return None
+        return fresh[0], parent
+
+    def ancestors(self, pid: int) -> list[int]:
+        """
+        Strict ancestors of pid, nearest first (excluding init)
+        """
+        res: list[int] = []
+        entry = self._entry(pid)
+        while entry is not None and len(res) < 256:
+            parent = self._parent(pid, entry)
+            if parent is None:
+                break
+            pid, entry = parent
+            res += [pid]
+        return res
+
+    def nearest_ancestor(self, pid: int, candidates: set[int]) -> Optional[int]:
+        """
+        Nearest strict ancestor of pid contained in candidates - O(depth) from memory
+        """
+        entry = self._entry(pid)
+        depth = 0
+        while entry is not None and depth < 256:
+            parent = self._parent(pid, entry)
+            if parent is None:
+                break
+            pid, entry = parent
+            if pid in candidates:
+                return pid
+            depth += 1
+        return None
+
+    def is_ancestor(self, ancestor: int, pid: int) -> bool:
+        return self.nearest_ancestor(pid, {ancestor}) is not None
+
+
+class _ProcConnectorListener(Thread):
+    def __init__(self, tree: ProcessTree) -> None:
+        super().__init__()
+        self.daemon = True
+        self.tree = tree
+        self._running = True
+
+        self._socket = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+        try:
+            self._socket.bind((os.getpid(), CN_IDX_PROC))
+
+            op = struct.pack("=I", PROC_CN_MCAST_LISTEN)
+            cn_msg = _CN_MSG.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(op), 0) + op
+            nlmsg = _NLMSGHDR.pack(_NLMSGHDR.size + len(cn_msg), 3, 0, 0, os.getpid()) + cn_msg # NLMSG_DONE
+            self._socket.send(nlmsg)
+            self._socket.settimeout(1.)
+        except OSError:
+            self._socket.close()
+            raise
+
+    def stop(self) -> None:
+        self._running = False
+
+    def _process(self, data: bytes) -> None:
+        i = _NLMSGHDR.size + _CN_MSG.size
+        if len(data) < i + _PROC_EVENT.size:
+            return
+        what, _, _ = _PROC_EVENT.unpack_from(data, i)
+        i += _PROC_EVENT.size
+
+        if what == PROC_EVENT_FORK and len(data) >= i + _FORK.size:
+            _, _, child_pid, child_tgid = _FORK.unpack_from(data, i)
+            if child_pid == child_tgid:
+                # Read lazily on next query
+                self.tree.forget(child_tgid)
+        elif what == PROC_EVENT_EXIT and len(data) >= i + _EXIT.size:
+            pid, tgid = _EXIT.unpack_from(data, i)
+            if pid == tgid:
+                self.tree.forget(tgid)
+
+    def run(self) -> None:
+        logger.debug("Listening on process connector")
+        try:
+            while self._running:
+                try:
+                    data = self._socket.recv(4096)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    logger.exception("Process connector")
+                    break
+                self._process(data)
+        finally:
+            self._socket.close()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+import time
+import logging
+from threading import Lock
+
+from .config import configured_value
+
+if TYPE_CHECKING:
+    from pywm import PyWMViewDownstreamState, PyWMOutput
+
+logger = logging.getLogger(__name__)
+
+conf_enabled = configured_value('interpolation.resize_throttle', True)
+conf_rate = configured_value('interpolation.resize_rate', 10.)
+conf_burst = configured_value('interpolation.resize_burst', 3)
+conf_min_size = configured_value('interpolation.resize_min_size', 32)
+
+
+class _Budget:
+    def __init__(self, size: tuple[int, int]) -> None:
+        self.size = size
+        self.tokens = float(conf_burst())
+        self.ts = time.time()
+
+    def take(self) -> bool:
+        t = time.time()
+        self.tokens = min(float(conf_burst()), self.tokens + (t - self.ts) * conf_rate())
+        self.ts = t
+        if self.tokens >= 1.:
+            self.tokens -= 1.
+            return True
+        return False
+
+
+class ResizeScheduler:
+    """
+    Decides which client sizes requested by View.process are actually sent (every change means a configure
+    and usually a re-layout of the client)
+
+    - Offscreen views and overview thumbnails keep their size until they become visible / live
+    - While animating, views smaller than interpolation.resize_min_size keep their size and size changes are
+      rate limited per view (token bucket, interpolation.resize_rate per second, up to
+      interpolation.resize_burst at once)
+    - Once the animation has settled, the final size is always sent
+    """
+    def __init__(self) -> None:
+        self._budgets: dict[int, _Budget] = {}
+        self._lock = Lock()
+
+    def forget(self, handle: int) -> None:
+        with self._lock:
+            self._budgets.pop(handle, None)
+
+    @staticmethod
+    def _visible(box: tuple[float, float, float, float], outputs: list[PyWMOutput]) -> bool:
+        x, y, w, h = box
+        for o in outputs:
+            if x < o.pos[0] + o.width and o.pos[0] < x + w and y < o.pos[1] + o.height and o.pos[1] < y + h:
+                return True
+        return False
+
+    def schedule(self, handle: int, state: PyWMViewDownstreamState, settled: bool, outputs: list[PyWMOutput], frozen: bool=False) -> PyWMViewDownstreamState:
+        """
+        Adjusts state.size in place (and returns state)
+        """
+        size = state.size
+        if not conf_enabled() or size[0] <= 0 or size[1] <= 0:
+            return state
+
+        with self._lock:
+            budget = self._budgets.get(handle, None)
+            if budget is None:
+                self._budgets[handle] = _Budget(size)
+                return state
+            if size == budget.size:
+                return state
+
+            _, _, w, h = state.box
+            min_size = conf_min_size()
+            if frozen or not self._visible(state.box, outputs):
+                state.size = budget.size
+            elif not settled and (w < min_size or h < min_size or not budget.take()):
+                state.size = budget.size
+            else:
+                budget.size = size
+
+        return state
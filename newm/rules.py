@@ -0,0 +1,152 @@
+from __future__ import annotations
+from typing import Optional, Any, Callable, TYPE_CHECKING
+
+import re
+import logging
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, Future
+
+if TYPE_CHECKING:
+    from .view import View
+
+logger = logging.getLogger(__name__)
+
+MATCH_KEYS = ["app_id", "title", "role"]
+
+"""
+Bound on cached (app_id, title, role) results - titles change often
+"""
+CACHE_SIZE = 1024
+
+_METACHARS = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+"""
+Constructs which behave differently once a pattern is part of the combined expression: anchors and lookarounds see
+the neighbouring fields, backreferences and global flags depend on the position in the pattern
+"""
+_NOT_COMBINABLE = re.compile(r"(?<!\[)\^|\$|\\[AZbB1-9]|\(\?P=|\(\?<?[=!]|\(\?[aiLmsux]+\)")
+
+def _literal(pattern: Optional[str]) -> Optional[str]:
+    if pattern is None or _METACHARS.search(pattern.replace("\\.", "")) is not None:
+        return None
+    return pattern.replace("\\.", ".")
+
+
+class RuleTable:
+    """
+    Declarative rules, e.g.
+
+        [
+            { 'app_id': 'pavucontrol', 'float': True, 'float_size': (600, 400) },
+            { 'app_id': 'Alacritty', 'title': '.*vim.*', 'opacity': .9 },
+        ]
+
+    app_id, title and role are regular expressions matched against the whole value, all other keys are
+    the rules applied to a matching view (see view.rules). The first matching entry wins.
+
+    Entries with a literal app_id are looked up in a dict, all others are compiled into one regular
+    expression (one alternative per entry) unless they use anchors, lookarounds, backreferences or global flags;
+    results are cached per (app_id, title, role)
+    """
+    def __init__(self, table: list[dict[str, Any]]) -> None:
+        self._rules: list[dict[str, Any]] = []
+        self._patterns: list[list[re.Pattern[str]]] = []
+        self._by_app_id: dict[str, list[int]] = {}
+        self._combined: Optional[re.Pattern[str]] = None
+        self._regex_idx: list[int] = []
+        self._single_idx: list[int] = []
+
+        self._cache: dict[tuple[str, str, str], Optional[dict[str, Any]]] = {}
+        self._lock = Lock()
+
+        alternatives: list[str] = []
+        for i, entry in enumerate(table):
+            try:
+                fields = [entry.get(k, None) for k in MATCH_KEYS]
+                patterns = [re.compile(f if f is not None else ".*") for f in fields]
+            except (re.error, AttributeError):
+                logger.exception("Invalid view.rule_table entry %s - ignoring", entry)
+                continue
+
+            idx = len(self._rules)
+            self._rules += [{k: v for k, v in entry.items() if k not in MATCH_KEYS}]
+            self._patterns += [patterns]
+
+            if (app_id := _literal(fields[0])) is not None:
+                self._by_app_id[app_id] = self._by_app_id.get(app_id, []) + [idx]
+                continue
+
+            self._regex_idx += [idx]
+            if any(_NOT_COMBINABLE.search(p.pattern) is not None for p in patterns):
+                self._single_idx += [idx]
+                continue
+
+            # Fields are separated by newlines - values containing newlines are matched one by one (see _match)
+            alternatives += ["(?P<r%d>%s)" % (idx, "\n".join("(?:%s)" % p.pattern for p in patterns))]
+
+        if len(alternatives) > 0:
+            try:
+                self._combined = re.compile("|".join(alternatives))
+            except re.error:
+                # e.g. duplicate group names in user patterns
+                logger.warn("Could not combine view.rule_table - matching entries one by one")
+                self._combined = None
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def _matches(self, idx: int, app_id: str, title: str, role: str) -> bool:
+        return all(p.fullmatch(v) is not None for p, v in zip(self._patterns[idx], [app_id, title, role]))
+
+    def _match(self, app_id: str, title: str, role: str) -> Optional[dict[str, Any]]:
+        # First entry wins - compare first literal and first regex match
+        result: Optional[int] = None
+        for idx in self._by_app_id.get(app_id, []):
+            if self._matches(idx, app_id, title, role):
+                result = idx
+                break
+
+        combined = self._combined if "\n" not in app_id + title + role else None
+        if combined is not None:
+            m = combined.fullmatch("%s\n%s\n%s" % (app_id, title, role))
+            if m is not None and m.lastgroup is not None:
+                idx = int(m.lastgroup[1:])
+                result = idx if result is None else min(result, idx)
+
+        for idx in self._single_idx if combined is not None else self._regex_idx:
+            if result is not None and idx > result:
+                break
+            if self._matches(idx, app_id, title, role):
+                result = idx
+                break
+
+        return self._rules[result] if result is not None else None
+
+    def match(self, app_id: Optional[str], title: Optional[str], role: Optional[str]) -> Optional[dict[str, Any]]:
+        if len(self._rules) == 0:
+            return None
+
+        key = app_id or "", title or "", role or ""
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+
+        result = self._match(*key)
+
+        with self._lock:
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = result
+        return result
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def evaluate_callback(callback: Callable[[View], Optional[dict[str, Any]]], view: View) -> Future[Optional[dict[str, Any]]]:
+    """
+    Run the user callback (view.rules) off the caller's thread - it might be slow
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="newm-rules")
+    return _executor.submit(callback, view)
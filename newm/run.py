@@ -9,11 +9,14 @@ try:
 except:
     YAPPI = False
 
-from .layout import Layout
+from .util import startup_tracer
 
 logger = logging.getLogger(__name__)
 
-def run(debug: bool=False, profile: bool=False, config_file: Optional[str]=None) -> None:
+def run(debug: bool=False, profile: bool=False, config_file: Optional[str]=None, startup_trace: bool=False) -> None:
+    if startup_trace:
+        startup_tracer.start()
+
     handler = logging.StreamHandler()
     formatter = logging.Formatter('[%(levelname)s] %(filename)s:%(lineno)s %(asctime)s: %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
 
@@ -25,7 +28,11 @@ def run(debug: bool=False, profile: bool=False, config_file: Optional[str]=None)
         log.setLevel(logging.DEBUG)
         log.addHandler(handler)
 
-    wm = Layout(debug=debug, config_file=config_file)
+    with startup_tracer.span("import layout"):
+        from .layout import Layout
+
+    with startup_tracer.span("Layout()"):
+        wm = Layout(debug=debug, config_file=config_file)
 
     try:
         if profile and YAPPI:
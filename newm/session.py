@@ -0,0 +1,245 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Optional, cast
+
+import os
+import json
+import time
+import logging
+import pathlib
+from threading import Thread, Lock
+
+from .config import configured_value
+
+if TYPE_CHECKING:
+    from .layout import Layout
+    from .view import View
+    from .state import LayoutState
+    from .workspace import Workspace
+
+logger = logging.getLogger(__name__)
+
+conf_enabled = configured_value('session.enabled', True)
+conf_path = configured_value('session.path', cast(Optional[str], None))
+conf_interval = configured_value('session.interval', 5.)
+conf_restore_window = configured_value('session.restore_window', 10.)
+conf_restore_debounce = configured_value('session.restore_debounce', .3)
+
+"""
+Bumped whenever the file format changes - older files are ignored
+"""
+VERSION = 1
+
+
+def _default_path() -> pathlib.Path:
+    if 'XDG_CACHE_HOME' in os.environ:
+        return pathlib.Path(os.environ['XDG_CACHE_HOME']) / 'newm' / 'session.json'
+    home = os.environ['HOME'] if 'HOME' in os.environ else '/'
+    return pathlib.Path(home) / '.cache' / 'newm' / 'session.json'
+
+
+def _workspace_key(ws: Workspace) -> str:
+    """
+    Workspace handles are not stable across restarts, output names are
+    """
+    return ",".join(sorted(o.name for o in ws.outputs))
+
+
+def snapshot(layout: Layout, state: LayoutState) -> dict[str, Any]:
+    workspaces = []
+    views = []
+    for ws in layout.workspaces:
+        ws_state = state.get_workspace_state(ws)
+        i, j, size = ws_state.i, ws_state.j, ws_state.size
+        if ws_state.state_before_overview is not None:
+            i, j, size = ws_state.state_before_overview[:3]
+        if ws_state.state_before_fullscreen is not None:
+            i, j, size = ws_state.state_before_fullscreen[:3]
+
+        key = _workspace_key(ws)
+        workspaces += [{'ws': key, 'i': i, 'j': j, 'size': size}]
+
+        for handle, s in ws_state._view_states.items():
+            view = layout._views.get(handle, None)
+            if view is None or view.panel is not None or s.is_layer:
+                continue
+
+            entry: dict[str, Any] = {'app_id': view.app_id, 'title': view.title, 'ws': key, 'tiled': s.is_tiled}
+            if s.is_tiled:
+                entry['geometry'] = list(s.get_ijwh())
+            else:
+                entry['geometry'] = [*s.float_pos, *s.float_size]
+            views += [entry]
+
+    return {'version': VERSION, 'workspaces': workspaces, 'views': views}
+
+
+class SessionStore(Thread):
+    """
+    Keeps a snapshot of the layout (workspace viewports, tiled and floating geometry per app_id / title) on disk
+    and restores it after a restart
+
+    - Every session.interval seconds the snapshot is taken and written if it has changed (write to a temporary
+      file and rename, so a crash never leaves a partial file)
+    - For session.restore_window seconds after startup views which reappear are matched to saved slots (same
+      app_id and title first, then same app_id) and placed there instead of by place_initial. Their show
+      animations are collected and, once no view has appeared for session.restore_debounce seconds, run as one
+      batch (see Layout.batch)
+    """
+    def __init__(self, wm: Layout) -> None:
+        super().__init__()
+        self.wm = wm
+        self.path = pathlib.Path(conf_path()) if conf_path() is not None else _default_path()
+
+        self._lock = Lock()
+        self._last_written: Optional[str] = None
+
+        self._workspaces: dict[str, dict[str, Any]] = {}
+        self._slots: list[dict[str, Any]] = []
+        self._deadline = 0.
+
+        self._deferred: list[View] = []
+        self._last_deferred = 0.
+
+        self._running = True
+
+    def load(self) -> None:
+        if not conf_enabled():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get('version', None) != VERSION:
+                logger.info("Ignoring session file %s (version %s)", self.path, data.get('version', None))
+                return
+            self._workspaces = {w['ws']: w for w in data['workspaces']}
+            self._slots = list(data['views'])
+        except FileNotFoundError:
+            return
+        except Exception:
+            logger.exception("Could not load session file %s", self.path)
+            return
+
+        self._deadline = time.time() + conf_restore_window()
+        logger.info("Restoring session: %d workspaces, %d views", len(self._workspaces), len(self._slots))
+
+    def restoring(self) -> bool:
+        return time.time() < self._deadline and len(self._slots) > 0
+
+    def restore_workspaces(self) -> None:
+        """
+        Viewports of the workspaces whose outputs are known from the session file
+        """
+        if len(self._workspaces) == 0:
+            return
+
+        def reducer(state: LayoutState) -> tuple[Optional[LayoutState], Optional[LayoutState]]:
+            new_state = state.copy()
+            for ws in self.wm.workspaces:
+                saved = self._workspaces.get(_workspace_key(ws), None)
+                if saved is None:
+                    continue
+                new_state.get_workspace_state(ws).update(i=saved['i'], j=saved['j'], size=saved['size'])
+            return None, new_state
+
+        self.wm.animate_to(reducer, 0.)
+
+    """
+    Matching
+    """
+
+    def match(self, view: View) -> Optional[dict[str, Any]]:
+        """
+        Consumes the slot - only to be called from View.show, init runs on every frame until the view is shown
+        """
+        if not self.restoring():
+            return None
+
+        with self._lock:
+            candidates = [s for s in self._slots if s['app_id'] == view.app_id and s['title'] == view.title]
+            if len(candidates) == 0:
+                candidates = [s for s in self._slots if s['app_id'] == view.app_id]
+            if len(candidates) == 0:
+                return None
+            self._slots.remove(candidates[0])
+            return candidates[0]
+
+    def workspace_for(self, slot: dict[str, Any]) -> Optional[Workspace]:
+        for ws in self.wm.workspaces:
+            if _workspace_key(ws) == slot['ws']:
+                return ws
+        return None
+
+    def defer_show(self, view: View) -> bool:
+        """
+        Returns False if the view is to be shown right away
+        """
+        if not self.restoring():
+            return False
+        with self._lock:
+            if len([s for s in self._slots if s['app_id'] == view.app_id]) == 0:
+                return False
+            self._deferred += [view]
+            self._last_deferred = time.time()
+        return True
+
+    def _flush_deferred(self, force: bool=False) -> None:
+        with self._lock:
+            if len(self._deferred) == 0:
+                return
+            if not force and time.time() - self._last_deferred < conf_restore_debounce():
+                return
+            views, self._deferred = self._deferred, []
+
+        logger.debug("Restoring %d views in one animation", len(views))
+        with self.wm.batch():
+            for v in views:
+                v.request_show()
+
+    """
+    Snapshots
+    """
+
+    def write(self) -> None:
+        if not conf_enabled():
+            return
+
+        try:
+            data = json.dumps(snapshot(self.wm, self.wm.state), separators=(',', ':'))
+        except Exception:
+            logger.exception("Could not take session snapshot")
+            return
+
+        if data == self._last_written:
+            return
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._last_written = data
+        except OSError:
+            logger.exception("Could not write session file %s", self.path)
+
+    def stop(self) -> None:
+        self._running = False
+
+    def run(self) -> None:
+        last_write = time.time()
+        while self._running:
+            time.sleep(.05)
+            self._flush_deferred(force=not self.restoring())
+
+            # Do not overwrite the session to be restored with the partially restored state
+            if self.restoring():
+                continue
+
+            if time.time() - last_write > conf_interval():
+                self.write()
+                last_write = time.time()
+
+        if not self.restoring():
+            self.write()
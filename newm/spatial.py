@@ -0,0 +1,250 @@
+from __future__ import annotations
+from typing import Any, Iterable, Optional
+
+import math
+from bisect import bisect_left
+
+
+class OccupancyGrid:
+    """
+    Occupied tiles of a workspace as integer boxes, built once from the view states instead of iterating
+    all views for every tile queried
+
+    Rectangle queries paint the boxes intersecting the searched window into a summed-area table, so checking
+    whether a w x h rectangle fits is O(1) independent of w, h and the number of views
+    """
+    def __init__(self, boxes: Iterable[tuple[float, float, float, float]]) -> None:
+        # Inclusive tile ranges, same convention as WorkspaceState.is_tile_free
+        self._boxes: list[tuple[int, int, int, int]] = [
+            (math.floor(i), math.floor(j), math.ceil(i + w - 1), math.ceil(j + h - 1)) for i, j, w, h in boxes]
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def is_free(self, i: int, j: int) -> bool:
+        for i0, j0, i1, j1 in self._boxes:
+            if i0 <= i <= i1 and j0 <= j <= j1:
+                return False
+        return True
+
+    def next_free(self, i: int, j: int) -> int:
+        """
+        First free i' >= i in row j
+        """
+        row = sorted((i0, i1) for i0, j0, i1, j1 in self._boxes if j0 <= j <= j1 and i1 >= i)
+        for i0, i1 in row:
+            if i0 > i:
+                break
+            i = max(i, i1 + 1)
+        return i
+
+    def _table(self, min_i: int, min_j: int, ni: int, nj: int) -> list[list[int]]:
+        """
+        table[j][i] = number of occupied tiles in [min_i, min_i + i) x [min_j, min_j + j)
+        """
+        occupied = [[0] * ni for _ in range(nj)]
+        max_i, max_j = min_i + ni - 1, min_j + nj - 1
+        for i0, j0, i1, j1 in self._boxes:
+            if i1 < min_i or i0 > max_i or j1 < min_j or j0 > max_j:
+                continue
+            i0, i1 = max(i0 - min_i, 0), min(i1 - min_i, ni - 1)
+            j0, j1 = max(j0 - min_j, 0), min(j1 - min_j, nj - 1)
+            for j in range(j0, j1 + 1):
+                row = occupied[j]
+                for i in range(i0, i1 + 1):
+                    row[i] = 1
+
+        table = [[0] * (ni + 1) for _ in range(nj + 1)]
+        for j in range(nj):
+            row, prev, occ = table[j + 1], table[j], occupied[j]
+            acc = 0
+            for i in range(ni):
+                acc += occ[i]
+                row[i + 1] = prev[i + 1] + acc
+        return table
+
+    def find_free(self, min_i: int, min_j: int, max_i: int, max_j: int, w: int, h: int) -> Optional[tuple[int, int]]:
+        """
+        First (row-major) top-left corner (i, j) with min_i <= i <= max_i, min_j <= j <= max_j such that
+        the w x h rectangle at (i, j) is free
+        """
+        if max_i < min_i or max_j < min_j:
+            return None
+        ni, nj = max_i - min_i + w, max_j - min_j + h
+        table = self._table(min_i, min_j, ni, nj)
+
+        for dj in range(max_j - min_j + 1):
+            top, bottom = table[dj], table[dj + h]
+            for di in range(max_i - min_i + 1):
+                if bottom[di + w] - bottom[di] - top[di + w] + top[di] == 0:
+                    return min_i + di, min_j + dj
+        return None
+
+
+def score_direction(
+    i1: float,
+    j1: float,
+    w1: float,
+    h1: float,
+    im: int,
+    jm: int,
+    i2: float,
+    j2: float,
+    w2: float,
+    h2: float,
+) -> float:
+    """
+    Score of box 2 as the target of moving from box 1 in direction (im, jm) - lower is better, 1000 if
+    box 2 does not qualify. The score is never smaller than the gap along the primary axis minus one
+    """
+
+    if (i1, j1, w1, h1) == (i2, j2, w2, h2):
+        return 1000
+
+    if im < 0:
+        im *= -1
+        i1 *= -1
+        i2 *= -1
+        i1 -= w1
+        i2 -= w2
+    if jm < 0:
+        jm *= -1
+        j1 *= -1
+        j2 *= -1
+        j1 -= h1
+        j2 -= h2
+
+    if jm == 1 and im == 0:
+        im, jm = jm, im
+        i1, j1, w1, h1 = j1, i1, h1, w1
+        i2, j2, w2, h2 = j2, i2, h2, w2
+
+    """
+    At this point: Either im == 1, jm == 0 or im == jm == 1
+    """
+    d_i = i2 - (i1 + w1)
+    if d_i < 0:
+        return 1000
+
+    if jm == 1:
+        d_j = j2 - (j1 + h1)
+        if d_j < 0:
+            return 1000
+
+        return d_i + d_j
+
+    else:
+        d_j = 0.0
+        if j2 >= j1 + h1:
+            d_j = j2 - (j1 + h1)
+        elif j1 >= j2 + h2:
+            d_j = j1 - (j2 + h2)
+        else:
+            d_j = -1
+
+        return d_i + d_j
+
+
+class _KDNode:
+    def __init__(self, idx: int, axis: int, left: Optional[_KDNode], right: Optional[_KDNode]) -> None:
+        self.idx = idx
+        self.axis = axis
+        self.left = left
+        self.right = right
+
+
+class ViewIndex:
+    """
+    Nearest-neighbour / directional index over the tiled views of a workspace (handle, i, j, w, h)
+
+    - Centers are kept in a k-d tree, nearest queries are O(log n) on average
+    - Near edges are kept sorted per direction; a directional query bisects to the first box beyond the
+      reference box and stops as soon as the gap alone rules out beating the best score, so only the
+      band of boxes next to the reference is scored
+
+    Ties are resolved in insertion order, as a linear scan would
+    """
+    def __init__(self, boxes: Iterable[tuple[int, float, float, float, float]]) -> None:
+        self._boxes = list(boxes)
+        self._centers = [(i + w / 2., j + h / 2.) for _, i, j, w, h in self._boxes]
+        self._root = self._build(list(range(len(self._boxes))), 0)
+
+        # Near edge (negated for negative directions, so always ascending) per axis and sign
+        self._edges: dict[tuple[int, int], tuple[list[float], list[int]]] = {}
+        for axis in [0, 1]:
+            for sign in [1, -1]:
+                keys = sorted((self._near_edge(k, axis, sign), k) for k in range(len(self._boxes)))
+                self._edges[(axis, sign)] = [e for e, _ in keys], [k for _, k in keys]
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def _near_edge(self, k: int, axis: int, sign: int) -> float:
+        _, i, j, w, h = self._boxes[k]
+        lo, ext = (i, w) if axis == 0 else (j, h)
+        return lo if sign > 0 else -(lo + ext)
+
+    def _build(self, idxs: list[int], axis: int) -> Optional[_KDNode]:
+        if len(idxs) == 0:
+            return None
+        idxs.sort(key=lambda k: self._centers[k][axis])
+        m = len(idxs) // 2
+        return _KDNode(idxs[m], axis, self._build(idxs[:m], 1 - axis), self._build(idxs[m + 1:], 1 - axis))
+
+    def nearest(self, ci: float, cj: float, exclude: Optional[int]=None, max_sq: float=float('inf')) -> Optional[int]:
+        """
+        Handle of the box whose center is closest to (ci, cj), squared distance below max_sq
+        """
+        best: list[Any] = [max_sq, -1, None]
+
+        def visit(node: Optional[_KDNode]) -> None:
+            if node is None:
+                return
+            c = self._centers[node.idx]
+            handle = self._boxes[node.idx][0]
+            if handle != exclude:
+                sc = (c[0] - ci) ** 2 + (c[1] - cj) ** 2
+                if (sc, node.idx) < (best[0], best[1]):
+                    best[0], best[1], best[2] = sc, node.idx, handle
+
+            diff = (ci, cj)[node.axis] - c[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            visit(near)
+            if diff ** 2 <= best[0]:
+                visit(far)
+
+        visit(self._root)
+        return best[2]
+
+    def in_direction(self, box: tuple[float, float, float, float], im: int, jm: int, max_score: float=1000.) -> Optional[int]:
+        """
+        Handle of the box with the lowest score_direction below max_score
+        """
+        if im == 0 and jm == 0:
+            return None
+
+        i, j, w, h = box
+        axis, sign = (0, 1 if im > 0 else -1) if im != 0 else (1, 1 if jm > 0 else -1)
+        lo, ext = (i, w) if axis == 0 else (j, h)
+        ref = lo + ext if sign > 0 else -lo
+
+        edges, order = self._edges[(axis, sign)]
+        best_sc, best_k, best_handle = max_score, -1, None
+        for x in range(bisect_left(edges, ref - 1e-9), len(edges)):
+            if edges[x] - ref - 1 > best_sc:
+                break
+            k = order[x]
+            handle, i2, j2, w2, h2 = self._boxes[k]
+            sc = score_direction(i, j, w, h, im, jm, i2, j2, w2, h2)
+            if (sc, k) < (best_sc, best_k):
+                best_sc, best_k, best_handle = sc, k, handle
+        return best_handle
+
+    def at(self, i: float, j: float) -> Optional[int]:
+        """
+        Handle of the first box containing (i, j)
+        """
+        for handle, i0, j0, w, h in self._boxes:
+            if i0 <= i < i0 + w and j0 <= j < j0 + h:
+                return handle
+        return None
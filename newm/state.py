@@ -5,6 +5,7 @@ import math
 import logging
 
 from .config import configured_value
+from .spatial import OccupancyGrid, ViewIndex
 
 if TYPE_CHECKING:
     from .view import View
@@ -142,6 +143,9 @@ class WorkspaceState:
 
         self._view_states: dict[int, ViewState] = {}
 
+        # Cache, not part of the state - dropped whenever view states change
+        self._view_index: Optional[ViewIndex] = None
+
 
     """
     Register / Unregister
@@ -149,12 +153,14 @@ class WorkspaceState:
 
     def with_view_state(self, view: View, **kwargs: Any) -> WorkspaceState:
         self._view_states[view._handle] = ViewState(**kwargs)
+        self._view_index = None
         return self
 
 
     def without_view_state(self, view: View) -> WorkspaceState:
         if view._handle in self._view_states:
             del self._view_states[view._handle]
+        self._view_index = None
         return self
 
     """
@@ -166,6 +172,8 @@ class WorkspaceState:
         res.intermediate_rows = list(self.intermediate_rows)
         res.intermediate_cols = list(self.intermediate_cols)
         res._view_states = {h: s.copy() for h, s in self._view_states.items()}
+        # Immutable - valid until res is changed
+        res._view_index = self._view_index
         return res
 
     def update(self, **kwargs: Any) -> None:
@@ -181,6 +189,7 @@ class WorkspaceState:
         try:
             s = self.get_view_state(view)
             s.update(**kwargs)
+            self._view_index = None
         except Exception:
             logger.warn("Unexpected: Unable to update view %s state", view)
 
@@ -316,6 +325,7 @@ class WorkspaceState:
 
 
     def constrain(self) -> None:
+        self._view_index = None
         min_i, min_j, max_i, max_j = self.get_extent()
         min_i = math.floor(min_i)
         min_j = math.floor(min_j)
@@ -378,6 +388,7 @@ class WorkspaceState:
 
 
     def _insert_intermediate_col(self, i: int) -> None:
+        self._view_index = None
         for _, s in self._view_states.items():
             if s.i >= i:
                 s.i += 1
@@ -387,6 +398,7 @@ class WorkspaceState:
 
 
     def _insert_intermediate_row(self, j: int) -> None:
+        self._view_index = None
         for _, s in self._view_states.items():
             if s.j >= j:
                 s.j += 1
@@ -395,6 +407,7 @@ class WorkspaceState:
         self.intermediate_rows += [j]
 
     def _clear_intermediate(self, i_ref: Optional[int]=None, j_ref: Optional[int]=None) -> tuple[int, int]:
+        self._view_index = None
         i_stolen = 0
         j_stolen = 0
 
@@ -427,6 +440,7 @@ class WorkspaceState:
             else:
                 new_view_states[h] = s
         self._view_states = new_view_states
+        self._view_index = None
 
 
     """
@@ -584,6 +598,15 @@ class WorkspaceState:
 
         return True
 
+    def view_index(self) -> ViewIndex:
+        if self._view_index is None:
+            self._view_index = ViewIndex((h, s.i, s.j, s.w, s.h) for h, s in self._view_states.items() if s.is_tiled)
+        return self._view_index
+
+    def occupancy(self) -> OccupancyGrid:
+        return OccupancyGrid((s.i, s.j, s.w, s.h) for s in self._view_states.values()
+                             if s.is_tiled and s.swallowed is None)
+
     def is_fullscreen(self) -> bool:
         return self.state_before_fullscreen is not None
 
@@ -591,7 +614,7 @@ class WorkspaceState:
         return self.state_before_overview is not None
 
     def __str__(self) -> str:
-        return "<WorkspaceState %s>" % str({k:v for k, v in self.__dict__.items() if k != "_view_states"})
+        return "<WorkspaceState %s>" % str({k:v for k, v in self.__dict__.items() if k not in ["_view_states", "_view_index"]})
 
     def __repr__(self) -> str:
         return str(self)
@@ -603,7 +626,8 @@ class WorkspaceState:
         if not isinstance(o, WorkspaceState):
             return False
 
-        return self.__dict__ == o.__dict__
+        return {k: v for k, v in self.__dict__.items() if k != "_view_index"} == \
+            {k: v for k, v in o.__dict__.items() if k != "_view_index"}
 
 
 class LayoutState:
@@ -636,6 +660,7 @@ class LayoutState:
         orphan_ws = self._workspace_states[layout.workspaces[0]._handle]
         for k, o in orphans:
             orphan_ws._view_states[k] = o
+        orphan_ws._view_index = None
 
         self.validate_stack_indices()
         return self
@@ -672,8 +697,9 @@ class LayoutState:
 
     def update_view_state(self, view: View, **kwargs: Any) -> None:
         try:
-            s = self.get_view_state(view)
+            s, ws_state, _ = self.find_view(view)
             s.update(**kwargs)
+            ws_state._view_index = None
         except Exception:
             logger.warn("Unexpected: Unable to update view %s state", view)
 
@@ -683,6 +709,7 @@ class LayoutState:
         view_state = from_ws_state.get_view_state(view)
         from_ws_state.without_view_state(view)
         to_ws_state._view_states[view._handle] = view_state
+        to_ws_state._view_index = None
 
     def validate_fullscreen(self) -> None:
         for h, s in self._workspace_states.items():
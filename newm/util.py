@@ -1,7 +1,10 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, Iterator
 import time
 import logging
+import builtins
+from threading import Lock, local
+from contextlib import contextmanager
 from typing import Any
 
 logger = logging.getLogger(__name__)
@@ -44,6 +47,93 @@ class Profiler:
 
 profiler = Profiler()
 
+
+class StartupTracer:
+    """
+    Timeline of import and initialisation costs up to the point where newm is fully set up - enable via start-newm --startup-trace
+    """
+    def __init__(self) -> None:
+        self.enabled = False
+        self.t0 = time.time()
+        self._events: list[tuple[float, float, int, str]] = [] # start, duration (negative for marks), depth, name
+        self._lock = Lock()
+        self._local = local()
+        self._import: Any = None
+
+    def start(self) -> None:
+        self.enabled = True
+        self.t0 = time.time()
+        self._import = builtins.__import__
+        builtins.__import__ = self._traced_import
+
+    def _depth(self, delta: int) -> int:
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + delta
+        return depth
+
+    def _record(self, t: float, d: float, depth: int, name: str) -> None:
+        with self._lock:
+            self._events += [(t - self.t0, d, depth, name)]
+
+    def _traced_import(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        t = time.time()
+        depth = self._depth(1)
+        try:
+            return self._import(name, *args, **kwargs)
+        finally:
+            self._depth(-1)
+            d = time.time() - t
+            # Skip modules which have already been loaded
+            if d > 0.0005:
+                self._record(t, d, depth, "import %s" % self._import_name(name, *args, **kwargs))
+
+    def _import_name(self, name: str, globals: Optional[dict[str, Any]]=None, locals: Any=None, fromlist: Any=None, level: int=0) -> str:
+        if level > 0 and globals is not None:
+            package = globals.get("__package__") or ""
+            package = ".".join(package.split(".")[:len(package.split(".")) - level + 1])
+            name = "%s.%s" % (package, name) if name else package
+        if fromlist:
+            name += " (%s)" % ", ".join(fromlist)
+        return name
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        t = time.time()
+        depth = self._depth(1)
+        try:
+            yield
+        finally:
+            self._depth(-1)
+            self._record(t, time.time() - t, depth, name)
+
+    def mark(self, name: str) -> None:
+        if not self.enabled:
+            return
+        self._record(time.time(), -1., self._depth(0), name)
+
+    def finish(self) -> None:
+        if not self.enabled:
+            return
+        self.enabled = False
+        builtins.__import__ = self._import
+
+        with self._lock:
+            events = sorted(self._events, key=lambda e: e[0])
+            self._events = []
+
+        logger.info("Startup trace:")
+        for t, d, depth, name in events:
+            if d < 0:
+                logger.info("STARTUP[%8.2fms] %s--- %s ---" % (1000. * t, "  " * depth, name))
+            else:
+                logger.info("STARTUP[%8.2fms] %s%-50s %8.2fms" % (1000. * t, "  " * depth, name, 1000. * d))
+
+startup_tracer = StartupTracer()
+
 def timed(func):  # type: ignore
     profile = profiler.get(str(func))
     def wrapped(*args, **kwargs):  # type: ignore
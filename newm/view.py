@@ -1,10 +1,10 @@
 from __future__ import annotations
-from typing import Optional, TYPE_CHECKING, cast, TypeVar, Any
+from typing import Optional, TYPE_CHECKING, cast, TypeVar, Any, NamedTuple
 
 import math
 import logging
 import time
-import psutil  # type: ignore
+from concurrent.futures import Future, TimeoutError
 
 from pywm import PyWMView, PyWMViewDownstreamState, PyWMOutput
 from pywm.pywm_view import PyWMViewUpstreamState
@@ -13,8 +13,10 @@ from .state import ViewState, LayoutState, WorkspaceState
 from .interpolation import ViewDownstreamInterpolation
 from .animate import Animate, Animatable
 from .overlay import MoveResizeFloatingOverlay
-from .config import configured_value
+from .config import configured_value, configured_snapshot
 from .widget import SSDs, BackgroundBlur
+from .rules import RuleTable, evaluate_callback
+from .coordinates import TileTransform
 
 if TYPE_CHECKING:
     from .layout import Layout, Workspace
@@ -30,6 +32,9 @@ conf_fullscreen_padding = configured_value('view.fullscreen_padding', 0)
 conf_border_ws_switch = configured_value('view.border_ws_switch', 10.)
 
 conf_rules_callback = configured_value('view.rules', lambda view: None)
+conf_rules_timeout = configured_value('view.rules_timeout', .05)
+conf_rule_table_entries = configured_value('view.rule_table', cast(list[dict[str, Any]], []))
+conf_rule_table = configured_snapshot(lambda: RuleTable(conf_rule_table_entries()))
 conf_floating_min_size = configured_value('view.floating_min_size', True)
 
 conf_accept_fullscreen_from_views = configured_value('view.accept_fullscreen', True)
@@ -48,6 +53,19 @@ conf_anim_t = configured_value('anim_time', .3)
 
 conf_debug_scaling = configured_value('view.debug_scaling', False)
 
+class _ViewConfig(NamedTuple):
+    corner_radius: float
+    padding: float
+    fullscreen_padding: float
+
+"""
+Bound once per reducer call instead of several configured_value lookups - see dev/bench_config.py
+"""
+conf_view = configured_snapshot(lambda: _ViewConfig(
+    float(conf_corner_radius()),
+    float(conf_padding()),
+    float(conf_fullscreen_padding())))
+
 """
 Wait this long before accepting that view won't accept our requested size
 Set high to debug (as this situation should be avoided - possibly there are newm bugs
@@ -65,6 +83,7 @@ class CustomDownstreamState(PyWMViewDownstreamState):
         super().__init__(*args, **kwargs)
         self.logical_box: tuple[float, float, float, float] = kwargs['logical_box'] if 'logical_box' in kwargs else self.box
         self.is_fullscreen: bool = kwargs['is_fullscreen'] if 'is_fullscreen' in kwargs else False
+        self.thumbnail: bool = kwargs['thumbnail'] if 'thumbnail' in kwargs else False
 
 class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
     def __init__(self, wm: Layout, handle: int):
@@ -392,7 +411,7 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
         result = CustomDownstreamState()
         result.floating = True
         result.accepts_input = True
-        result.corner_radius = conf_corner_radius()
+        result.corner_radius = conf_view().corner_radius
         result.corner_radius /= max(1, ws_state.size / 2.)
 
         # z_index based on hierarchy
@@ -421,13 +440,7 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
         width = round(width * size / ws_state.size)
         height = round(height * size / ws_state.size)
 
-        i, j = self_state.float_pos
-
-        x = i - ws_state.i
-        y = j - ws_state.j
-
-        x *= ws.width / ws_state.size
-        y *= ws.height / ws_state.size
+        x, y = TileTransform.floating(ws, ws_state).to_pixels(*self_state.float_pos)
         result.box = (x, y, width, height)
 
         if self._needs_ssd(up_state):
@@ -451,7 +464,7 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
         return result
 
 
-    def _show_floating(self, ws: Workspace, state: LayoutState, ws_state: WorkspaceState, size_hint: Optional[tuple[int, int]], pos_hint: Optional[tuple[float, float]]) -> tuple[Optional[LayoutState], Optional[LayoutState]]:
+    def _show_floating(self, ws: Workspace, state: LayoutState, ws_state: WorkspaceState, size_hint: Optional[tuple[int, int]], pos_hint: Optional[tuple[float, float]], restore: Optional[tuple[float, float, float, float]]=None) -> tuple[Optional[LayoutState], Optional[LayoutState]]:
         logger.debug("Show - floating: %s" % self)
 
         # mypy
@@ -496,6 +509,12 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
         i = ci - wt / 2.
         j = cj - ht / 2.
 
+        if restore is not None:
+            i, j = restore[0], restore[1]
+            w, h = int(restore[2]), int(restore[3])
+            ci = i + w / ws.width * reference_ws_state.size / 2.
+            cj = j + h / ws.height * reference_ws_state.size / 2.
+
         ws_state1 = ws_state.with_view_state(
             self,
             is_tiled=False,
@@ -549,12 +568,14 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
 
 
     def _reducer_tiled(self, up_state: PyWMViewUpstreamState, state: LayoutState, self_state: ViewState, ws: Workspace, ws_state: WorkspaceState, ignore_min_size: bool=False) -> CustomDownstreamState:
+        conf = conf_view()
+
         result = CustomDownstreamState()
         result.floating = False
         result.accepts_input = True
-        result.corner_radius = conf_corner_radius()
+        result.corner_radius = conf.corner_radius
 
-        if ws_state.is_fullscreen() and conf_fullscreen_padding() == 0:
+        if ws_state.is_fullscreen() and conf.fullscreen_padding == 0:
             result.corner_radius = 0
 
         """
@@ -591,21 +612,15 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
                 w -= 0.05
                 h -= 0.05 * ws.width / (ws.height - ws_state.top_excluded - ws_state.bottom_excluded)
 
-        x = i - ws_state.i
-        y = j - ws_state.j
-
-        x *= ws.width / ws_state.size
-        y *= (ws.height - ws_state.top_excluded - ws_state.bottom_excluded) / ws_state.size
-        w *= ws.width / ws_state.size
-        h *= (ws.height - ws_state.top_excluded - ws_state.bottom_excluded) / ws_state.size
-
-        y += ws_state.top_excluded
+        transform = TileTransform.tiled(ws, ws_state)
+        x, y = transform.to_pixels(i, j)
+        w, h = transform.size_to_pixels(w, h)
 
         result.corner_radius /= max(1, ws_state.size / 2.)
 
         result.is_fullscreen = ws_state.is_fullscreen()
 
-        padding = float(conf_fullscreen_padding() if result.is_fullscreen else conf_padding())
+        padding = conf.fullscreen_padding if result.is_fullscreen else conf.padding
         padding_scaled = padding / max(1, ws_state.size / 2.)
 
         padding_for_size = padding_scaled
@@ -688,6 +703,7 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
 
         result.opacity = self._opacity * (1.0 if (result.lock_enabled and not state.final) else state.background_opacity)
         result.box = (result.box[0] + ws.pos_x, result.box[1] + ws.pos_y, result.box[2], result.box[3])
+        result.thumbnail = self.wm.overview_thumbnails.is_thumbnail(self, ws_state, result.logical_box)
 
         if self_state.swallowed is not None:
             x, y, w, h = result.box
@@ -704,7 +720,7 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
         return result
 
 
-    def _show_tiled(self, ws: Workspace, state: LayoutState, ws_state:WorkspaceState) -> tuple[Optional[LayoutState], Optional[LayoutState]]:
+    def _show_tiled(self, ws: Workspace, state: LayoutState, ws_state:WorkspaceState, restore: Optional[tuple[float, float, float, float]]=None) -> tuple[Optional[LayoutState], Optional[LayoutState]]:
         logger.debug("Show - tiled: %s" % self)
         min_w, _, min_h, _ = self.up_state.size_constraints if self.up_state is not None else (0., 0., 0., 0.)
         logger.debug("Show - tiled - size constraints: min %dx%d" % (min_w, min_h))
@@ -728,9 +744,12 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
 
         i: float = 0.
         j: float = 0.
-        i, j = self.wm.place_initial(ws, reference_ws_state, w, h)
-
-        second_state = (i, j, w, h)
+        second_state: tuple[float, float, float, float]
+        if restore is not None:
+            second_state = restore
+        else:
+            i, j = self.wm.place_initial(ws, reference_ws_state, w, h)
+            second_state = (i, j, w, h)
 
         i, j, w, h = second_state
         i1, j1, w1, h1 = second_state
@@ -763,37 +782,73 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
     """
     Init and map
     """
-    def _get_rules(self) -> None:
-        try:
-            rules = conf_rules_callback()(self)
-            if rules is not None:
-                self._rules = rules
-                logger.debug("View %s rules: %s" % (self, self._rules))
-            else:
-                logger.debug("No rules for view %s" % self)
+    def _set_rules(self, rules: Optional[dict[str, Any]]) -> None:
+        if rules is not None:
+            self._rules = rules
+            logger.debug("View %s rules: %s" % (self, self._rules))
+        else:
+            logger.debug("No rules for view %s" % self)
 
+        try:
             if 'opacity' in self._rules:
                 self._opacity = float(self._rules['opacity'])
+        except:
+            logger.exception("Invalid opacity rule")
 
+    def _on_late_rules(self, future: Future[Optional[dict[str, Any]]]) -> None:
+        """
+        Floating is decided on show - only opacity and blur can be applied once the callback has finished
+        """
+        if self._destroyed:
+            return
+        try:
+            self._set_rules(future.result())
+        except:
+            logger.exception("In rules callback")
+            return
+
+        self.validate_background()
+        self.damage()
+
+    def _get_rules(self) -> None:
+        rules = conf_rule_table().match(self.app_id, self.title, self.role)
+        if rules is not None:
+            self._set_rules(rules)
+            return
+
+        # Fall back to the callback - without blocking for too long if it is slow
+        future = evaluate_callback(conf_rules_callback(), self)
+        try:
+            rules = future.result(timeout=conf_rules_timeout())
+        except TimeoutError:
+            logger.warn("Rules callback for %s is slow - applying rules once it has finished" % self)
+            future.add_done_callback(self._on_late_rules)
+            return
         except:
             logger.exception("In rules callback")
+            return
+
+        self._set_rules(rules)
 
     def init(self) -> CustomDownstreamState:
         if self._initial_state is None:
             logger.info("Init: %s", self)
             self._get_rules()
 
+            # pid might have been reused since it was cached
+            if self.pid is not None:
+                self.wm.process_tree.refresh(self.pid)
+
         # mypy
         if self.up_state is None:
             return CustomDownstreamState()
 
         ws = self.wm.get_active_workspace()
         if self.up_state is not None and (output := self.up_state.fixed_output) is not None:
-            wss = [w for w in self.wm.workspaces if output in w.outputs]
-            if len(wss) != 1:
+            if (wso := self.wm.workspace_registry.for_output(output)) is None:
                 logger.warn("Unexpected: Could not find output %s in workspaces" % output)
             else:
-                ws = wss[0]
+                ws = wso
 
         if self.pid is not None:
             self.panel = self.wm.panel_launcher.get_panel_for_pid(self.pid)
@@ -836,12 +891,20 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
         self._get_rules()
 
         ws = self.wm.get_active_workspace()
+
+        # Slot saved in the previous session (see SessionStore)
+        slot = self.wm.session.match(self) if self._initial_kind >= 2 else None
+        restore: Optional[tuple[float, float, float, float]] = None
+        if slot is not None and (wss := self.wm.session.workspace_for(slot)) is not None:
+            ws = wss
+            if slot['tiled'] == (self._initial_kind == 3):
+                restore = cast(tuple[float, float, float, float], tuple(slot['geometry']))
+
         if self.up_state is not None and (output := self.up_state.fixed_output) is not None:
-            wss = [w for w in self.wm.workspaces if output in w.outputs]
-            if len(wss) != 1:
+            if (wso := self.wm.workspace_registry.for_output(output)) is None:
                 logger.warn("Unexpected: Could not find output %s in workspaces" % output)
             else:
-                ws = wss[0]
+                ws = wso
 
         ws_state = state.get_workspace_state(ws)
 
@@ -855,12 +918,14 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
             _, size_hint, pos_hint = self._decide_floating()
 
             if self._initial_kind == 2:
-                result = self._show_floating(ws, state, ws_state, size_hint=size_hint, pos_hint=pos_hint)
+                result = self._show_floating(ws, state, ws_state, size_hint=size_hint, pos_hint=pos_hint, restore=restore)
             else:
-                result = self._show_tiled(ws, state, ws_state)
+                result = self._show_tiled(ws, state, ws_state, restore=restore)
 
         if result != (None, None):
             self._mapped = True
+            if self.wm.dbus_endpoint is not None:
+                self.wm.dbus_endpoint.publish_mapped(self, True)
 
         self.validate_ssd(override_float=self._initial_kind == 2)
         self.validate_background()
@@ -870,7 +935,12 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
 
     def process(self, up_state: PyWMViewUpstreamState) -> PyWMViewDownstreamState:
         if self._mapped:
-            return self._process(self.reducer(up_state, self.wm.state))
+            target = self.reducer(up_state, self.wm.state)
+            state = self._process(target)
+
+            final_time = self.get_final_time()
+            settled = self._animation is None or (final_time is not None and time.time() >= final_time)
+            return self.wm.resize_scheduler.schedule(self._handle, state, settled, self.wm.layout, frozen=target.thumbnail)
 
         self.damage()
 
@@ -894,10 +964,14 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
                                                                                                               *self._initial_state.size))
 
         if up_state.is_mapped and not self._waiting_for_show:
-            self.wm.animate_to(self.show, conf_anim_t(), None, self._initial_kind <= 1) # overlay_safe for panel and layer
+            if self._initial_kind <= 1 or not self.wm.session.defer_show(self):
+                self.request_show()
             self._waiting_for_show = True
         return self._initial_state
 
+    def request_show(self) -> None:
+        self.wm.animate_to(self.show, conf_anim_t(), None, self._initial_kind <= 1) # overlay_safe for panel and layer
+
 
     """
     Animation logic
@@ -905,7 +979,7 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
     def reducer(self, up_state: PyWMViewUpstreamState, state: LayoutState) -> CustomDownstreamState:
         try:
             self_state, ws_state, ws_handle = state.find_view(self)
-            ws = [w for w in self.wm.workspaces if w._handle == ws_handle][0]
+            ws = self.wm.workspace_registry.get(ws_handle)
         except Exception:
             """
             This is perfectly valid: One animation is queued, after which the show animation of
@@ -970,19 +1044,29 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
         if self._background is not None:
             self._background.destroy()
 
+        if self.pid is not None:
+            self.wm.process_tree.forget(self.pid)
+        self.wm.resize_scheduler.forget(self._handle)
+        if self._mapped and self.wm.dbus_endpoint is not None:
+            self.wm.dbus_endpoint.publish_mapped(self, False)
+
         self.wm.destroy_view(self)
 
     def find_swallower(self) -> Optional[View]:
+        """
+        Topmost view which has been started (directly or indirectly) by this one's process
+        """
+        if self.pid is None:
+            return None
+
+        tree = self.wm.process_tree
         res: list[View] = []
         for k, v in self.wm._views.items():
-            if id(v) == id(self):
+            if id(v) == id(self) or v.pid is None:
                 continue
 
-            ppid = v.pid
-            while ppid is not None and ppid > 1:
-                if ppid == self.pid:
-                    res += [v]
-                ppid = psutil.Process(ppid).ppid()
+            if v.pid == self.pid or tree.is_ancestor(self.pid, v.pid):
+                res += [v]
 
         if len(res) == 0:
             return None
@@ -990,15 +1074,7 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
             return res[0]
         else:
             pids = set([v.pid for v in res])
-            remove: list[View] = []
-            for v in res:
-                ppid = psutil.Process(v.pid).ppid()
-                while ppid is not None and ppid > 1:
-                    if ppid in pids:
-                        remove += [v]
-                    ppid = psutil.Process(ppid).ppid()
-            for r in remove:
-                res.remove(r)
+            res = [v for v in res if tree.nearest_ancestor(v.pid, pids) is None]
             if len(res) == 0:
                 logger.debug("Unexpected")
                 return None
@@ -1023,7 +1099,20 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
             return state, state.copy(is_tiled=True, i=i, j=j, w=w, h=h)
 
 
+    def _probe_state(self, **kwargs: Any) -> ViewState:
+        """
+        Copy of this view's state with kwargs applied - the layout state itself is not touched
+        """
+        try:
+            return self.wm.state.get_view_state(self).copy(**kwargs)
+        except Exception:
+            return ViewState(**kwargs)
+
     def transform_to_closest_ws(self, ws: Workspace, i0: float, j0: float, w0: float, h0: float) -> tuple[Workspace, float, float, float, float]:
+        """
+        The box center computed by the reducers is affine in (i, j) (see TileTransform) - evaluate the reducer once
+        on the target workspace and invert the offset, no need to copy the layout state or iterate
+        """
         if self.panel is not None or self.up_state is None:
             return ws, i0, j0, w0, h0
 
@@ -1040,23 +1129,16 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
             if ws.pos_x - border_ws_switch <= cx <= ws.pos_x + ws.width + border_ws_switch and ws.pos_y - border_ws_switch <= cy <= ws.pos_y + ws.height + border_ws_switch:
                 return ws, i0, j0, w0, h0
 
-            for wsp in self.wm.workspaces:
-                if wsp.pos_x < cx < wsp.pos_x + wsp.width and wsp.pos_y < cy < wsp.pos_y + wsp.height:
-                    statep = self.wm.state.copy()
-                    statep.move_view_state(self, ws, wsp)
-                    statep.update_view_state(self, float_pos=(0, 0))
-
-                    view_state, wsp_state, _ = statep.find_view(self)
-                    down_transformed = self._reducer_floating(self.up_state, statep, view_state, wsp, wsp_state)
+            if (wsp := self.wm.workspace_registry.at(cx, cy)) is not None:
+                wsp_state = self.wm.state.get_workspace_state(wsp)
+                down_transformed = self._reducer_floating(self.up_state, self.wm.state, self._probe_state(float_pos=(0, 0)), wsp, wsp_state)
 
-                    xp, yp, widthp, heightp = down_transformed.box
-                    cxp = xp + .5 * widthp
-                    cyp = yp + .5 * heightp
+                xp, yp, widthp, heightp = down_transformed.box
+                cxp = xp + .5 * widthp
+                cyp = yp + .5 * heightp
 
-                    ip = (cx - cxp) * wsp_state.size / wsp.width
-                    jp = (cy - cyp) * wsp_state.size / wsp.height
-
-                    return wsp, ip, jp, w0, h0
+                ip, jp = TileTransform.floating(wsp, wsp_state).size_to_tiles(cx - cxp, cy - cyp)
+                return wsp, ip, jp, w0, h0
 
         else:
             down = self._reducer_tiled(self.up_state, self.wm.state, ViewState(i=i0, j=j0, w=w0, h=h0), ws, ws_state)
@@ -1069,37 +1151,25 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
             if ws.pos_x - border_ws_switch <= cx <= ws.pos_x + ws.width + border_ws_switch and ws.pos_y - border_ws_switch <= cy <= ws.pos_y + ws.height + border_ws_switch:
                 return ws, i0, j0, w0, h0
 
-            for wsp in self.wm.workspaces:
-                if wsp.pos_x < cx < wsp.pos_x + wsp.width and wsp.pos_y < cy < wsp.pos_y + wsp.height:
-                    wsp_state = self.wm.state.get_workspace_state(wsp)
-
-                    # Keep original size when moving to an overview state or leaving one
-                    if wsp_state.is_in_overview() or ws_state.is_in_overview():
-                        wp = w0
-                        hp = h0
-                    else:
-                        wp = max(1, min(wsp_state.size, round(w * wsp_state.size / wsp.width)))
-                        hp = max(1, min(wsp_state.size, round(h * wsp_state.size / wsp.height)))
-
-                    ip, jp = 0., 0.
-                    statep = self.wm.state.copy()
-                    statep.move_view_state(self, ws, wsp)
-                    statep.update_view_state(self, i=ip, j=jp, w=wp, h=hp)
-                    for _ in range(3):
-
-                        statep.update_view_state(self, i=ip, j=jp)
+            if (wsp := self.wm.workspace_registry.at(cx, cy)) is not None:
+                wsp_state = self.wm.state.get_workspace_state(wsp)
 
-                        view_state, wsp_state, _ = statep.find_view(self)
-                        down_transformed = self._reducer_tiled(self.up_state, statep, view_state, wsp, wsp_state)
+                # Keep original size when moving to an overview state or leaving one
+                if wsp_state.is_in_overview() or ws_state.is_in_overview():
+                    wp = w0
+                    hp = h0
+                else:
+                    wp = max(1, min(wsp_state.size, round(w * wsp_state.size / wsp.width)))
+                    hp = max(1, min(wsp_state.size, round(h * wsp_state.size / wsp.height)))
 
-                        xp, yp, widthp, heightp = down_transformed.box
-                        cxp = xp + .5 * widthp
-                        cyp = yp + .5 * heightp
+                down_transformed = self._reducer_tiled(self.up_state, self.wm.state, self._probe_state(i=0., j=0., w=wp, h=hp), wsp, wsp_state)
 
-                        ip += (cx - cxp) * wsp_state.size / wsp.width
-                        jp += (cy - cyp) * wsp_state.size / wsp.height
+                xp, yp, widthp, heightp = down_transformed.box
+                cxp = xp + .5 * widthp
+                cyp = yp + .5 * heightp
 
-                    return wsp, ip, jp, wp, hp
+                ip, jp = TileTransform.tiled(wsp, wsp_state).size_to_tiles(cx - cxp, cy - cyp)
+                return wsp, ip, jp, wp, hp
 
         logger.debug("View outside of workspaces - defaulting")
         return ws, i0, j0, w0, h0
@@ -1109,12 +1179,14 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
 
         if self._ssd is not None:
             self._ssd.update()
-        if self._background is not None:
-            self._background.destroy()
-            self._background = None
 
         self.validate_background()
 
+    def damage_with_background(self) -> None:
+        self.damage()
+        if self._background is not None:
+            self._background.damage()
+
     def validate_ssd(self, override_float: Optional[bool] = None) -> None:
         if self.up_state is None:
             return
@@ -1133,11 +1205,14 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
     def validate_background(self) -> None:
         needs_background = "blur" in self._rules and "radius" in self._rules["blur"] and "passes" in self._rules["blur"]
 
+        # Parented to this view, so only reused by it - disable instead of destroying
         if needs_background and self._background is None:
             self._background = self.wm.create_widget(BackgroundBlur, None, self, self._rules["blur"]["radius"], self._rules["blur"]["passes"], override_parent=self)
+        elif needs_background and self._background is not None:
+            self._background.configure(self._rules["blur"]["radius"], self._rules["blur"]["passes"])
+            self._background.set_enabled(True)
         elif not needs_background and self._background is not None:
-            self._background.destroy()
-            self._background = None
+            self._background.set_enabled(False)
 
 
     """
@@ -1164,7 +1239,7 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
             try:
                 self_state = self.wm.state.get_view_state(self)
                 if self_state.scale_origin is None:
-                    self.wm.state.update_view_state(self, float_size=(width, height))
+                    self.wm.mutate(lambda state: state.update_view_state(self, float_size=(width, height)))
                     self.damage()
             except:
                 # OK, on_resized is called before map
@@ -1180,6 +1255,8 @@ class View(PyWMView[Layout], Animate[PyWMViewDownstreamState], Animatable):
         if self.is_focused():
             self.wm.focus_hint(self)
             self.wm.focus_borders.update_focus(self)
+        if self.wm.dbus_endpoint is not None:
+            self.wm.dbus_endpoint.publish_focus(self if self.is_focused() else self.wm.find_focused_view())
         if self._ssd is not None:
             self._ssd.damage()
         if self._background is not None:
@@ -1,6 +1,18 @@
-from .bar import TopBar, BottomBar
+from __future__ import annotations
+from typing import Any, TYPE_CHECKING
+
 from .background import Background
 from .corner import Corner
 from .focus_border import FocusBorders
 from .ssd import SSDs
 from .background_blur import BackgroundBlur
+
+if TYPE_CHECKING:
+    from .bar import TopBar, BottomBar
+
+def __getattr__(name: str) -> Any:
+    # Native bars depend on cairo, only load them if enabled
+    if name in ["TopBar", "BottomBar"]:
+        from . import bar
+        return getattr(bar, name)
+    raise AttributeError("module %s has no attribute %s" % (__name__, name))
@@ -21,16 +21,31 @@ class BackgroundBlur(PyWMBlurWidget, Animate[PyWMWidgetDownstreamState], Animata
         PyWMBlurWidget.__init__(self, wm, output, *args, **kwargs)
         Animate.__init__(self)
 
+        self._blur = radius, passes
         self.set_blur(radius, passes)
 
         self.view = view
         self.view_state: Optional[CustomDownstreamState] = None
 
+        # Disabled blur is kept around (hidden) in case the view's rules enable it again
+        self.enabled = True
+
+    def configure(self, radius: int, passes: int) -> None:
+        if (radius, passes) != self._blur:
+            self._blur = radius, passes
+            self.set_blur(radius, passes)
+
+    def set_enabled(self, enabled: bool) -> None:
+        if enabled != self.enabled:
+            self.enabled = enabled
+            self.flush_animation()
+            self.damage()
+
     def reducer(self, state: CustomDownstreamState) -> PyWMWidgetDownstreamState:
         return PyWMWidgetDownstreamState(state.z_index -0.001, state.logical_box, lock_enabled=False, opacity=1., corner_radius=state.corner_radius, workspace=state.workspace)
 
     def animate(self, old_state: LayoutState, new_state: LayoutState, dt: float) -> None:
-        if self.view.up_state is not None:
+        if self.enabled and self.view.up_state is not None:
             view_old_down_state = self.view.reducer(self.view.up_state, old_state)
             view_new_down_state = self.view.reducer(self.view.up_state, new_state)
 
@@ -42,7 +57,7 @@ class BackgroundBlur(PyWMBlurWidget, Animate[PyWMWidgetDownstreamState], Animata
             self._animate(WidgetDownstreamInterpolation(self.wm, self, cur, nxt), dt)
 
     def process(self) -> PyWMWidgetDownstreamState:
-        if self.view_state is None:
+        if self.view_state is None or not self.enabled or self.view_state.thumbnail:
             return PyWMWidgetDownstreamState()
         else:
             return self._process(self.reducer(self.view_state))
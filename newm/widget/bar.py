@@ -36,7 +36,7 @@ class Bar(PyWMCairoWidget, Animate[PyWMWidgetDownstreamState], Animatable):
         Animate.__init__(self)
 
         self._output: PyWMOutput = output
-        self._workspace: Workspace = [w for w in self.wm.workspaces if self._output in w.outputs][0]
+        self._workspace: Workspace = self.wm.workspace_registry.for_output(self._output) or self.wm.workspaces[0]
 
         self.texts = ["Leftp", "Middlep", "Rightp"]
         self.font_size = output.scale * font_size
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable, Generic, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from ..layout import Layout
+
+from pywm import PyWMWidget, PyWMOutput
+
+Box = tuple[float, float, float, float]
+
+TWidget = TypeVar('TWidget', bound=PyWMWidget)
+
+
+def visible_box(box: Box, workspace: Optional[Box]) -> Optional[Box]:
+    """
+    Part of box (layout coordinates) clipped to workspace, None if empty
+    """
+    x, y, w, h = box
+    if workspace is not None:
+        wx, wy, ww, wh = workspace
+        x0, y0 = max(x, wx), max(y, wy)
+        x1, y1 = min(x + w, wx + ww), min(y + h, wy + wh)
+        x, y, w, h = x0, y0, x1 - x0, y1 - y0
+    if w <= 0 or h <= 0:
+        return None
+    return x, y, w, h
+
+
+def _bounding_box(boxes: list[Optional[Box]]) -> Optional[Box]:
+    bs = [b for b in boxes if b is not None]
+    if len(bs) == 0:
+        return None
+    x0, y0 = min(b[0] for b in bs), min(b[1] for b in bs)
+    x1, y1 = max(b[0] + b[2] for b in bs), max(b[1] + b[3] for b in bs)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _intersects(output: PyWMOutput, box: Box, margin: float) -> bool:
+    x, y, w, h = box
+    return x - margin < output.pos[0] + output.width and output.pos[0] < x + w + margin and \
+        y - margin < output.pos[1] + output.height and output.pos[1] < y + h + margin
+
+
+class OutputCulling(Generic[TWidget]):
+    """
+    Per-output widgets decorating a box (SSDs, focus borders) - a widget is only created once the box can
+    appear on its output and only the widgets of outputs the box currently intersects are animated and damaged
+
+    cull is given all boxes the decoration passes through (e.g. start and end of an animation) - outputs are
+    tested against their bounding box, which contains every interpolated box in between
+    """
+    def __init__(self, wm: Layout, create: Callable[[PyWMOutput], TWidget], release: Optional[Callable[[TWidget], None]]=None) -> None:
+        self.wm = wm
+        self._create = create
+        self._release = release
+        self._widgets: dict[int, TWidget] = {}
+        self._visible: set[int] = set()
+
+    def cull(self, boxes: list[Optional[Box]], margin: float=0) -> list[TWidget]:
+        """
+        Returns the widgets which have just been hidden - they need to be damaged once more
+        """
+        visible: set[int] = set()
+        box = _bounding_box(boxes)
+        for o in self.wm.layout:
+            if box is not None and _intersects(o, box, margin):
+                visible.add(o._key)
+                if o._key not in self._widgets:
+                    self._widgets[o._key] = self._create(o)
+
+        hidden = [w for k, w in self._widgets.items() if k in self._visible and k not in visible]
+        self._visible = visible
+        return hidden
+
+    def is_visible(self, output: PyWMOutput) -> bool:
+        return output._key in self._visible
+
+    def visible(self) -> list[TWidget]:
+        return [w for k, w in self._widgets.items() if k in self._visible]
+
+    def all(self) -> list[TWidget]:
+        return list(self._widgets.values())
+
+    def destroy(self) -> None:
+        for w in self._widgets.values():
+            if self._release is not None:
+                self._release(w)
+            else:
+                w.destroy()
+        self._widgets = {}
+        self._visible = set()
@@ -14,6 +14,7 @@ from ..animate import Animate, Animatable
 from ..interpolation import WidgetDownstreamInterpolation
 from ..config import configured_value
 from ..util import get_color
+from .culling import OutputCulling, visible_box
 
 logger = logging.getLogger(__name__)
 
@@ -84,18 +85,34 @@ class FocusBorders(Animatable, DamageTracked):
     def __init__(self, wm: Layout):
         DamageTracked.__init__(self, wm)
         self.wm = wm
-        self.borders: list[FocusBorder] = []
+        self.culling: OutputCulling[FocusBorder] = OutputCulling(wm, self._create)
+        self._enabled = False
+        self._corner_radius = conf_view_corner_radius() + conf_focus_d()
 
         self._skip_next_animate: bool = False
 
         self.current_view: Optional[View] = None
         self.current_box: tuple[float, float, float, float, float, Optional[tuple[float, float, float, float]]] = -999, 0, 0, 0, 0, None
 
+    def _create(self, output: PyWMOutput) -> FocusBorder:
+        border = self.wm.create_widget(FocusBorder, output, self)
+        border.set_corner_radius(self._corner_radius)
+        return border
+
+    def _cull(self, *boxes: tuple[float, float, float, float, float, Optional[tuple[float, float, float, float]]]) -> list[FocusBorder]:
+        """
+        Returns borders to damage once more since they have just been hidden
+        """
+        if not self._enabled:
+            return []
+        return self.culling.cull([visible_box(b[1:5], b[5]) for b in boxes], conf_focus_d() + conf_focus_w())
+
     def update(self) -> None:
-        for b in self.borders:
-            b.destroy()
-        if conf_enabled():
-            self.borders = [self.wm.create_widget(FocusBorder, o, self) for o in self.wm.layout]
+        self.culling.destroy()
+        self._enabled = conf_enabled()
+        # Radius depends on view.corner_radius and focus.distance
+        self._set_box_and_radius()
+        self._cull(self.current_box)
 
     def _set_box_and_radius(self, layout_state: Optional[LayoutState]=None) -> None:
         if layout_state is None:
@@ -106,12 +123,13 @@ class FocusBorders(Animatable, DamageTracked):
             self.current_box = view_down_state.z_index - 0.01, *view_down_state.logical_box, view_down_state.workspace
             if view_down_state.is_fullscreen:
                 self.current_box = -999, 0, 0, 0, 0, None
-            for b in self.borders:
-                b.set_corner_radius(view_down_state.corner_radius + conf_focus_d())
+            self._corner_radius = view_down_state.corner_radius + conf_focus_d()
         else:
             self.current_box = -999, 0, 0, 0, 0, None
-            for b in self.borders:
-                b.set_corner_radius(conf_view_corner_radius() + conf_focus_d())
+            self._corner_radius = conf_view_corner_radius() + conf_focus_d()
+
+        for b in self.culling.all():
+            b.set_corner_radius(self._corner_radius)
 
     def update_focus(self, view: View, present_states: Optional[tuple[Optional[LayoutState], Optional[LayoutState]]]=None) -> None:
         if id(view) == id(self.current_view):
@@ -128,8 +146,7 @@ class FocusBorders(Animatable, DamageTracked):
         new_box = self.current_box
 
         if animate:
-            for b in self.borders:
-                b.animate(old_box, 1., new_box, 1., conf_anim_time())
+            self._animate(old_box, 1., new_box, 1., conf_anim_time())
         else:
             self.damage()
 
@@ -140,8 +157,7 @@ class FocusBorders(Animatable, DamageTracked):
         self._set_box_and_radius()
         new_box = self.current_box
 
-        for b in self.borders:
-            b.animate(old_box, 1., new_box, 1., conf_anim_time())
+        self._animate(old_box, 1., new_box, 1., conf_anim_time())
 
     def animate(self, old_state: LayoutState, new_state: LayoutState, dt: float) -> None:
         if self._skip_next_animate:
@@ -164,15 +180,22 @@ class FocusBorders(Animatable, DamageTracked):
                 new_box = -999, 0, 0, 0, 0, None
 
             self.current_box = new_box
-            for b in self.borders:
-                b.animate(old_box, old_opacity, new_box, new_opacity, dt)
+            self._animate(old_box, old_opacity, new_box, new_opacity, dt)
+
+    def _animate(self, old_box: tuple[float, float, float, float, float, Optional[tuple[float, float, float, float]]], old_opacity: float, new_box: tuple[float, float, float, float, float, Optional[tuple[float, float, float, float]]], new_opacity: float, dt: float) -> None:
+        for b in self._cull(old_box, new_box):
+            b.damage()
+        for b in self.culling.visible():
+            b.animate(old_box, old_opacity, new_box, new_opacity, dt)
 
     def flush_animation(self) -> None:
-        for b in self.borders:
+        for b in self.culling.all():
             b.flush_animation()
 
     def damage(self, propagate: bool=False) -> None:
         self._set_box_and_radius()
 
-        for b in self.borders:
+        for b in self._cull(self.current_box):
+            b.damage()
+        for b in self.culling.visible():
             b.damage()
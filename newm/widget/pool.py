@@ -0,0 +1,77 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from ..layout import Layout
+
+import logging
+from abc import abstractmethod
+
+from pywm import PyWMWidget, PyWMOutput
+
+logger = logging.getLogger(__name__)
+
+"""
+Idle widgets kept per (class, output) - the rest is destroyed on release
+"""
+MAX_IDLE = 16
+
+
+class PooledWidget(PyWMWidget):
+    """
+    Widget which can be handed to a new owner instead of being destroyed and created again
+    """
+    _output: PyWMOutput
+
+    @abstractmethod
+    def attach(self, *args: Any) -> None:
+        """
+        Take a new owner (same arguments as the constructor after wm and output)
+        """
+        pass
+
+    @abstractmethod
+    def detach(self) -> None:
+        """
+        Drop the owner and render nothing until attached again
+        """
+        pass
+
+
+TPooled = TypeVar('TPooled', bound=PooledWidget)
+
+
+class WidgetPool:
+    """
+    Idle top-level widgets (not parented to a view) per class and output, so toggling floating or reloading
+    the config does not create and destroy native widgets through pywm
+    """
+    def __init__(self, wm: Layout) -> None:
+        self.wm = wm
+        self._idle: dict[tuple[type, int], list[PooledWidget]] = {}
+
+    def acquire(self, cls: type[TPooled], output: PyWMOutput, *args: Any) -> TPooled:
+        idle = self._idle.get((cls, output._key), [])
+        if len(idle) > 0:
+            widget = idle.pop()
+            assert isinstance(widget, cls)
+            widget.attach(*args)
+            return widget
+        return self.wm.create_widget(cls, output, *args)
+
+    def release(self, widget: PooledWidget) -> None:
+        widget.detach()
+        idle = self._idle.setdefault((type(widget), widget._output._key), [])
+        if len(idle) < MAX_IDLE:
+            idle += [widget]
+        else:
+            widget.destroy()
+
+    def clear(self) -> None:
+        """
+        Outputs might have gone away
+        """
+        for idle in self._idle.values():
+            for w in idle:
+                w.destroy()
+        self._idle = {}
@@ -14,6 +14,8 @@ from ..animate import Animate, Animatable
 from ..interpolation import WidgetDownstreamInterpolation
 from ..config import configured_value
 from ..util import get_color
+from .culling import OutputCulling, visible_box
+from .pool import PooledWidget
 
 logger = logging.getLogger(__name__)
 
@@ -22,16 +24,29 @@ conf_ssd_w = configured_value('view.ssd.width', 2)
 conf_enabled = configured_value('view.ssd.enabled', True)
 conf_color = configured_value('view.ssd.color', '#BEBEBEFF')
 
-class SSD(PyWMWidget, Animate[PyWMWidgetDownstreamState]):
+class SSD(PooledWidget, Animate[PyWMWidgetDownstreamState]):
     def __init__(self, wm: Layout, output: PyWMOutput, parent: SSDs, *args: Any, **kwargs: Any):
         self._output = output
-        self._parent = parent
+        self._parent: Optional[SSDs] = parent
         PyWMWidget.__init__(self, wm, output, *args, **kwargs)
         Animate.__init__(self)
 
         self._corner_radius = -1.
         self.set_corner_radius(conf_view_corner_radius())
 
+    def attach(self, parent: SSDs) -> None:
+        self._parent = parent
+        self.flush_animation()
+
+        # Config might have changed
+        self._corner_radius = -1.
+        self.set_corner_radius(conf_view_corner_radius())
+
+    def detach(self) -> None:
+        self._parent = None
+        self.flush_animation()
+        self.damage()
+
     def set_corner_radius(self, radius: float) -> None:
         if abs(radius - self._corner_radius) < 0.01:
             return
@@ -55,7 +70,7 @@ class SSD(PyWMWidget, Animate[PyWMWidgetDownstreamState]):
         self._animate(WidgetDownstreamInterpolation(self.wm, self, cur, nxt), dt)
 
     def process(self) -> PyWMWidgetDownstreamState:
-        if self._parent.view_state is None:
+        if self._parent is None or self._parent.view_state is None or not self._parent.culling.is_visible(self._output):
             return PyWMWidgetDownstreamState()
         else:
             return self._process(self.reducer(self._parent.view_state, self._parent.opacity))
@@ -72,19 +87,27 @@ class SSDs(Animatable, DamageTracked):
         self.view_state: Optional[CustomDownstreamState] = None
         self.opacity = 1.
 
-        self.ssds: list[SSD] = []
+        self.culling: OutputCulling[SSD] = OutputCulling(wm, self._create, wm.widget_pool.release)
+        self._enabled = False
 
         self.update()
 
+    def _create(self, output: PyWMOutput) -> SSD:
+        return self.wm.widget_pool.acquire(SSD, output, self)
+
+    def _cull(self, *states: CustomDownstreamState) -> list[SSD]:
+        if not self._enabled:
+            return []
+        return self.culling.cull([visible_box(s.logical_box, s.workspace) for s in states], conf_ssd_w())
+
     def update(self) -> None:
         self.destroy()
-        if conf_enabled():
-            self.ssds = [self.wm.create_widget(SSD, o, self) for o in self.wm.layout]
+        self._enabled = conf_enabled()
+        if self.view_state is not None:
+            self._cull(self.view_state)
 
     def destroy(self) -> None:
-        for b in self.ssds:
-            b.destroy()
-        self.ssds = []
+        self.culling.destroy()
 
     def animate(self, old_state: LayoutState, new_state: LayoutState, dt: float) -> None:
         if self.view.up_state is not None:
@@ -97,16 +120,20 @@ class SSDs(Animatable, DamageTracked):
             self.view_state = view_new_down_state
             self.opacity = new_opacity
 
-            for b in self.ssds:
+            for b in self._cull(view_old_down_state, view_new_down_state):
+                b.damage()
+            for b in self.culling.visible():
                 b.animate(view_old_down_state, old_opacity, view_new_down_state, new_opacity, dt)
 
     def flush_animation(self) -> None:
-        for b in self.ssds:
+        for b in self.culling.all():
             b.flush_animation()
 
     def damage(self, propagate: bool=True) -> None:
         if self.view.up_state is not None:
             self.view_state = self.view.reducer(self.view.up_state, self.wm.state)
             self.opacity = self.wm.state.background_opacity
-        for b in self.ssds:
+            for b in self._cull(self.view_state):
+                b.damage()
+        for b in self.culling.visible():
             b.damage()
@@ -1,6 +1,8 @@
 from __future__ import annotations
 from typing import Optional
 
+from bisect import bisect_right
+
 from pywm import (
     PyWMOutput,
 )
@@ -71,3 +73,49 @@ class Workspace:
             [o._key for o in self.outputs]
         )
 
+
+
+class WorkspaceRegistry:
+    """
+    Lookups of workspaces by handle, output and position - rebuilt whenever the workspaces change
+    (Layout._setup_workspaces), so views, widgets and interpolations do not scan the list on every frame
+    """
+    def __init__(self, workspaces: list[Workspace]) -> None:
+        self._by_handle = {w._handle: w for w in workspaces}
+        self._by_output = {o._key: w for w in workspaces for o in w.outputs}
+
+        self._sorted = sorted(workspaces, key=lambda w: w.pos_x)
+        self._pos_x = [w.pos_x for w in self._sorted]
+
+        self._prevent_anim = [w for w in workspaces if w.prevent_anim]
+
+    def __len__(self) -> int:
+        return len(self._by_handle)
+
+    def get(self, handle: int) -> Workspace:
+        """
+        Raises KeyError for unknown handles
+        """
+        return self._by_handle[handle]
+
+    def for_output(self, output: PyWMOutput) -> Optional[Workspace]:
+        return self._by_output.get(output._key, None)
+
+    def at(self, x: float, y: float) -> Optional[Workspace]:
+        """
+        Workspace containing (x, y) - workspaces do not overlap (see Workspace.swallow)
+        """
+        for k in range(bisect_right(self._pos_x, x) - 1, -1, -1):
+            w = self._sorted[k]
+            if w.pos_x <= x < w.pos_x + w.width and w.pos_y <= y < w.pos_y + w.height:
+                return w
+        return None
+
+    def prevents_anim(self, x: float, y: float, w: float, h: float) -> bool:
+        """
+        Whether the box lies within a workspace which has animations disabled
+        """
+        for ws in self._prevent_anim:
+            if ws.pos_x <= x <= x + w <= ws.pos_x + ws.width and ws.pos_y <= y <= y + h <= ws.pos_y + ws.height:
+                return True
+        return False
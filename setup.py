@@ -11,7 +11,6 @@ setup(name='newm',
       scripts=['bin/start-newm', 'bin/.start-newm', 'bin/newm-cmd', 'bin/newm-panel-basic'],
       install_requires=[
           'pycairo',
-          'psutil',
           'python-pam',
           'pyfiglet',
           'dasbus',